@@ -20,7 +20,8 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
-config.set_main_option("sqlalchemy.url", os.getenv("SQLALCHEMY_DATABASE_URL"))
+# The option is interpolated, so the "%" of escaped characters in the URL are doubled
+config.set_main_option("sqlalchemy.url", os.getenv("SQLALCHEMY_DATABASE_URL").replace("%", "%%"))
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -23,13 +23,35 @@ CONFIRMATION_ACCOUNT_TOKEN_EXPIRE_MINUTES = float(os.getenv("CONFIRMATION_ACCOUN
 
 
 # -------------------------- ZOOM CONFIGURATION --------------------------
+# Point these at a stand-in such as api.stubs.zoom_server for load tests and CI
+ZOOM_API_BASE_URL = os.getenv('ZOOM_API_BASE_URL', 'https://api.zoom.us/v2').rstrip('/')
+ZOOM_OAUTH_TOKEN_URL = os.getenv('ZOOM_OAUTH_TOKEN_URL', 'https://zoom.us/oauth/token')
 MAIL_USERNAME= os.getenv('MAIL_USERNAME')
 MAIL_PASSWORD= os.getenv('MAIL_PASSWORD')
 MAIL_FROM= os.getenv('MAIL_FROM')
+MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
+MAIL_PORT = int(os.getenv('MAIL_PORT', '587'))
+MAIL_STARTTLS = os.getenv('MAIL_STARTTLS', 'true').lower() == 'true'
+MAIL_SSL_TLS = os.getenv('MAIL_SSL_TLS', 'false').lower() == 'true'
+
+
+# -------------------------- MEETINGS --------------------------
+# Timezone the meetings are created with in Zoom, also used for start times sent without an offset
+MEETING_TIMEZONE = os.getenv('MEETING_TIMEZONE', 'America/Bogota')
+MEETING_DURATION_MINUTES = int(os.getenv('MEETING_DURATION_MINUTES', '30'))
+# Least-loaded free advisors offered to the round-robin claim of each new meeting
+ADVISOR_CANDIDATES = int(os.getenv('ADVISOR_CANDIDATES', '8'))
+# Largest list accepted by the bulk scheduling endpoint, and the Zoom meetings it creates at the same time
+BULK_MEETINGS_MAX_ITEMS = int(os.getenv('BULK_MEETINGS_MAX_ITEMS', '500'))
+BULK_MEETINGS_CONCURRENCY = int(os.getenv('BULK_MEETINGS_CONCURRENCY', '10'))
 
 
 # -------------------------- DATABASE CONFIGURATION --------------------------
 SQLALCHEMY_DATABASE_URL = os.getenv('SQLALCHEMY_DATABASE_URL')
+# "sync" serves requests with Session (psycopg2), "async" with AsyncSession (asyncpg)
+DATABASE_MODE = os.getenv('DATABASE_MODE', 'sync').lower()
+# Defaults to SQLALCHEMY_DATABASE_URL with the asyncpg driver
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL')
 
 
 # -------------------------- ON STARTUP ADMIN USER AND ADVISOR --------------------------
@@ -37,8 +59,97 @@ ADMIN_EMAIL = os.getenv('ADMIN_EMAIL')
 ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD')
 ADVISOR_EMAIL = os.getenv('ADVISOR_EMAIL')
 ADVISOR_NAME = os.getenv('ADVISOR_NAME')
+# bcrypt hash of ADMIN_PASSWORD, so seeding does not have to compute it
+ADMIN_PASSWORD_HASH = os.getenv('ADMIN_PASSWORD_HASH', '')
+# The schema is migrated and seeded once per deployment with `python -m api.seed --migrate`; set both to
+# true to create the missing tables and seed on every startup instead, e.g. for a throwaway database
+CREATE_SCHEMA_ON_STARTUP = os.getenv('CREATE_SCHEMA_ON_STARTUP', 'false').lower() == 'true'
+SEED_ON_STARTUP = os.getenv('SEED_ON_STARTUP', 'false').lower() == 'true'
 
 # -------------------------- RATE LIMITING --------------------------
 LOGIN_RATE_LIMIT_PERIOD = int(os.getenv("LOGIN_RATE_LIMIT_PERIOD"))
 PASSWORD_RATE_LIMIT_PERIOD = int(os.getenv("PASSWORD_RATE_LIMIT_PERIOD"))
+# One of "fixed_window", "sliding_window_log" or "token_bucket"
+LOGIN_RATE_LIMIT_ALGORITHM = os.getenv("LOGIN_RATE_LIMIT_ALGORITHM", "fixed_window")
+PASSWORD_RATE_LIMIT_ALGORITHM = os.getenv("PASSWORD_RATE_LIMIT_ALGORITHM", "fixed_window")
+
+# -------------------------- ZOOM HTTP CLIENT --------------------------
+ZOOM_HTTP_TIMEOUT = float(os.getenv("ZOOM_HTTP_TIMEOUT", "10"))
+ZOOM_HTTP_CONNECT_TIMEOUT = float(os.getenv("ZOOM_HTTP_CONNECT_TIMEOUT", "5"))
+ZOOM_HTTP_MAX_CONNECTIONS = int(os.getenv("ZOOM_HTTP_MAX_CONNECTIONS", "20"))
+ZOOM_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("ZOOM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+ZOOM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("ZOOM_HTTP_KEEPALIVE_EXPIRY", "30"))
+
+# -------------------------- ZOOM RESILIENCE --------------------------
+# Total seconds a Zoom call may take, retries included
+ZOOM_CALL_DEADLINE = float(os.getenv("ZOOM_CALL_DEADLINE", "20"))
+ZOOM_RETRY_ATTEMPTS = int(os.getenv("ZOOM_RETRY_ATTEMPTS", "3"))
+ZOOM_RETRY_BASE_DELAY = float(os.getenv("ZOOM_RETRY_BASE_DELAY", "0.5"))
+ZOOM_RETRY_MAX_DELAY = float(os.getenv("ZOOM_RETRY_MAX_DELAY", "5"))
+ZOOM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("ZOOM_BREAKER_FAILURE_THRESHOLD", "5"))
+ZOOM_BREAKER_RESET_TIMEOUT = float(os.getenv("ZOOM_BREAKER_RESET_TIMEOUT", "30"))
+# Seconds before a slow GET to Zoom is sent a second time, 0 to disable hedging
+ZOOM_HEDGE_DELAY = float(os.getenv("ZOOM_HEDGE_DELAY", "0"))
+
+# -------------------------- ZOOM ACCESS TOKEN CACHE --------------------------
+ZOOM_TOKEN_CACHE_BACKEND = os.getenv("ZOOM_TOKEN_CACHE_BACKEND", "memory")  # "memory" or "redis"
+ZOOM_TOKEN_REFRESH_MARGIN = float(os.getenv("ZOOM_TOKEN_REFRESH_MARGIN", "300"))
+
+# -------------------------- REDIS CONFIGURATION --------------------------
+REDIS_HOST = os.getenv("REDIS_HOST", "redis")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+# Times a command is sent again on a new connection after its connection was dropped, e.g. by a Redis restart
+REDIS_RECONNECT_ATTEMPTS = int(os.getenv("REDIS_RECONNECT_ATTEMPTS", "1"))
+
+# -------------------------- PASSWORD HASHING --------------------------
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # "thread" or "process"
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 4)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+# -------------------------- EMAIL OUTBOX WORKER --------------------------
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+EMAIL_OUTBOX_POLL_INTERVAL = float(os.getenv("EMAIL_OUTBOX_POLL_INTERVAL", "2"))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "5"))
+EMAIL_OUTBOX_RETRY_BACKOFF = float(os.getenv("EMAIL_OUTBOX_RETRY_BACKOFF", "30"))
+EMAIL_OUTBOX_IN_PROCESS = os.getenv("EMAIL_OUTBOX_IN_PROCESS", "false").lower() == "true"
+
+# -------------------------- SMTP CONNECTION POOL --------------------------
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("SMTP_POOL_HEALTH_CHECK_INTERVAL", "60"))
+SMTP_POOL_MAX_LIFETIME = float(os.getenv("SMTP_POOL_MAX_LIFETIME", "600"))
+
+# -------------------------- ADMIN USER LISTING --------------------------
+READ_USERS_DEFAULT_LIMIT = int(os.getenv("READ_USERS_DEFAULT_LIMIT", "50"))
+READ_USERS_MAX_LIMIT = int(os.getenv("READ_USERS_MAX_LIMIT", "500"))
+EXPORT_USERS_BATCH_SIZE = int(os.getenv("EXPORT_USERS_BATCH_SIZE", "500"))
+
+# -------------------------- IDENTITY CACHE --------------------------
+IDENTITY_CACHE_BACKEND = os.getenv("IDENTITY_CACHE_BACKEND", "memory")  # "memory" or "redis"
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "5"))
+IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "10000"))
+
+# -------------------------- ZOOM WEBHOOKS --------------------------
+# Secret Token of the Zoom app, used to check the signature of the webhook requests
+ZOOM_WEBHOOK_SECRET_TOKEN = os.getenv("ZOOM_WEBHOOK_SECRET_TOKEN")
+# Oldest x-zm-request-timestamp accepted, in seconds, so captured requests cannot be replayed later
+ZOOM_WEBHOOK_MAX_AGE = float(os.getenv("ZOOM_WEBHOOK_MAX_AGE", "300"))
+ZOOM_WEBHOOK_BATCH_SIZE = int(os.getenv("ZOOM_WEBHOOK_BATCH_SIZE", "200"))
+ZOOM_WEBHOOK_POLL_INTERVAL = float(os.getenv("ZOOM_WEBHOOK_POLL_INTERVAL", "1"))
+ZOOM_WEBHOOK_MAX_ATTEMPTS = int(os.getenv("ZOOM_WEBHOOK_MAX_ATTEMPTS", "5"))
+ZOOM_WEBHOOK_IN_PROCESS = os.getenv("ZOOM_WEBHOOK_IN_PROCESS", "false").lower() == "true"
+
+# -------------------------- IDEMPOTENCY KEYS --------------------------
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+IDEMPOTENCY_LOCK_TTL = int(os.getenv("IDEMPOTENCY_LOCK_TTL", "60"))
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "30"))
+IDEMPOTENCY_POLL_INTERVAL = float(os.getenv("IDEMPOTENCY_POLL_INTERVAL", "0.05"))
+
+# -------------------------- REQUEST TIMING --------------------------
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "true").lower() == "true"
 
+# -------------------------- METRICS --------------------------
+# Directory shared by the uvicorn workers to aggregate their metrics, empty for a single process
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+METRICS_UPDATE_INTERVAL = float(os.getenv("METRICS_UPDATE_INTERVAL", "5"))
@@ -0,0 +1,46 @@
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+# -------------------------- CONNECTION POOL --------------------------
+# Connections kept open per engine, and extra ones opened under load and closed when returned
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+# Seconds a request waits for a connection before failing with a pool TimeoutError
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+# Seconds after which a connection is replaced, before the server or a proxy drops it. -1 disables it
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+# Check connections with a lightweight ping on checkout and replace the dead ones
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+
+
+# -------------------------- QUERIES --------------------------
+# Milliseconds after which the server cancels a statement. 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000'))
+
+
+def engine_options(async_driver: bool = False) -> dict:
+    """
+    Build the keyword arguments of create_engine / create_async_engine from the settings above.
+
+    Args:
+        async_driver (bool): Whether the engine uses asyncpg instead of psycopg2. They take the
+            per-connection server settings in different arguments.
+
+    Returns:
+        dict: The engine keyword arguments.
+    """
+    if async_driver:
+        connect_args = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+    else:
+        connect_args = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
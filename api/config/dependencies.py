@@ -6,8 +6,10 @@ from jose import JWTError, jwt, ExpiredSignatureError
 from .. import models, schemas
 from ..config.constants import ACCESS_TOKEN_SECRET_KEY, ALGORITHM
 from ..config.exceptions import credentials_exception, expired_token_exception
-from sqlalchemy.orm import Session
 from ..database import get_db
+from ..services.database_service import DatabaseSession
+from ..services.user_service import UserService
+from ..utils.identity_cache import CurrentUser, get_identity_cache
 
 
 class OAuth2PasswordBearerWithCookie(SecurityBase):
@@ -30,16 +32,18 @@ class OAuth2PasswordBearerWithCookie(SecurityBase):
 oauth2_scheme = OAuth2PasswordBearerWithCookie()
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session= Depends(get_db)) -> models.User:
+async def get_current_user(token: str = Depends(oauth2_scheme), db: DatabaseSession= Depends(get_db)) -> CurrentUser:
     """
-    Retrieve the current authenticated user from the database using the provided JWT token.
+    Retrieve the current authenticated user using the provided JWT token.
+
+    The user is read from the identity cache when possible, and from the database otherwise.
 
     Args:
         token (str, optional): The JWT token provided by the user. Defaults to Depends(oauth2).
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        db (DatabaseSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        models.User: The authenticated user object.
+        CurrentUser: A snapshot of the authenticated user.
 
     Raises:
         HTTPException: If the token is expired or invalid, or if the user is not found.
@@ -57,22 +61,30 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session= Depends(g
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+    identity_cache = get_identity_cache()
+    token_exp = int(payload.get("exp", 0))
+    current_user = await identity_cache.get(token_data.email, token_exp)
+    if current_user is not None:
+        return current_user
+
+    user = await UserService(db).get_user_by_email(token_data.email)
     if user is None:
         raise credentials_exception
-    
-    return user
+
+    current_user = CurrentUser.model_validate(user)
+    await identity_cache.set(token_data.email, token_exp, current_user)
+    return current_user
 
 
-def get_current_active_user(current_user: models.User = Depends(get_current_user)) -> models.User:
+def get_current_active_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     """
     Retrieve the authenticated and active user from the database
 
     Args:
-        current_user (User) : Provided by the get_current_user function
+        current_user (CurrentUser) : Provided by the get_current_user function
 
     Returns:
-        models.User: The active and authenticated user object.
+        CurrentUser: The active and authenticated user.
 
     Raises:
         HTTPException: If the user is not active
@@ -82,15 +94,15 @@ def get_current_active_user(current_user: models.User = Depends(get_current_user
     return current_user
 
 
-def get_current_admin_user(current_user: models.User = Depends(get_current_active_user)) -> models.User:
+def get_current_admin_user(current_user: CurrentUser = Depends(get_current_active_user)) -> CurrentUser:
     """
     Retrieve user if it has the ADMIN role
 
     Args:
-        current_user (User) : Provided by the get_current_active_user function
+        current_user (CurrentUser) : Provided by the get_current_active_user function
 
     Returns:
-        models.User: The active, authenticated and ADMIN user object.
+        CurrentUser: The active, authenticated and ADMIN user.
 
     Raises:
         HTTPException: If the user has not ADMIN role
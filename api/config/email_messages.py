@@ -1,3 +1,6 @@
+# Legacy f-string versions of the emails in api/templates/emails.
+# They are no longer used to send email and are kept as the baseline of benchmarks/bench_email_templates.py.
+
 confirmation_message = lambda token: f'''
         <!DOCTYPE html>
         <html lang="en">
@@ -1,4 +1,6 @@
+import math
 from fastapi import HTTPException, status
+from typing import Optional
 
 credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -12,6 +14,12 @@ expired_token_exception = HTTPException(
         headers={"WWW-Authenticate": "Bearer"}
     )
 
+server_busy_exception = HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="The server is busy, please try again later.",
+        headers={"Retry-After": "1"}
+    )
+
 class GetMeetingError(Exception):
     pass
 
@@ -22,4 +30,36 @@ class PatchMeetingError(Exception):
     pass
 
 class DeleteMeetingError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class ServiceUnavailableError(Exception):
+    """
+    An outbound service is down, rate limiting us, or its circuit breaker is open.
+
+    Attributes:
+        service (str): The name of the service, e.g. "zoom".
+        retry_after (Optional[float]): Seconds after which the service may be available again, if known.
+    """
+
+    def __init__(self, service: str, retry_after: Optional[float] = None):
+        super().__init__(f"{service} is not available")
+        self.service = service
+        self.retry_after = retry_after
+
+
+def service_unavailable_exception(error: ServiceUnavailableError) -> HTTPException:
+    """
+    Build the response sent when an outbound service the request depends on is unavailable.
+
+    Args:
+        error (ServiceUnavailableError): The error raised by the call to the service.
+
+    Returns:
+        HTTPException: A 503 error with a Retry-After header.
+    """
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"{error.service.capitalize()} is not available right now, please try again later.",
+        headers={"Retry-After": str(max(math.ceil(error.retry_after or 0), 1))}
+    )
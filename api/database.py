@@ -1,20 +1,51 @@
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine 
-from .config.constants import SQLALCHEMY_DATABASE_URL
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from .config.constants import SQLALCHEMY_DATABASE_URL, DATABASE_MODE, ASYNC_DATABASE_URL
+from .config.database import engine_options
+from .utils.pool_metrics import TimedQueuePool, TimedAsyncAdaptedQueuePool, instrument_pool
+from .utils.request_timing import instrument_queries
 
 
 # Creating the conncetion engine for POSTGRESQL
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass= TimedQueuePool, **engine_options())
+instrument_pool(engine.pool, "sync")
+instrument_queries(engine)
 
 SessionLocal = sessionmaker(autocommit= False, autoflush= False, bind= engine)
 
+# Async engine used to serve requests when DATABASE_MODE is "async". Startup tasks and the
+# outbox worker keep using the sync engine above.
+async_engine = None
+AsyncSessionLocal = None
+if DATABASE_MODE == "async":
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL or make_url(SQLALCHEMY_DATABASE_URL).set(drivername="postgresql+asyncpg"),
+        poolclass= TimedAsyncAdaptedQueuePool,
+        **engine_options(async_driver= True)
+    )
+    instrument_pool(async_engine.sync_engine.pool, "async")
+    instrument_queries(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush= False, expire_on_commit= False)
+
 # Declarative base for ORM models
 Base = declarative_base()
 
-def get_db():
+async def get_db():
+    """
+    Provide a database session for the duration of a request.
+
+    Yields an AsyncSession when DATABASE_MODE is "async" and a Session otherwise. The services
+    accept both (see services.database_service.DatabaseService).
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
     db= SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
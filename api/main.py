@@ -1,44 +1,73 @@
 from fastapi import FastAPI, Depends
 from fastapi.openapi.utils import get_openapi
 from sqlalchemy.orm import Session
-from . import models
-from .database import engine, SessionLocal
-from . import models
+from .database import async_engine, SessionLocal
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import password_reset, meetings, auth, admins
+from .routers import password_reset, meetings, auth, admins, metrics, webhooks
 from starlette.middleware.sessions import SessionMiddleware
-from .config.constants import GOOGLE_OAUTH_SECRET_KEY, ADMIN_EMAIL, ADVISOR_EMAIL, ADVISOR_NAME, ADMIN_PASSWORD
+from .config.constants import (
+    GOOGLE_OAUTH_SECRET_KEY, EMAIL_OUTBOX_IN_PROCESS, ZOOM_WEBHOOK_IN_PROCESS, SERVER_TIMING_HEADER, PROMETHEUS_MULTIPROC_DIR, METRICS_UPDATE_INTERVAL,
+    CREATE_SCHEMA_ON_STARTUP, SEED_ON_STARTUP
+    )
+from .utils.zoom_utils import open_zoom_client, close_zoom_client
+from .utils.redis_utils import close_redis_client
+from .utils.password_utils import password_hasher
+from .utils.smtp_pool import open_smtp_pool, close_smtp_pool
+from .utils.email_templates import email_templates
+from .utils.advisor_schedule import get_advisor_schedule
+from .utils.request_timing import ServerTimingMiddleware
+from .utils.idempotency import IdempotencyMiddleware
+from .utils.metrics import update_process_metrics_periodically, mark_process_dead
+from .services.database_service import DatabaseService
+from .workers.email_outbox import EmailOutboxWorker
+from .workers.zoom_webhooks import ZoomWebhookWorker
+from .seed import create_schema, seed_database
+import asyncio
 from contextlib import asynccontextmanager
 
-models.Base.metadata.create_all(bind=engine)
-
-admin_password = models.crypt.hash(ADMIN_PASSWORD)
-
 @asynccontextmanager
 async def lifespan(app:FastAPI):
     db: Session = SessionLocal()
+    outbox_task = None
+    webhook_task = None
+    metrics_task = None
     try:
-        admin = db.query(models.User).filter(models.User.email == ADMIN_EMAIL).first()
-        advisor = db.query(models.Advisor).filter(models.Advisor.email == ADVISOR_EMAIL).first()
-        if not admin:
-            admin = models.User(
-                first_name="Matheww", 
-                lastname="Drawer", 
-                email=ADMIN_EMAIL, 
-                password_hash = admin_password, # Password is admin123
-                is_active=True,
-                role='ADMIN'
-            )
-            db.add(admin)
-            db.commit()
-        
-        if not advisor:
-            advisor = models.Advisor(name= ADVISOR_NAME, email=ADVISOR_EMAIL)
-            db.add(advisor)
-            db.commit()
+        if CREATE_SCHEMA_ON_STARTUP:
+            create_schema()
+        if SEED_ON_STARTUP:
+            seed_database(db)
+
+        email_templates.compile()
+        await get_advisor_schedule().rebuild(DatabaseService(db))
+        await open_zoom_client()
+        smtp_pool = await open_smtp_pool()
+        if EMAIL_OUTBOX_IN_PROCESS:
+            outbox_worker = EmailOutboxWorker(smtp_pool=smtp_pool)
+            outbox_task = asyncio.create_task(outbox_worker.run())
+        if ZOOM_WEBHOOK_IN_PROCESS:
+            webhook_worker = ZoomWebhookWorker()
+            webhook_task = asyncio.create_task(webhook_worker.run())
+        if PROMETHEUS_MULTIPROC_DIR:
+            # The scrapes served by the other workers read the gauges of this one from the shared directory
+            metrics_task = asyncio.create_task(update_process_metrics_periodically(METRICS_UPDATE_INTERVAL))
         yield
     finally:
         db.close()
+        if metrics_task is not None:
+            metrics_task.cancel()
+            mark_process_dead()
+        if outbox_task is not None:
+            outbox_worker.stop()
+            await outbox_task
+        if webhook_task is not None:
+            webhook_worker.stop()
+            await webhook_task
+        await close_smtp_pool()
+        await close_zoom_client()
+        await close_redis_client()
+        password_hasher.shutdown()
+        if async_engine is not None:
+            await async_engine.dispose()
 
 
 app = FastAPI(lifespan= lifespan)
@@ -79,7 +108,13 @@ app.add_middleware(
 )
 
 app.add_middleware(SessionMiddleware, secret_key= GOOGLE_OAUTH_SECRET_KEY)
+# Retries of these routes after a timeout must not create, edit or delete the Zoom meeting twice
+app.add_middleware(IdempotencyMiddleware, routes=("/schedule-meeting/", "/edit/meeting/{meeting_id}", "/delete/meeting/{meeting_id}"))
+# Added last so it is the outermost middleware and times the whole request
+app.add_middleware(ServerTimingMiddleware, server_timing_header= SERVER_TIMING_HEADER)
 app.include_router(auth.router)
 app.include_router(password_reset.router)
 app.include_router(meetings.router)
-app.include_router(admins.router)
\ No newline at end of file
+app.include_router(admins.router)
+app.include_router(metrics.router)
+app.include_router(webhooks.router)
\ No newline at end of file
@@ -1,12 +1,35 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Enum
+from sqlalchemy import BigInteger, Boolean, Column, ForeignKey, Index, Integer, String, DateTime, Enum, Text
+from sqlalchemy.types import TypeDecorator
 from passlib.context import CryptContext
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone, timedelta
+from dateutil import parser
 from .database import Base
 import enum
 
 crypt = CryptContext(schemes=["bcrypt"])
 
+# Time a user has to wait after scheduling a meeting before scheduling another one
+MEETING_SCHEDULING_INTERVAL = timedelta(days=7)
+
+
+class NaiveUTCDateTime(TypeDecorator):
+    """
+    A `TIMESTAMP WITHOUT TIME ZONE` column holding UTC times.
+
+    psycopg2 accepts ISO strings and aware datetimes for these columns, but asyncpg rejects both, so
+    values are converted to naive UTC datetimes before they are bound. The column type is unchanged.
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, str):
+            value = parser.parse(value)
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
 class UserRole(enum.Enum):
     REGULAR = "REGULAR"
     ADMIN = "ADMIN"
@@ -45,7 +68,7 @@ class User(Base):
     phone_number= Column(String, unique= True, nullable=True)
     password_hash= Column(String, nullable= True)
     document= Column(String, unique= True, nullable= True)
-    date_of_creation= Column(DateTime, default= lambda: datetime.now(timezone.utc))
+    date_of_creation= Column(NaiveUTCDateTime, default= lambda: datetime.now(timezone.utc))
     last_meeting_scheduled = Column(DateTime(timezone=True), default=None)
     is_active = Column(Boolean, default= False, nullable= False)
     role = Column(Enum(UserRole), default=UserRole.REGULAR, nullable=False)
@@ -56,18 +79,6 @@ class User(Base):
     email_confirmation_tokens = relationship('EmailConfirmationToken', back_populates='user', cascade= "all, delete-orphan")
     
 
-    def verify_password(self, plain_password: str):
-        """
-        Verify the provided plain password against the stored password hash.
-
-        Args:
-            plain_password (str): The plain text password to verify.
-
-        Returns:
-            bool: True if the password matches, False otherwise.
-        """
-        return crypt.verify(plain_password, self.password_hash)
-    
     def can_schedule_meeting(self):
         """
         Check if the user can schedule a new meeting.
@@ -81,7 +92,7 @@ class User(Base):
         # Se verifica si han pasado al menos 7 dias desde la última cita agendada.
         last_meeting_date = self.last_meeting_scheduled
         now = datetime.now(timezone.utc)
-        if now - last_meeting_date >= timedelta(days=7):
+        if now - last_meeting_date >= MEETING_SCHEDULING_INTERVAL:
             return True
         else:
             return False
@@ -104,7 +115,7 @@ class PasswordResetToken(Base):
     token= Column(String, unique=True, nullable= False)
     user_id = Column(Integer, ForeignKey('users.id'), nullable= False)
     is_used = Column(Boolean, default= False, nullable= False)
-    expiry = Column(DateTime, nullable=False)
+    expiry = Column(NaiveUTCDateTime, nullable=False)
 
     # Relationship with the USER
     user = relationship('User', back_populates='reset_tokens')
@@ -128,12 +139,18 @@ class EmailConfirmationToken(Base):
     token = Column(String, unique=True, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     is_used = Column(Boolean, default=False, nullable=False)
-    expiry = Column(DateTime, nullable=False)
+    expiry = Column(NaiveUTCDateTime, nullable=False)
 
     # Relationship with the User
     user = relationship('User', back_populates= 'email_confirmation_tokens')
 
 
+class MeetingStatus(enum.Enum):
+    SCHEDULED = "SCHEDULED"
+    STARTED = "STARTED"
+    ENDED = "ENDED"
+
+
 class Meeting(Base):
     """
     Represents a meeting scheduled between a user and an advisor.
@@ -146,16 +163,20 @@ class Meeting(Base):
         join_url (str): The URL to join the Zoom meeting.
         user_id (int): The foreign key to the user.
         advisor_id (int): The foreign key to the advisor.
+        status (MeetingStatus): Whether the meeting is scheduled, started or ended, as reported by the Zoom webhooks.
+        zoom_event_ts (int): Time, in milliseconds, of the last Zoom webhook event applied to the meeting.
         user (User): The user who scheduled the meeting.
         advisor (Advisor): The advisor assigned to the meeting.
     """
     __tablename__ = 'meetings'
 
     id = Column(Integer, primary_key=True)
-    start_time = Column(DateTime)
+    start_time = Column(NaiveUTCDateTime)
     topic = Column(String)
     zoom_meeting_id = Column(String, unique=True)
     join_url = Column(String, unique=True)
+    status = Column(Enum(MeetingStatus), default=MeetingStatus.SCHEDULED, server_default=MeetingStatus.SCHEDULED.value, nullable=False)
+    zoom_event_ts = Column(BigInteger, nullable=True)
     
     # Llave foránea de Advisor
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -163,6 +184,9 @@ class Meeting(Base):
     advisor = relationship("Advisor", back_populates="meetings")
     user = relationship("User", back_populates='meetings')
 
+    # Finds the meetings of an advisor around a start time, see `find_overlapping_meeting`
+    __table_args__ = (Index("ix_meetings_advisor_id_start_time", "advisor_id", "start_time"),)
+
 
 class Advisor(Base):
     """
@@ -180,9 +204,48 @@ class Advisor(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     email = Column(String, nullable=False, unique=True)
-    last_assigned_time = Column(DateTime, default= lambda: datetime.now(timezone.utc))
+    last_assigned_time = Column(NaiveUTCDateTime, default= lambda: datetime.now(timezone.utc), index= True)
     
     # Relación con reuniones
     meetings = relationship("Meeting", back_populates="advisor")
 
 
+class EmailOutboxStatus(enum.Enum):
+    PENDING = "PENDING"
+    SENT = "SENT"
+    DEAD = "DEAD"
+
+
+class EmailOutbox(Base):
+    """
+    Represents an outgoing email waiting to be delivered by the outbox worker.
+
+    Rows are added in the same transaction as the business change that triggers the email,
+    so an email is only sent if that change was committed.
+
+    Attributes:
+        id (int): The primary key of the message.
+        recipient (str): The email address the message is sent to.
+        subject (str): The subject of the message.
+        body (str): The rendered body of the message.
+        subtype (str): The MIME subtype of the body (e.g., "html").
+        status (EmailOutboxStatus): PENDING until delivered (SENT) or given up on (DEAD).
+        attempts (int): The number of delivery attempts made so far.
+        next_attempt_at (datetime): The earliest time the next delivery attempt can be made.
+        last_error (str): The error raised by the last failed delivery attempt.
+        created_at (datetime): The timestamp when the message was queued.
+        sent_at (datetime): The timestamp when the message was delivered.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    subtype = Column(String, nullable=False, default="html")
+    status = Column(Enum(EmailOutboxStatus), default=EmailOutboxStatus.PENDING, nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,37 +1,94 @@
-from fastapi import APIRouter, Depends
-from typing import List
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from typing import AsyncIterator, List, Optional, Union
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..config.dependencies import get_current_admin_user
+from ..utils.identity_cache import CurrentUser
 from .. import models, schemas
 from ..database import get_db
+from ..services.database_service import DatabaseSession
 from ..services.user_service import AdminService
+from ..config.constants import READ_USERS_DEFAULT_LIMIT, READ_USERS_MAX_LIMIT, EXPORT_USERS_BATCH_SIZE
 
 router = APIRouter(tags=["Special Routes"])
 
 @router.get("/admin/read-user/{user_id}", response_model= schemas.User, dependencies=[Depends(get_current_admin_user)])
-async def read_user_by_id(user_id: int, current_user: models.User= Depends(get_current_admin_user), db: Session = Depends(get_db)):
+async def read_user_by_id(user_id: int, current_user: CurrentUser = Depends(get_current_admin_user), db: DatabaseSession = Depends(get_db)):
     admin_service = AdminService(db)
-    return admin_service.get_user_by_id(user_id) 
+    return await admin_service.get_user_by_id(user_id, with_relationships=True)
 
 
 @router.put("/admin/modify-user-account/{user_id}", response_model= schemas.User, dependencies=[Depends(get_current_admin_user)])
-async def modify_user_account(user_id: int, user_update: schemas.UserUpdate, current_user: models.User= Depends(get_current_admin_user), db: Session = Depends(get_db)):
+async def modify_user_account(user_id: int, user_update: schemas.UserUpdate, current_user: CurrentUser = Depends(get_current_admin_user), db: DatabaseSession = Depends(get_db)):
     admin_service = AdminService(db)
-    return admin_service.update_user(user_id, user_update)
+    db_user = await admin_service.update_user(user_id, user_update)
+    return await admin_service.get_user_by_id(db_user.id, with_relationships=True)
 
 
 @router.post("/admin/create-new-account", response_model= schemas.User, dependencies=[Depends(get_current_admin_user)])
-async def create_new_account(user_create: schemas.UserCreateByAdmin, current_user: models.User= Depends(get_current_admin_user), db: Session = Depends(get_db)):
+async def create_new_account(user_create: schemas.UserCreateByAdmin, current_user: CurrentUser = Depends(get_current_admin_user), db: DatabaseSession = Depends(get_db)):
     admin_service = AdminService(db)
-    return admin_service.create_user(user_create)
+    db_user = await admin_service.create_user(user_create)
+    return await admin_service.get_user_by_id(db_user.id, with_relationships=True)
 
 
 @router.delete("/admin/delete-user-account/{user_id}", response_model= schemas.User,dependencies=[Depends(get_current_admin_user)])
-async def delete_user_account(user_id: int, current_user: models.User= Depends(get_current_admin_user), db: Session = Depends(get_db)):
+async def delete_user_account(user_id: int, current_user: CurrentUser = Depends(get_current_admin_user), db: DatabaseSession = Depends(get_db)):
     admin_service = AdminService(db)
-    return admin_service.delete_user(user_id)
+    return await admin_service.delete_user(user_id)
 
 
-@router.get("/admin/read-users", response_model= List[schemas.User], dependencies=[Depends(get_current_admin_user)])
-async def read_users(current_user: models.User = Depends(get_current_admin_user), db: Session = Depends(get_db)):
-    return db.query(models.User).filter().all()
\ No newline at end of file
+USER_VIEW_ADAPTERS = {
+    schemas.UserView.FULL: TypeAdapter(List[schemas.User]),
+    schemas.UserView.SUMMARY: TypeAdapter(List[schemas.UserSummary]),
+}
+
+
+@router.get(
+    "/admin/read-users",
+    response_class=Response,
+    responses={200: {"model": Union[List[schemas.User], List[schemas.UserSummary]], "description": "A page of users. The cursor of the next page is in the X-Next-Cursor header."}},
+    dependencies=[Depends(get_current_admin_user)])
+async def read_users(
+    cursor: Optional[int] = Query(None, description="ID of the last user of the previous page"),
+    limit: int = Query(READ_USERS_DEFAULT_LIMIT, ge=1, le=READ_USERS_MAX_LIMIT),
+    view: schemas.UserView = schemas.UserView.FULL,
+    current_user: CurrentUser = Depends(get_current_admin_user),
+    db: DatabaseSession = Depends(get_db)):
+    admin_service = AdminService(db)
+    users = await admin_service.get_users_page(cursor, limit, view)
+
+    adapter = USER_VIEW_ADAPTERS[view]
+    headers = {"X-Next-Cursor": str(users[-1].id)} if len(users) == limit else {}
+    return Response(content=adapter.dump_json(adapter.validate_python(users, from_attributes=True)), media_type="application/json", headers=headers)
+
+
+@router.get(
+    "/admin/export-users",
+    response_class=StreamingResponse,
+    responses={200: {"model": Union[List[schemas.User], List[schemas.UserSummary]], "description": "Every user, streamed as a JSON array."}},
+    dependencies=[Depends(get_current_admin_user)])
+async def export_users(view: schemas.UserView = schemas.UserView.FULL, current_user: CurrentUser = Depends(get_current_admin_user), db: DatabaseSession = Depends(get_db)):
+    admin_service = AdminService(db)
+    adapter = USER_VIEW_ADAPTERS[view]
+
+    # The database session is released when this function returns; the generator below uses it again
+    # while the response is streamed, reading the users in keyset batches, and closes it at the end.
+    async def generate() -> AsyncIterator[bytes]:
+        try:
+            yield b"["
+            first = True
+            async for page in admin_service.iter_user_pages(view, EXPORT_USERS_BATCH_SIZE):
+                chunk = adapter.dump_json(adapter.validate_python(page, from_attributes=True))[1:-1]
+                if chunk:
+                    yield chunk if first else b"," + chunk
+                    first = False
+            yield b"]"
+        finally:
+            if isinstance(db, AsyncSession):
+                await db.close()
+            else:
+                db.close()
+
+    return StreamingResponse(generate(), media_type="application/json")
\ No newline at end of file
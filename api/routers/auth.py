@@ -1,14 +1,16 @@
 # --------------------- UTILS! ---------------------
 from ..utils.auth_utils import authenticate_user, create_access_token
 from ..utils.rate_limiting import rate_limit_exceeded
+from ..utils.redis_utils import get_redis_client
 
 # --------------------- SERVICES! ---------------------
 from ..services.user_service import UserService
 from ..services.token_service import EmailConfirmationTokenService
 from ..services.email_service import EmailService
 from ..config.dependencies import get_current_user
+from ..utils.identity_cache import CurrentUser
 
-from ..config.constants import ACCESS_TOKEN_EXPIRE_MINUTES, LOGIN_RATE_LIMIT_PERIOD, GOOGLE_OAUTH_CLIENT_ID, GOOGLE_OAUTH_SECRET_CLIENT
+from ..config.constants import ACCESS_TOKEN_EXPIRE_MINUTES, LOGIN_RATE_LIMIT_PERIOD, LOGIN_RATE_LIMIT_ALGORITHM, GOOGLE_OAUTH_CLIENT_ID, GOOGLE_OAUTH_SECRET_CLIENT
 from ..config.dependencies import oauth2_scheme
 
 from fastapi.security import OAuth2PasswordRequestForm
@@ -17,11 +19,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from ..database import get_db
 from .. import schemas, models
 
-from sqlalchemy.orm import Session
+from ..services.database_service import DatabaseSession
 from datetime import timedelta
 
-import redis
-
 from authlib.integrations.starlette_client import OAuth, OAuthError
 from starlette.requests import Request
 from starlette.responses import Response
@@ -41,14 +41,13 @@ oauth.register(
 )
 
 router = APIRouter(tags=["Login and Registration"])
-redis_client = redis.Redis(host='redis', port=6379, db=0, decode_responses= True)
 
 @router.post("/login")
 async def login(
     response: Response,
     request: Request,
     form_data: OAuth2PasswordRequestForm= Depends(),
-    db: Session= Depends(get_db)
+    db: DatabaseSession = Depends(get_db)
     ):
     """
     Authenticate a user and issue an access token.
@@ -59,7 +58,7 @@ async def login(
         response (Response): The response object to set cookies.
         request (Request): The request object to get the client's IP address.
         form_data (OAuth2PasswordRequestForm): The form data containing the user's email and password.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        db (DatabaseSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
         dict: A dictionary containing the access token, token type, and user's email.
@@ -72,7 +71,7 @@ async def login(
     client_ip = request.client.host
     identifier = f"{client_ip}:{username}"
 
-    if rate_limit_exceeded(redis_client= redis_client, identifier= identifier, max_requests= 5, period= LOGIN_RATE_LIMIT_PERIOD):
+    if await rate_limit_exceeded(redis_client= get_redis_client(), identifier= identifier, max_requests= 5, period= LOGIN_RATE_LIMIT_PERIOD, algorithm= LOGIN_RATE_LIMIT_ALGORITHM):
         raise HTTPException(status_code=429, detail="Too many login attempts. Please try again later.")
     
     user = await authenticate_user(db, form_data.username, form_data.password)
@@ -114,14 +113,14 @@ async def login_google(request: Request):
 
 
 @router.get("/auth")
-async def auth(response: Response, request: Request, db: Session= Depends(get_db)):
+async def auth(response: Response, request: Request, db: DatabaseSession = Depends(get_db)):
     """
     Handle the callback from Google OAuth 2.0 and authenticate the user.
 
     Args:
         response (Response): The response object to set cookies.
         request (Request): The request object containing the authorization response from Google.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        db (DatabaseSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
         dict: A dictionary containing the access token, token type, and user's email.
@@ -143,30 +142,30 @@ async def auth(response: Response, request: Request, db: Session= Depends(get_db
         user_lastname = user_info['family_name']
 
         user_service = UserService(db)
-        user_db = user_service.get_user_by_email(user_email)
+        user_db = await user_service.get_user_by_email(user_email)
 
         if not user_db:
-            user_created = user_service.create_user_google(schemas.UserCreateGoogle(
+            user_created = await user_service.create_user_google(schemas.UserCreateGoogle(
                 first_name=user_first_name,
                 lastname=user_lastname,
                 email=user_email,
                 google_access_token=google_access_token
             ))
             token_service = EmailConfirmationTokenService(db)
-            email_service = EmailService()
+            email_service = EmailService(db)
 
             # Generating email confirmation token
             token_data = {"sub" : user_created.email, "aud" : "email-confirmation"}
             token, expiry = await token_service.create_token(data= token_data)
 
-            # Inserting the new token to the database
-            token_service.insert_token(user_created.id, token, expiry)
+            # Queuing the confirmation email, it is committed along with the new token
+            email_service.queue_confirmation_account_message(user_created.email, token)
 
-            # Sending confirmation email
-            await email_service.send_confirmation_account_message(user_created.email, token)
+            # Inserting the new token to the database
+            await token_service.insert_token(user_created.id, token, expiry)
  
         else:
-            user_service.update_user(user_db.id, schemas.UserUpdate(google_access_token=google_access_token))
+            await user_service.update_user(user_db.id, schemas.UserUpdate(google_access_token=google_access_token))
     
     access_token = await create_access_token(data={"sub": user_email})
 
@@ -182,7 +181,7 @@ async def auth(response: Response, request: Request, db: Session= Depends(get_db
 
 
 @router.post("/register", status_code= 201)
-async def new_user_registration(user: schemas.UserCreate,db: Session = Depends(get_db)):
+async def new_user_registration(user: schemas.UserCreate,db: DatabaseSession = Depends(get_db)):
     """
     Register a new user.
 
@@ -190,7 +189,7 @@ async def new_user_registration(user: schemas.UserCreate,db: Session = Depends(g
 
     Args:
         user (schemas.UserCreate): The data required to create a new user.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        db (DatabaseSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
         dict: A message confirming successful registration and the generated token.
@@ -199,50 +198,37 @@ async def new_user_registration(user: schemas.UserCreate,db: Session = Depends(g
         HTTPException: If the email, phone number, or document is already registered (status code 400).
         HTTPException: If the password is less than 7 characters long (status code 400).
     """
-    user_service = UserService(db)
-
-    exists_email = user_service.get_user_by_email(user_email= user.email)
-    exists_phone_number = user_service.get_user_by_phone_number(phone_number= user.phone_number) if user.phone_number is not None else None
-    exists_document = user_service.get_user_by_document(document=user.document) if user.document is not None else None
-
-    if exists_email:
-         raise HTTPException(status_code=400, detail="Email alredy registered")
-    
-    elif exists_phone_number:
-        raise HTTPException(status_code=400, detail="Phone number alredy registered")
-    
-    elif exists_document:
-        raise HTTPException(status_code=400, detail="Document alredy registered")
-
     if len(user.plain_password) < 7:
         raise HTTPException(status_code=400, detail="Password must be at least 7 characters long.")
 
-    user_created= user_service.create_user(user= user)
+    # A single insert, the unique constraints report an email, phone number or document already registered
+    user_service = UserService(db)
+    user_created= await user_service.create_user(user= user)
 
     token_service = EmailConfirmationTokenService(db)
-    email_service = EmailService()
+    email_service = EmailService(db)
 
     # Generating email confirmation token
     token_data = {"sub" : user.email, "aud" : "email-confirmation"}
     token, expiry = await token_service.create_token(data= token_data)
 
-    # Inserting the new token to the database
-    token_service.insert_token(user_created.id, token, expiry)
+    # Queuing the confirmation email, it is committed along with the new token
+    email_service.queue_confirmation_account_message(user.email, token)
 
-    # Sending confirmation email
-    await email_service.send_confirmation_account_message(user.email, token)
+    # Inserting the new token to the database, it is committed along with the new user and the email
+    await token_service.insert_token(user_created.id, token, expiry)
 
     return {"message" : "User registered successfully, please check your email to confirm your account."}
 
 
 @router.patch("/confirm-user-account")
-async def confirm_user_account(info: schemas.ConfirmBase, db: Session = Depends(get_db)):
+async def confirm_user_account(info: schemas.ConfirmBase, db: DatabaseSession = Depends(get_db)):
     """
     Confirm the user's account using the provided token.
 
     Args:
         info (ConfirmBase): The token required to confirm the user's account.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        db (DatabaseSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
         dict: A message confirming that the user's account has been activated.
@@ -254,32 +240,32 @@ async def confirm_user_account(info: schemas.ConfirmBase, db: Session = Depends(
     email = await token_service.verify_token(info.token)
     
     user_service = UserService(db)
-    user = user_service.get_user_by_email(email)
+    user = await user_service.get_user_by_email(email)
     if not user:
         raise HTTPException(status_code=404, detail= "User not found.")
     
     user_update = schemas.UserUpdate(is_active=True)
-    user_service.update_user(user.id, user_update)
+    await user_service.update_user(user.id, user_update)
     token_update = schemas.EmailConfirmationTokenUpdate(is_used=True)
-    token_service.update_token(info.token, token_update)
+    await token_service.update_token(info.token, token_update)
 
     return {"message" : "User account activated successfully"}
 
 
 @router.get("/get-token/confirm-user-account", dependencies=[Depends(oauth2_scheme)])
-async def get_confirmation_token(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):    
+async def get_confirmation_token(current_user: CurrentUser = Depends(get_current_user), db: DatabaseSession = Depends(get_db)):    
     if current_user.is_active:
         raise HTTPException(status_code= 400, detail="Your account is alredy active.")
     
     token_service = EmailConfirmationTokenService(db)  
-    email_service = EmailService()
+    email_service = EmailService(db)
 
     # Generating email confirmation token
     token_data = {"sub" : current_user.email, "aud" : "email-confirmation"}
     token, expiry = await token_service.create_token(data= token_data)
 
-    # Inserting the new token to the database
-    token_service.insert_token(current_user.id, token, expiry)
+    # Queuing the confirmation email, it is committed along with the new token
+    email_service.queue_confirmation_account_message(current_user.email, token)
 
-    # Sending confirmation email
-    await email_service.send_confirmation_account_message(current_user.email, token)
+    # Inserting the new token to the database
+    await token_service.insert_token(current_user.id, token, expiry)
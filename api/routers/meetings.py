@@ -3,11 +3,15 @@ from ..services.meeting_service import MeetingService
 from ..services.user_service import UserService
 from ..services.email_service import EmailService
 
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, Body, HTTPException, Depends, status
 from ..config.dependencies import oauth2_scheme, get_current_user, get_current_admin_user
+from ..config.exceptions import CreateMeetingError, ServiceUnavailableError, service_unavailable_exception
+from ..utils.identity_cache import CurrentUser
 
 from datetime import datetime, timezone
-from sqlalchemy.orm import Session
+from typing import Annotated, List
+from ..config.constants import BULK_MEETINGS_MAX_ITEMS
+from ..services.database_service import DatabaseSession
 from ..database import get_db
 from .. import models, schemas
 
@@ -18,8 +22,8 @@ router = APIRouter(tags=["Meeting scheduling"])
 @router.post("/schedule-meeting/",response_model=schemas.Meeting, dependencies=[Depends(oauth2_scheme)])
 async def schedule_meeting(
     meeting_data: schemas.MeetingCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: DatabaseSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     Schedule a new meeting with an advisor.
@@ -32,8 +36,8 @@ async def schedule_meeting(
         meeting_data (schemas.MeetingCreate): Data required to create a new meeting.
             - start_time (str): The start time of the meeting in ISO 8601 format. Example: "2024-06-20T12:20"
             - topic (str): The topic of the meeting. Example: "Extra info about the services the company offers."
-        db (Session, optional): The database session. Defaults to Depends(get_db).
-        current_user (models.User, optional): The currently authenticated user. Defaults to Depends(get_current_user).
+        db (DatabaseSession, optional): The database session. Defaults to Depends(get_db).
+        current_user (CurrentUser, optional): The currently authenticated user. Defaults to Depends(get_current_user).
 
     Returns:
         dict: A dictionary containing the message, meeting ID, and join URL.
@@ -42,39 +46,62 @@ async def schedule_meeting(
         HTTPException: If the user is not authenticated (status code 401).
         HTTPException: If the user has scheduled a meeting in the past 7 days (status code 400).
         HTTPException: If no advisors are available (status code 404).
+        HTTPException: If Zoom could not create the meeting (status code 502).
+        HTTPException: If Zoom is not available (status code 503).
     """
     meeting_service = MeetingService(db)
-    user_service = UserService(db)
-    email_service = EmailService()
 
     if not current_user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail= "Unauthorized")
 
+    # Checked against the identity first, so most repeated requests cost no query. The service enforces it atomically
     if not current_user.can_schedule_meeting():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail= "It has not been 7 days since you last scheduled a meeting") 
 
-    # Ensuring there is available advisors
-    advisor = await get_next_advisor(db)
-    if not advisor:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No advisors available")
-
-    new_meeting, meeting_info = meeting_service.create_meeting(meeting_data.start_time, meeting_data.topic, current_user.id, advisor.id)
+    # Claiming the user and the advisor, saving the meeting and queuing the invitations are committed at once
+    try:
+        return await meeting_service.schedule_meeting(current_user, meeting_data.start_time, meeting_data.topic)
+    except ServiceUnavailableError as error:
+        raise service_unavailable_exception(error)
+    except CreateMeetingError:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Zoom could not create the meeting")
+
+
+@router.post("/admin/schedule-meetings", response_model=List[schemas.BulkMeetingResult], dependencies=[Depends(oauth2_scheme)])
+async def schedule_meetings_in_bulk(
+    meetings: Annotated[List[schemas.BulkMeetingCreate], Body(min_length=1, max_length=BULK_MEETINGS_MAX_ITEMS)],
+    admin_user: CurrentUser = Depends(get_current_admin_user),
+    db: DatabaseSession = Depends(get_db)
+):
+    """
+    Schedule many meetings at once on behalf of users.
 
-    user_update = schemas.UserUpdate(last_meeting_scheduled= datetime.now(timezone.utc))
-    user_service.update_user(user_id=current_user.id, user_update= user_update)
+    This endpoint allows an admin user to import a list of meetings. Every meeting gets an advisor free at its
+    start time and is reserved, with a single INSERT, before Zoom is called. The Zoom meetings are then created
+    concurrently (at most BULK_MEETINGS_CONCURRENCY at a time), and their details and the invitations for the
+    users and the advisors are saved in one transaction. The 7-day rule of `/schedule-meeting/` applies, so a user gets at most one meeting per list.
+    A meeting that cannot be scheduled does not stop the others.
 
-    await email_service.send_meeting_invitations_to_users(current_user.email, meeting_info)
-    await email_service.send_meeting_invitations_to_advisors(advisor.email, meeting_info, current_user)
+    Args:
+        meetings (List[schemas.BulkMeetingCreate]): The meetings to schedule, at most BULK_MEETINGS_MAX_ITEMS.
+            - user_id (int): The ID of the user the meeting is for.
+            - start_time (str): The start time of the meeting in ISO 8601 format. Example: "2024-06-20T12:20"
+            - topic (str): The topic of the meeting.
+        admin_user (CurrentUser, optional): The currently authenticated admin user. Defaults to Depends(get_current_admin_user).
+        db (DatabaseSession, optional): The database session. Defaults to Depends(get_db).
 
-    return new_meeting
+    Returns:
+        List[schemas.BulkMeetingResult]: The result of every meeting, in the order they were sent.
+    """
+    return await MeetingService(db).schedule_meetings(meetings)
 
 
 @router.patch("/edit/meeting/{meeting_id}", response_model=schemas.Meeting, dependencies=[Depends(oauth2_scheme)])
 async def edit_scheduled_meeting(
     meeting_id: str, 
     meeting_update: schemas.MeetingUpdate, 
-    admin_user: models.User = Depends(get_current_admin_user), 
-    db: Session = Depends(get_db)):
+    admin_user: CurrentUser = Depends(get_current_admin_user), 
+    db: DatabaseSession = Depends(get_db)):
     """
     Edit a scheduled meeting.
 
@@ -84,34 +111,45 @@ async def edit_scheduled_meeting(
     Args:
         meeting_id (str): The ID of the meeting to be edited.
         meeting_update (schemas.MeetingUpdate): The updated meeting details.
-        admin_user (models.User, optional): The currently authenticated admin user. Defaults to Depends(get_current_admin_user).
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        admin_user (CurrentUser, optional): The currently authenticated admin user. Defaults to Depends(get_current_admin_user).
+        db (DatabaseSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
         models.Meeting: The updated meeting details.
 
     Raises:
         HTTPException: If something goes wrong while updating the meeting (status code 400).
+        HTTPException: If Zoom is not available (status code 503).
     """
     meeting_service = MeetingService(db)
+    email_service = EmailService(db)
+
+    # The reschedule messages are queued first so they are committed along with the meeting update
+    db_meeting = await meeting_service.get_meeting_by_zoom_id(meeting_id)
+    if db_meeting:
+        email_service.queue_user_reschedule_message(db_meeting.user.email, meeting_update.start_time, db_meeting.join_url)
+        email_service.queue_advisor_reschedule_message(db_meeting.advisor.email, meeting_update.start_time, db_meeting.join_url, db_meeting.user.first_name, db_meeting.user.lastname, db_meeting.topic)
+
     try:
-        updated_meeting: models.Meeting = meeting_service.update_meeting(meeting_id, meeting_update)
+        updated_meeting: models.Meeting = await meeting_service.update_meeting(meeting_id, meeting_update)
+    except HTTPException:
+        email_service.discard_queued()
+        raise
+    except ServiceUnavailableError as error:
+        email_service.discard_queued()
+        raise service_unavailable_exception(error)
     except:
+        email_service.discard_queued()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail= "Something went wrong while updating the meeting")
 
-    email_service = EmailService()
-
-    await email_service.send_user_reschedule_message(updated_meeting.user.email, updated_meeting.start_time, updated_meeting.join_url)
-    await email_service.send_advisor_reschedule_message(updated_meeting.advisor.email, updated_meeting.start_time, updated_meeting.join_url, updated_meeting.user.first_name, updated_meeting.user.lastname, updated_meeting.topic)
-
     return updated_meeting
 
 
 @router.delete("/delete/meeting/{meeting_id}", response_model=schemas.Meeting, dependencies=[Depends(oauth2_scheme)])
 async def delete_scheduled_meeting(
     meeting_id: str, 
-    admin_user: models.User = Depends(get_current_admin_user), 
-    db: Session = Depends(get_db)):
+    admin_user: CurrentUser = Depends(get_current_admin_user), 
+    db: DatabaseSession = Depends(get_db)):
     """
     Delete a scheduled meeting.
 
@@ -119,18 +157,21 @@ async def delete_scheduled_meeting(
 
     Args:
         meeting_id (str): The ID of the meeting to be deleted.
-        admin_user (models.User, optional): The currently authenticated admin user. Defaults to Depends(get_current_admin_user).
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        admin_user (CurrentUser, optional): The currently authenticated admin user. Defaults to Depends(get_current_admin_user).
+        db (DatabaseSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
         models.Meeting: The deleted meeting details.
 
     Raises:
         HTTPException: If something goes wrong while deleting the meeting (status code 400).
+        HTTPException: If Zoom is not available (status code 503).
     """
     meeting_service = MeetingService(db)
     try:
-        deleted_meeting = meeting_service.delete_meeting(meeting_id)
+        deleted_meeting = await meeting_service.delete_meeting(meeting_id)
+    except ServiceUnavailableError as error:
+        raise service_unavailable_exception(error)
     except:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Something went wrong while deleting the meeting")
     
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from ..utils.metrics import render_metrics
+
+router = APIRouter(tags=["Monitoring"])
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Expose the metrics of the API in the Prometheus text format, to be scraped by Prometheus.
+    """
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
@@ -1,4 +1,3 @@
-from .auth import redis_client
 from ..services.user_service import UserService
 from ..services.token_service import PasswordResetTokenService
 from ..services.email_service import EmailService
@@ -7,16 +6,17 @@ from ..schemas import UserUpdate, PasswordResetTokenUpdate, ResetPasswordFields
 from ..database import get_db
 
 from ..utils.rate_limiting import rate_limit_exceeded
-from ..config.constants import PASSWORD_RATE_LIMIT_PERIOD
+from ..utils.redis_utils import get_redis_client
+from ..config.constants import PASSWORD_RATE_LIMIT_PERIOD, PASSWORD_RATE_LIMIT_ALGORITHM
 from fastapi import APIRouter, HTTPException, Depends, Request, status
-from sqlalchemy.orm import Session
+from ..services.database_service import DatabaseSession
 
 
 router= APIRouter(tags=["Password Recovery"])
 
 
 @router.get("/password-recovery/{email}")
-async def password_recovery(email: str, request: Request, db: Session = Depends(get_db)):
+async def password_recovery(email: str, request: Request, db: DatabaseSession = Depends(get_db)):
     """
     Initiate a password recovery process by sending a reset password link to the user's email.
 
@@ -24,7 +24,7 @@ async def password_recovery(email: str, request: Request, db: Session = Depends(
         email (str): The email address of the user requesting password recovery.
         background_tasks (BackgroundTasks): FastAPI background tasks for sending the email asynchronously.
         request (Request): The HTTP request object to extract the client's IP address for rate limiting.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        db (DatabaseSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
         dict: A message confirming that the password reset link has been sent, and the generated token.
@@ -36,17 +36,17 @@ async def password_recovery(email: str, request: Request, db: Session = Depends(
     # Services
     user_service = UserService(db)
     token_service = PasswordResetTokenService(db)
-    email_service = EmailService()
+    email_service = EmailService(db)
 
     # Client IP as identifier for rate limiting
     client_ip = request.client.host
     identifier = f"{client_ip}:{email}"
     
     # Rate limiting: 5 requests per hour
-    if rate_limit_exceeded(redis_client, identifier, max_requests=5, period=PASSWORD_RATE_LIMIT_PERIOD):
+    if await rate_limit_exceeded(get_redis_client(), identifier, max_requests=5, period=PASSWORD_RATE_LIMIT_PERIOD, algorithm=PASSWORD_RATE_LIMIT_ALGORITHM):
         raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail= "Rate limit exceeded, please try again later.")
 
-    user = user_service.get_user_by_email(email)
+    user = await user_service.get_user_by_email(email)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="The user doesn't exist.")
     
@@ -56,20 +56,21 @@ async def password_recovery(email: str, request: Request, db: Session = Depends(
         data= token_data
     )
     
-    token_service.insert_token(user_id=user.id, token= password_reset_token, expiry= expiry)
-    await email_service.send_reset_password_email(email, password_reset_token)
+    # The email is committed along with the new token
+    email_service.queue_reset_password_email(email, password_reset_token)
+    await token_service.insert_token(user_id=user.id, token= password_reset_token, expiry= expiry)
 
     return {"msg": "The link to reset your password has been sent, please check your email."}
 
 
 @router.patch("/reset-password")
-async def reset_password(info: ResetPasswordFields, db: Session = Depends(get_db)):
+async def reset_password(info: ResetPasswordFields, db: DatabaseSession = Depends(get_db)):
     """
     Reset the user's password using the provided token and new password.
 
     Args:
         info (ResetPasswordFields): The fields required for resetting the password, including the token, new password, and password confirmation.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        db (DatabaseSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
         dict: A message confirming that the password has been updated successfully.
@@ -87,18 +88,18 @@ async def reset_password(info: ResetPasswordFields, db: Session = Depends(get_db
     
     if info.new_password != info.new_password_confirm:
         token_update= PasswordResetTokenUpdate(is_used= True)
-        token_service.update_token(token= info.token, token_update=token_update)
+        await token_service.update_token(token= info.token, token_update=token_update)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail= "Passwords don't match.")
 
     if len(info.new_password) < 7:
         token_update= PasswordResetTokenUpdate(is_used= True)
-        token_service.update_token(token= info.token, token_update=token_update)
+        await token_service.update_token(token= info.token, token_update=token_update)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password must be at least 7 characters long")
 
     user_update = UserUpdate(plain_password= info.new_password)
-    user_service.update_user(user_id= user_id, user_update= user_update)
+    await user_service.update_user(user_id= user_id, user_update= user_update)
 
     token_update= PasswordResetTokenUpdate(is_used= True)
-    token_service.update_token(token= info.token, token_update=token_update)
+    await token_service.update_token(token= info.token, token_update=token_update)
 
     return {"msg" : "The password has been updated succesfully"}
@@ -0,0 +1,53 @@
+import json
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from ..utils.metrics import ZOOM_WEBHOOK_EVENTS, child
+from ..utils.redis_utils import get_redis_client
+from ..utils.zoom_webhooks import ZOOM_MEETING_EVENTS, ZOOM_WEBHOOK_QUEUE, verify_zoom_signature, zoom_url_validation_response
+from ..config.constants import ZOOM_WEBHOOK_MAX_AGE, ZOOM_WEBHOOK_SECRET_TOKEN
+
+router = APIRouter(tags=["Webhooks"])
+
+
+@router.post("/webhooks/zoom", include_in_schema=False)
+async def zoom_webhook(request: Request):
+    """
+    Receive the event notifications of the Zoom app.
+
+    Zoom expects an answer within 3 seconds and retries otherwise, so the endpoint only checks the signature
+    and queues the event in Redis; the `api.workers.zoom_webhooks` worker applies the queued events to the
+    meetings in batches. The endpoint.url_validation challenge is answered right away.
+
+    Args:
+        request (Request): The webhook request, signed with the Secret Token of the Zoom app.
+
+    Returns:
+        Response: 204 once the event is queued, or the answer to the url validation challenge.
+
+    Raises:
+        HTTPException: If the signature is missing, wrong or too old (status code 401).
+        HTTPException: If the body is not a Zoom event (status code 400).
+        HTTPException: If ZOOM_WEBHOOK_SECRET_TOKEN is not set (status code 503).
+    """
+    if not ZOOM_WEBHOOK_SECRET_TOKEN:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Zoom webhooks are not configured")
+
+    body = await request.body()
+    if not verify_zoom_signature(ZOOM_WEBHOOK_SECRET_TOKEN, request.headers.get("x-zm-request-timestamp"),
+                                 request.headers.get("x-zm-signature"), body, ZOOM_WEBHOOK_MAX_AGE):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid signature")
+
+    try:
+        event = json.loads(body)
+        name = event["event"]
+        if name == "endpoint.url_validation":
+            return zoom_url_validation_response(ZOOM_WEBHOOK_SECRET_TOKEN, event["payload"]["plainToken"])
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid event")
+
+    if name in ZOOM_MEETING_EVENTS:
+        # The body is queued as it came, the worker parses it again
+        await get_redis_client().rpush(ZOOM_WEBHOOK_QUEUE, body)
+        child(ZOOM_WEBHOOK_EVENTS, "queued").inc()
+    else:
+        child(ZOOM_WEBHOOK_EVENTS, "ignored").inc()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -2,6 +2,7 @@ from pydantic import BaseModel, EmailStr, field_validator, ConfigDict
 from pydantic_extra_types.phone_numbers import PhoneNumber
 from typing import Optional, List
 from datetime import datetime
+from enum import Enum
 
 class CustomBaseModel(BaseModel):
     model_config = ConfigDict(from_attributes = True, extra = 'forbid')
@@ -126,6 +127,21 @@ class Meeting(MeetingBase):
     advisor_id: int
     topic: str
 
+# Scheduling meetings in bulk (admins)
+class BulkMeetingCreate(MeetingCreate):
+    user_id: int
+
+class BulkMeetingStatus(str, Enum):
+    CREATED = "created"
+    FAILED = "failed"
+
+class BulkMeetingResult(CustomBaseModel):
+    index: int
+    user_id: int
+    status: BulkMeetingStatus
+    meeting: Optional[Meeting] = None
+    error: Optional[str] = None
+
     
 # Reading an user
 class User(UserBase):
@@ -138,6 +154,18 @@ class User(UserBase):
     email_confirmation_tokens: List[EmailConfirmationToken] = []
 
 
+# Reading users in bulk without their relationships
+class UserSummary(UserBase):
+    id: int
+    is_active: bool
+    role: str
+
+
+class UserView(str, Enum):
+    SUMMARY = "summary"
+    FULL = "full"
+
+
 class TokenData(CustomBaseModel):
     email: EmailStr | None = None
 
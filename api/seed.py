@@ -0,0 +1,114 @@
+"""
+Database seeding.
+
+Creates the default admin user (ADMIN_EMAIL, ADMIN_PASSWORD) and the default advisor (ADVISOR_EMAIL,
+ADVISOR_NAME) if they do not exist yet. Each one is a single INSERT ... ON CONFLICT DO NOTHING, so running
+it again, or from several processes at once, changes nothing. The admin password is only hashed when the
+admin is missing, unless ADMIN_PASSWORD_HASH already gives the hash.
+
+Run it with:
+    python -m api.seed [--migrate | --create-schema]
+
+It is meant to run once per deployment, before the API starts; the API only seeds on startup with
+SEED_ON_STARTUP=true. --migrate brings the schema up to date with Alembic (`alembic upgrade head`), creating
+the tables of a fresh database from the models instead and stamping them with the latest revision, since
+the migrations start from an existing schema. --create-schema only creates the missing tables.
+"""
+import argparse
+from typing import Optional
+from sqlalchemy import inspect, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .database import Base, SessionLocal, engine
+from .models import Advisor, User, UserRole, crypt
+from .config.constants import ADMIN_EMAIL, ADMIN_PASSWORD, ADMIN_PASSWORD_HASH, ADVISOR_EMAIL, ADVISOR_NAME
+
+# Read from the directory the command runs in, like the `alembic` command does
+ALEMBIC_CONFIG = "alembic.ini"
+
+
+def create_schema() -> None:
+    """
+    Create the tables of the models that do not exist yet.
+    """
+    Base.metadata.create_all(bind=engine)
+
+
+def migrate_schema(alembic_config: str = ALEMBIC_CONFIG) -> None:
+    """
+    Bring the schema up to date with the Alembic migrations.
+
+    The first migration alters an existing `users` table, so the tables of a fresh database are created from
+    the models and stamped with the latest revision instead.
+
+    Args:
+        alembic_config (str): The path of the Alembic configuration file.
+    """
+    # Imported here, so importing the API does not load Alembic
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(alembic_config)
+    if inspect(engine).has_table(User.__tablename__):
+        command.upgrade(config, "head")
+    else:
+        create_schema()
+        command.stamp(config, "head")
+
+
+def seed_database(db: Session, admin_password_hash: Optional[str] = ADMIN_PASSWORD_HASH) -> dict[str, bool]:
+    """
+    Create the default admin user and advisor if they do not exist, in one transaction.
+
+    Args:
+        db (Session): The database session.
+        admin_password_hash (Optional[str]): The bcrypt hash of the admin password. Defaults to ADMIN_PASSWORD_HASH;
+            when empty, ADMIN_PASSWORD is hashed if the admin has to be created.
+
+    Returns:
+        dict[str, bool]: Whether the "admin" and the "advisor" were created.
+    """
+    created = {"admin": False, "advisor": False}
+    if ADMIN_EMAIL:
+        if not admin_password_hash and db.execute(select(User.id).where(User.email == ADMIN_EMAIL)).first() is None:
+            admin_password_hash = crypt.hash(ADMIN_PASSWORD)
+        if admin_password_hash:
+            created["admin"] = db.execute(
+                insert(User)
+                .values(first_name="Matheww", lastname="Drawer", email=ADMIN_EMAIL, password_hash=admin_password_hash, is_active=True, role=UserRole.ADMIN)
+                .on_conflict_do_nothing(index_elements=[User.email])
+                .returning(User.id)
+            ).first() is not None
+
+    if ADVISOR_EMAIL:
+        created["advisor"] = db.execute(
+            insert(Advisor)
+            .values(name=ADVISOR_NAME, email=ADVISOR_EMAIL)
+            .on_conflict_do_nothing(index_elements=[Advisor.email])
+            .returning(Advisor.id)
+        ).first() is not None
+
+    db.commit()
+    return created
+
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description="Create the default admin user and advisor.")
+    schema = argument_parser.add_mutually_exclusive_group()
+    schema.add_argument("--migrate", action="store_true", help="Bring the schema up to date with the Alembic migrations first")
+    schema.add_argument("--create-schema", action="store_true", help="Create the missing tables from the models first")
+    arguments = argument_parser.parse_args()
+
+    if arguments.migrate:
+        migrate_schema()
+    elif arguments.create_schema:
+        create_schema()
+    with SessionLocal() as db:
+        created = seed_database(db)
+    for name, was_created in created.items():
+        print(f"{name}: {'created' if was_created else 'already there'}")
+
+
+if __name__ == "__main__":
+    main()
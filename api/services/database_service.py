@@ -0,0 +1,108 @@
+from sqlalchemy import Executable, Result
+from sqlalchemy.orm import Session, SessionTransaction
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncSessionTransaction
+from typing import Any, Iterable, Optional, Union
+
+DatabaseSession = Union[Session, AsyncSession]
+Savepoint = Union[SessionTransaction, AsyncSessionTransaction]
+
+
+class DatabaseService:
+    """
+    Base class for the services that talk to the database.
+
+    The session is a Session or an AsyncSession depending on DATABASE_MODE. Services build 2.0-style
+    statements and run them through these helpers, so the same service code works with both: on an
+    AsyncSession the round-trips are awaited, on a Session they block as plain synchronous calls.
+
+    Attributes:
+        db (DatabaseSession): The database session.
+    """
+
+    def __init__(self, db: DatabaseSession):
+        """
+        Initialize the service with the provided database session.
+
+        Args:
+            db (DatabaseSession): The database session.
+        """
+        self.db = db
+
+
+    @property
+    def is_async(self) -> bool:
+        return isinstance(self.db, AsyncSession)
+
+
+    async def execute(self, statement: Executable, params: Optional[Any] = None) -> Result:
+        if self.is_async:
+            return await self.db.execute(statement, params)
+        return self.db.execute(statement, params)
+
+
+    async def first(self, statement: Executable) -> Optional[Any]:
+        """
+        Run a statement and return the first entity of the first row, or None.
+        """
+        return (await self.execute(statement)).scalars().first()
+
+
+    async def all(self, statement: Executable) -> list[Any]:
+        """
+        Run a statement and return the first entity of every row.
+        """
+        return list((await self.execute(statement)).scalars().all())
+
+
+    async def commit(self) -> None:
+        if self.is_async:
+            await self.db.commit()
+        else:
+            self.db.commit()
+
+
+    async def rollback(self) -> None:
+        if self.is_async:
+            await self.db.rollback()
+        else:
+            self.db.rollback()
+
+
+    async def refresh(self, instance: Any, attribute_names: Optional[Iterable[str]] = None) -> None:
+        if self.is_async:
+            await self.db.refresh(instance, attribute_names)
+        else:
+            self.db.refresh(instance, attribute_names)
+
+
+    async def delete(self, instance: Any) -> None:
+        if self.is_async:
+            await self.db.delete(instance)
+        else:
+            self.db.delete(instance)
+
+
+    async def savepoint(self) -> Savepoint:
+        """
+        Start a savepoint in the current transaction, ended with `release_savepoint` or `rollback_to_savepoint`.
+        """
+        if self.is_async:
+            return await self.db.begin_nested()
+        return self.db.begin_nested()
+
+
+    async def release_savepoint(self, savepoint: Savepoint) -> None:
+        if self.is_async:
+            await savepoint.commit()
+        else:
+            savepoint.commit()
+
+
+    async def rollback_to_savepoint(self, savepoint: Savepoint) -> None:
+        """
+        Undo what was done since the savepoint, releasing the row locks taken since.
+        """
+        if self.is_async:
+            await savepoint.rollback()
+        else:
+            savepoint.rollback()
@@ -1,23 +1,69 @@
-from fastapi_mail import FastMail, MessageSchema
+from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from ..utils.email_utils import conf
 from dateutil import parser
-from ..models import User
+from ..models import EmailOutbox
+from ..utils.identity_cache import CurrentUser
 from pydantic import EmailStr
-from ..config.email_messages import confirmation_message, reset_message, user_invitation_message, advisor_invitation_message, user_reschedule_message, advisor_reschedule_message
+from ..utils.email_templates import email_templates
 
 
 class EmailService:
     """
     A service class for managing email notifications.
 
+    Messages are not sent inline: they are written to the email outbox in the caller's
+    database session, so they are committed together with the change that triggered them
+    and delivered afterwards by the outbox worker.
+
     Attributes:
-        conf (ConnectionConfig): The configuration for FastMail.
+        db (Session): The database session.
+        queued (list[EmailOutbox]): The messages queued by this service that may not be committed yet.
     """
 
-    async def send_meeting_invitations_to_users(self, email_to: EmailStr, meeting_info: dict) -> None:
+    def __init__(self, db: Session):
+        """
+        Initialize the EmailService with the provided database session.
+
+        Args:
+            db (Session): The database session.
+        """
+        self.db = db
+        self.queued: list[EmailOutbox] = []
+
+
+    def queue_message(self, email_to: EmailStr, subject: str, body: str, subtype: str = "html") -> EmailOutbox:
+        """
+        Add a message to the email outbox. The message is persisted by the next commit of the session.
+
+        Args:
+            email_to (EmailStr): The email address of the recipient.
+            subject (str): The subject of the message.
+            body (str): The rendered body of the message.
+            subtype (str): The MIME subtype of the body. Defaults to "html".
+
+        Returns:
+            EmailOutbox: The queued message.
+        """
+        message = EmailOutbox(recipient=email_to, subject=subject, body=body, subtype=subtype)
+        self.db.add(message)
+        self.queued.append(message)
+        return message
+
+
+    def discard_queued(self) -> None:
+        """
+        Remove the messages queued by this service that have not been committed yet,
+        e.g. because the change they announce failed.
+        """
+        for message in self.queued:
+            if message in self.db.new:
+                self.db.expunge(message)
+        self.queued.clear()
+
+
+    def queue_meeting_invitations_to_users(self, email_to: EmailStr, meeting_info: dict) -> None:
         """
-        Send a Zoom meeting invitation to a user.
+        Queue a Zoom meeting invitation to a user.
 
         Args:
             email_to (EmailStr): The email address of the user.
@@ -33,24 +79,17 @@ class EmailService:
 
         # Format datetime for display
         formatted_time = local_datetime.strftime('%Y-%m-%d %H:%M %Z')
-        message = MessageSchema(
-            subject= "Invitation to Zoom Meeting",
-            recipients= [email_to],
-            body= user_invitation_message(formatted_time, meeting_info.get("join_url")),
-            subtype= "html"
-        )
-        fm = FastMail(conf)
-        await fm.send_message(message)
+        self.queue_message(email_to, "Invitation to Zoom Meeting", email_templates.render("user_invitation.html", formatted_time=formatted_time, join_url=meeting_info.get("join_url")))
 
 
-    async def send_meeting_invitations_to_advisors(self, email_to: EmailStr, meeting_info: dict, current_user: User) -> None:
+    def queue_meeting_invitations_to_advisors(self, email_to: EmailStr, meeting_info: dict, current_user: CurrentUser) -> None:
         """
-        Send a Zoom meeting invitation to an advisor.
+        Queue a Zoom meeting invitation to an advisor.
 
         Args:
             email_to (EmailStr): The email address of the advisor.
             meeting_info (dict): A dictionary containing meeting details such as 'start_time', 'join_url', and 'topic'.
-            current_user (User): The user who scheduled the meeting.
+            current_user (CurrentUser): The user who scheduled the meeting.
 
         Returns:
             None
@@ -63,19 +102,19 @@ class EmailService:
 
         # Format datetime for display
         formatted_time = local_datetime.strftime('%Y-%m-%d %H:%M %Z')
-        message = MessageSchema(
-            subject= "New Zoom Meeting Scheduled",
-            recipients= [email_to],
-            body= advisor_invitation_message(formatted_time, meeting_info.get("join_url"), current_user.first_name, current_user.lastname, meeting_info.get("topic")),
-            subtype= "html"
-        )
-        fm = FastMail(conf)
-        await fm.send_message(message)
+        self.queue_message(email_to, "New Zoom Meeting Scheduled", email_templates.render(
+            "advisor_invitation.html",
+            formatted_time=formatted_time,
+            join_url=meeting_info.get("join_url"),
+            user_first_name=current_user.first_name,
+            user_last_name=current_user.lastname,
+            topic=meeting_info.get("topic")
+        ))
 
 
-    async def send_user_reschedule_message(self, email_to: EmailStr, new_start_time: datetime, join_url: str) -> None:
+    def queue_user_reschedule_message(self, email_to: EmailStr, new_start_time: datetime, join_url: str) -> None:
         """
-        Send an email notification to the user informing them that their Zoom meeting has been rescheduled.
+        Queue an email notification to the user informing them that their Zoom meeting has been rescheduled.
 
         Args:
             email_to (EmailStr): The email address of the user.
@@ -87,17 +126,10 @@ class EmailService:
         """
         local_datetime = new_start_time
         formatted_time = local_datetime.strftime('%Y-%m-%d %H:%M %Z')
-        message = MessageSchema(
-            subject= "Zoom Meeting Rescheduled",
-            recipients= [email_to],
-            body= user_reschedule_message(formatted_time, join_url),
-            subtype='html'
-        )
-        fm = FastMail(conf)
-        await fm.send_message(message)
+        self.queue_message(email_to, "Zoom Meeting Rescheduled", email_templates.render("user_reschedule.html", formatted_time=formatted_time, join_url=join_url))
 
 
-    async def send_advisor_reschedule_message(
+    def queue_advisor_reschedule_message(
         self, 
         email_to: EmailStr, 
         new_start_time: datetime, 
@@ -106,7 +138,7 @@ class EmailService:
         user_last_name: str, 
         topic: str):
         """
-        Send an email notification to the advisor informing them that their Zoom meeting has been rescheduled.
+        Queue an email notification to the advisor informing them that their Zoom meeting has been rescheduled.
 
         Args:
             email_to (EmailStr): The email address of the advisor.
@@ -121,19 +153,19 @@ class EmailService:
         """
         local_datetime = new_start_time
         formatted_time = local_datetime.strftime('%Y-%m-%d %H:%M %Z')
-        message = MessageSchema(
-            subject= "Zoom Meeting Rescheduled",
-            recipients= [email_to],
-            body= advisor_reschedule_message(formatted_time, join_url, topic, user_first_name, user_last_name),
-            subtype='html'
-        )
-        fm = FastMail(conf)
-        await fm.send_message(message)
+        self.queue_message(email_to, "Zoom Meeting Rescheduled", email_templates.render(
+            "advisor_reschedule.html",
+            formatted_time=formatted_time,
+            join_url=join_url,
+            user_first_name=user_first_name,
+            user_last_name=user_last_name,
+            topic=topic
+        ))
 
     
-    async def send_confirmation_account_message(self, email_to: EmailStr, token: str) -> None:
+    def queue_confirmation_account_message(self, email_to: EmailStr, token: str) -> None:
         """
-        Send a confirmation email to the user with a token to confirm their account.
+        Queue a confirmation email to the user with a token to confirm their account.
 
         Args:
             email_to (str): The email address of the user.
@@ -143,19 +175,12 @@ class EmailService:
             None
         """
 
-        message = MessageSchema(
-            subject="Account Confirmation",
-            recipients=[email_to],
-            body=confirmation_message(token),
-            subtype="html"
-        )
-        fm = FastMail(conf)
-        await fm.send_message(message)
+        self.queue_message(email_to, "Account Confirmation", email_templates.render("confirmation.html", token=token))
 
 
-    async def send_reset_password_email(self, email_to: str, token: str):
+    def queue_reset_password_email(self, email_to: str, token: str):
         """
-        Send a password reset email to the user with a token to reset their password.
+        Queue a password reset email to the user with a token to reset their password.
 
         Args:
             email_to (str): The email address of the user.
@@ -164,11 +189,4 @@ class EmailService:
         Returns:
             None
         """
-        message = MessageSchema(
-            subject="Password Reset",
-            recipients=[email_to],
-            body=reset_message(token),
-            subtype="html"
-        )
-        fm = FastMail(conf)
-        await fm.send_message(message)
+        self.queue_message(email_to, "Password Reset", email_templates.render("reset_password.html", token=token))
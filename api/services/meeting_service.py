@@ -1,43 +1,64 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status
-from ..config.exceptions import PatchMeetingError, DeleteMeetingError, CreateMeetingError, GetMeetingError
+from ..config.exceptions import PatchMeetingError, DeleteMeetingError, CreateMeetingError, GetMeetingError, ServiceUnavailableError
+from ..utils.zoom_utils import create_zoom_resilient_client, get_zoom_client, get_zoom_token_cache
+from ..utils.advisor_schedule import get_advisor_schedule, to_utc
+from ..utils.identity_cache import CurrentUser, get_identity_cache
+from ..utils.meeting_utils import assign_advisor, find_overlapping_meeting, get_next_advisor, hold_key
+from ..config.constants import BULK_MEETINGS_CONCURRENCY, MEETING_DURATION_MINUTES, MEETING_TIMEZONE, ZOOM_API_BASE_URL, ZOOM_OAUTH_TOKEN_URL
+from .database_service import DatabaseService, DatabaseSession
+from .email_service import EmailService
+from .user_service import UserService
+from contextlib import suppress
 from datetime import datetime
+from typing import Iterable, Optional, Sequence
 from .. import models, schemas
+import asyncio
 import base64
-import json
-import requests
+import httpx
+import logging
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
-class MeetingService:
+logger = logging.getLogger(__name__)
+
+class MeetingService(DatabaseService):
     """
     A service class for managing Zoom meetings and their database interactions.
 
     Attributes:
-        db (Session): The database session.
+        db (DatabaseSession): The database session.
+        http_client (httpx.AsyncClient): The shared HTTP client used to reach the Zoom API.
+        zoom (ResilientClient): The HTTP client wrapped with the retries and circuit breaker of the Zoom API.
+        token_cache (ZoomTokenCache): The process-wide cache of the Zoom access token.
         ZOOM_CLIENT_ID (str): Zoom client ID from environment variables.
         ZOOM_CLIENT_SECRET (str): Zoom client secret from environment variables.
         ZOOM_ACCOUNT_ID (str): Zoom account ID from environment variables.
     """
 
-    def __init__(self, db: Session):
+    def __init__(self, db: DatabaseSession, http_client: Optional[httpx.AsyncClient] = None):
         """
         Initialize the MeetingService with a database session.
 
         Args:
-            db (Session): The database session.
+            db (DatabaseSession): The database session.
+            http_client (Optional[httpx.AsyncClient]): The HTTP client for the Zoom API. Defaults to the shared client.
         """
-        self.db : Session = db
+        super().__init__(db)
+        self.http_client: httpx.AsyncClient = http_client if http_client is not None else get_zoom_client()
+        self.zoom = create_zoom_resilient_client(self.http_client)
+        self.token_cache = get_zoom_token_cache()
         self.ZOOM_CLIENT_ID: str = os.getenv('ZOOM_CLIENT_ID')
         self.ZOOM_CLIENT_SECRET= os.getenv('ZOOM_CLIENT_SECRET')
         self.ZOOM_ACCOUNT_ID = os.getenv('ZOOM_ACCOUNT_ID')
 
 
-    def get_meeting_by_zoom_id(self, meeting_id: int) -> models.Meeting:
+    async def get_meeting_by_zoom_id(self, meeting_id: int) -> models.Meeting:
         """
-        Retrieve a meeting from the database by its Zoom meeting ID.
+        Retrieve a meeting from the database by its Zoom meeting ID, along with its user and advisor.
 
         Args:
             meeting_id (int): The Zoom meeting ID.
@@ -45,17 +66,22 @@ class MeetingService:
         Returns:
             models.Meeting: The meeting with the given Zoom meeting ID.
         """
-        return self.db.query(models.Meeting).filter(models.Meeting.zoom_meeting_id == meeting_id).first()
+        statement = (
+            select(models.Meeting)
+            .where(models.Meeting.zoom_meeting_id == str(meeting_id))
+            .options(selectinload(models.Meeting.user), selectinload(models.Meeting.advisor))
+        )
+        return await self.first(statement)
 
 
-    def get_meeting_access_token(self) -> str:
+    async def request_access_token(self) -> tuple[str | None, int]:
         """
-        Retrieve an access token for the Zoom API.
+        Request a new access token from the Zoom OAuth endpoint.
 
         Returns:
-            str: The access token for the Zoom API.
+            tuple: The access token (None if Zoom did not return one) and its lifetime in seconds.
         """
-        url = 'https://zoom.us/oauth/token'
+        url = ZOOM_OAUTH_TOKEN_URL
         credentials = f"{self.ZOOM_CLIENT_ID}:{self.ZOOM_CLIENT_SECRET}"
         encoded_credentials = base64.b64encode(credentials.encode()).decode('utf-8')  # Codifica las credenciales en base64
         auth_header = {
@@ -66,19 +92,69 @@ class MeetingService:
             'grant_type': 'account_credentials',
             "account_id" : self.ZOOM_ACCOUNT_ID
         }
-        response = requests.post(url, headers=auth_header, data=payload)
-        return response.json().get('access_token')
+        response = await self.zoom.request("POST", url, headers=auth_header, data=payload)
+        token_info = response.json()
+        return (token_info.get('access_token'), int(token_info.get('expires_in', 3600)))
+
+
+    async def get_meeting_access_token(self) -> str:
+        """
+        Retrieve an access token for the Zoom API from the shared token cache.
+
+        Returns:
+            str: The access token for the Zoom API.
+        """
+        return await self.token_cache.get_token(self.request_access_token)
+
+
+    async def zoom_request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send an authorized request to the Zoom API.
+
+        Every request goes through the Zoom resilience layer: it is retried on rate limits, server and connection
+        errors, and fails fast while the Zoom circuit breaker is open. If Zoom rejects the cached access token,
+        the token is invalidated and the request is retried once with a new one.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The Zoom API URL.
+            **kwargs: Extra arguments forwarded to the HTTP client (json, timeout, ...).
+
+        Returns:
+            httpx.Response: The response from Zoom.
+
+        Raises:
+            ServiceUnavailableError: If Zoom is down, keeps rate limiting the request, or its circuit breaker is open.
+        """
+        for attempt in range(2):
+            access_token = await self.get_meeting_access_token()
+            headers = {
+                "Authorization": f"Bearer {access_token}",
+                "Content-Type": "application/json"
+            }
+            response = await self.zoom.request(method, url, headers=headers, **kwargs)
+            if response.status_code != 401:
+                break
+            await self.token_cache.invalidate()
+        return response
 
     
-    def get_meeting(self, meeting_id: str):
-        access_token = self.get_meeting_access_token()
-        url = f"https://api.zoom.us/v2/meetings/{meeting_id}"
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
+    async def get_meeting(self, meeting_id: str) -> dict:
+        """
+        Retrieve the details of a meeting from the Zoom API.
 
-        response = requests.get(url, headers=headers)
+        Args:
+            meeting_id (str): The Zoom meeting ID.
+
+        Returns:
+            dict: The meeting information returned by Zoom.
+
+        Raises:
+            GetMeetingError: If the meeting could not be retrieved.
+            ServiceUnavailableError: If Zoom is not available.
+        """
+        url = f"{ZOOM_API_BASE_URL}/meetings/{meeting_id}"
+        response = await self.zoom_request("GET", url)
         
         if response.status_code == 200:
             return response.json()  
@@ -86,35 +162,28 @@ class MeetingService:
         raise GetMeetingError
 
 
-    def create_meeting(self, start_time: datetime, topic: str, user_id: int, advisor_id: int) -> tuple[models.Meeting, dict]:
+    async def create_zoom_meeting(self, start_time: datetime, topic: str) -> dict:
         """
-        Create a new Zoom meeting and save it to the database.
+        Create a new meeting in Zoom, without saving it to the database.
 
         Args:
             start_time (datetime): The start time of the meeting.
             topic (str): The topic of the meeting.
-            user_id (int): The ID of the user scheduling the meeting.
-            advisor_id (int): The ID of the advisor assigned to the meeting.
 
         Returns:
-            tuple: The new meeting and meeting information from Zoom.
+            dict: The meeting information returned by Zoom.
 
         Raises:
             CreateMeetingError: If the meeting could not be created.
+            ServiceUnavailableError: If Zoom is not available.
         """
-        
-        access_token = self.get_meeting_access_token()
-        url = f"https://api.zoom.us/v2/users/me/meetings"
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
+        url = f"{ZOOM_API_BASE_URL}/users/me/meetings"
         payload = {
             "topic": topic,
             "type": 2,
             "start_time": start_time.isoformat(),
-            "duration": "30",  # Duration in minutes
-            "timezone": "America/Bogota",
+            "duration": str(MEETING_DURATION_MINUTES),  # Duration in minutes
+            "timezone": MEETING_TIMEZONE,
             "settings": {
                 "join_before_host": True,
                 "jbh_time": 5, 
@@ -123,27 +192,315 @@ class MeetingService:
                 "waiting_room": False
             }
         }
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
+        response = await self.zoom_request("POST", url, json=payload)
 
         if response.status_code == 201:
-            meeting_info = response.json()
-            new_meeting = models.Meeting(
-                user_id=user_id,
-                advisor_id=advisor_id,
-                start_time=meeting_info['start_time'],
-                topic= meeting_info["topic"],
-                zoom_meeting_id=meeting_info['id'],
-                join_url=meeting_info['join_url']
-            )
-            self.db.add(new_meeting)
-            self.db.commit()
-            self.db.refresh(new_meeting)
-            return (new_meeting, meeting_info)
+            return response.json()
         
         raise CreateMeetingError
 
-    
-    def update_meeting(self, meeting_id: str, meeting_update: schemas.MeetingUpdate) -> models.Meeting | None:
+
+    async def schedule_meeting(self, user: CurrentUser, start_time: datetime, topic: str) -> schemas.Meeting:
+        """
+        Schedule a meeting for a user, reserving it before Zoom is called.
+
+        Claiming the user's 7-day scheduling right, claiming an advisor free at `start_time` and inserting
+        the meeting without its Zoom details are committed together first, in a transaction of a few
+        statements: another request of the same user is rejected without reaching Zoom, and the other
+        bookings see the advisor busy. No row lock or connection is held while Zoom is called, since with the
+        synchronous engine a lock wait blocks the event loop the lock holder needs to finish. The Zoom
+        details and the invitations are then committed in a second transaction. If Zoom or that transaction
+        fails, the reservation is undone: the meeting is deleted, the user's last scheduling time restored
+        and a Zoom meeting already created is deleted again.
+
+        Args:
+            user (CurrentUser): The user scheduling the meeting.
+            start_time (datetime): The start time of the meeting.
+            topic (str): The topic of the meeting.
+
+        Returns:
+            schemas.Meeting: The new meeting.
+
+        Raises:
+            HTTPException: If the user has scheduled a meeting in the past 7 days, or is scheduling one (status code 400).
+            HTTPException: If no advisors are available (status code 404).
+            HTTPException: If the advisors are all being claimed by other bookings (status code 503).
+            CreateMeetingError: If the meeting could not be created.
+            ServiceUnavailableError: If Zoom is not available.
+        """
+        user_service = UserService(self.db)
+        try:
+            claim = await user_service.claim_meeting_scheduling(user.id)
+            if claim is None:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="It has not been 7 days since you last scheduled a meeting")
+
+            async with assign_advisor(self.db, start_time, commit=False) as advisor:
+                if not advisor:
+                    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No advisors available")
+                advisor_id, advisor_email = advisor.id, advisor.email
+                meeting_id = (await self.execute(
+                    insert(models.Meeting)
+                    .values(user_id=user.id, advisor_id=advisor_id, start_time=to_utc(start_time), topic=topic)
+                    .returning(models.Meeting.id)
+                )).scalar_one()
+                await self.commit()
+                get_advisor_schedule().book(meeting_id, advisor_id, to_utc(start_time), force=True)
+        except BaseException:
+            await self.rollback()
+            raise
+        await get_identity_cache().invalidate(user.email)
+
+        meeting_info = None
+        try:
+            meeting_info = await self.create_zoom_meeting(start_time, topic)
+            new_meeting = await self.first(
+                update(models.Meeting)
+                .where(models.Meeting.id == meeting_id)
+                .values(
+                    start_time=meeting_info["start_time"],
+                    topic=meeting_info["topic"],
+                    zoom_meeting_id=str(meeting_info["id"]),
+                    join_url=meeting_info["join_url"]
+                )
+                .returning(models.Meeting)
+                .execution_options(synchronize_session=False)
+            )
+            email_service = EmailService(self.db)
+            email_service.queue_meeting_invitations_to_users(user.email, meeting_info)
+            email_service.queue_meeting_invitations_to_advisors(advisor_email, meeting_info, user)
+            # Read before committing, the commit expires the attributes of the session's objects
+            meeting = schemas.Meeting.model_validate(new_meeting)
+            await self.commit()
+        except BaseException:
+            await self.rollback()
+            if meeting_info is not None:
+                with suppress(Exception):
+                    await self.zoom_request("DELETE", f"{ZOOM_API_BASE_URL}/meetings/{meeting_info['id']}")
+            await self.cancel_reservations([(meeting_id, user, claim)])
+            raise
+
+        get_advisor_schedule().book(meeting.id, meeting.advisor_id, meeting.start_time, force=True)
+        return meeting
+
+
+    async def cancel_reservations(self, reservations: Sequence[tuple[int, CurrentUser, tuple[datetime, Optional[datetime]]]]) -> None:
+        """
+        Undo reservations committed for meetings that could not be created, in one transaction.
+
+        Args:
+            reservations (Sequence[tuple[int, CurrentUser, tuple[datetime, Optional[datetime]]]]): The ID of every
+                reserved meeting, the user it was reserved for and the claim of that user's scheduling right.
+        """
+        meeting_ids = [meeting_id for meeting_id, _, _ in reservations]
+        try:
+            await self.execute(delete(models.Meeting).where(models.Meeting.id.in_(meeting_ids)))
+            user_service = UserService(self.db)
+            for _, user, claim in reservations:
+                await user_service.release_meeting_scheduling(user.id, *claim)
+            await self.commit()
+        except Exception:
+            await self.rollback()
+            logger.exception("Could not cancel the reservations of meetings %s", meeting_ids)
+            return
+        finally:
+            schedule = get_advisor_schedule()
+            for meeting_id in meeting_ids:
+                schedule.cancel(meeting_id)
+        for _, user, _ in reservations:
+            await get_identity_cache().invalidate(user.email)
+
+
+    async def create_meetings(self, reservations: Sequence[tuple[int, datetime, str]], concurrency: int = BULK_MEETINGS_CONCURRENCY) -> list[tuple[Optional[models.Meeting], Optional[dict], Optional[str]]]:
+        """
+        Create the Zoom meetings of reserved meetings concurrently and save them with a single UPDATE, without committing.
+
+        At most `concurrency` requests to Zoom are in flight at a time. A meeting Zoom fails to create is
+        reported and left as it is; the others are still saved. If saving them fails, the meetings already
+        created in Zoom are deleted again. The caller commits, and deletes them if anything fails later.
+
+        Args:
+            reservations (Sequence[tuple[int, datetime, str]]): The (meeting ID, start time, topic) of every reserved meeting.
+            concurrency (int): The maximum number of Zoom meetings created at the same time.
+
+        Returns:
+            list: For every reservation, in order, the updated meeting, the meeting information from Zoom and
+            None, or None, None and the reason the meeting could not be created.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def create(start_time: datetime, topic: str) -> tuple[Optional[dict], Optional[str]]:
+            async with semaphore:
+                try:
+                    return (await self.create_zoom_meeting(start_time, topic), None)
+                except CreateMeetingError:
+                    return (None, "Zoom could not create the meeting")
+                except ServiceUnavailableError:
+                    return (None, "Zoom is not available right now")
+                except httpx.HTTPError as error:
+                    return (None, f"Zoom could not be reached: {error.__class__.__name__}")
+
+        created = await asyncio.gather(*(create(start_time, topic) for _, start_time, topic in reservations))
+
+        rows = [
+            {
+                "id": meeting_id,
+                "start_time": meeting_info["start_time"],
+                "topic": meeting_info["topic"],
+                "zoom_meeting_id": str(meeting_info["id"]),
+                "join_url": meeting_info["join_url"],
+            }
+            for (meeting_id, _, _), (meeting_info, _) in zip(reservations, created) if meeting_info is not None
+        ]
+        saved: dict[int, models.Meeting] = {}
+        if rows:
+            try:
+                # A bulk UPDATE by primary key: one statement executed for every row
+                await self.execute(update(models.Meeting), rows)
+                saved = {meeting.id: meeting for meeting in await self.all(
+                    select(models.Meeting)
+                    .where(models.Meeting.id.in_([row["id"] for row in rows]))
+                    .execution_options(populate_existing=True)
+                )}
+            except Exception:
+                await self.delete_zoom_meetings(row["zoom_meeting_id"] for row in rows)
+                raise
+
+        return [
+            (saved[meeting_id], meeting_info, None) if meeting_info is not None else (None, None, error)
+            for (meeting_id, _, _), (meeting_info, error) in zip(reservations, created)
+        ]
+
+
+    async def delete_zoom_meetings(self, meeting_ids: Iterable[str]) -> None:
+        """
+        Delete Zoom meetings that were not saved, ignoring the errors.
+
+        Args:
+            meeting_ids (Iterable[str]): The Zoom meeting IDs.
+        """
+        await asyncio.gather(
+            *(self.zoom_request("DELETE", f"{ZOOM_API_BASE_URL}/meetings/{meeting_id}") for meeting_id in meeting_ids),
+            return_exceptions=True
+        )
+
+
+    async def schedule_meetings(self, meetings: Sequence[schemas.BulkMeetingCreate]) -> list[schemas.BulkMeetingResult]:
+        """
+        Schedule many meetings on behalf of users, reserving them before Zoom is called.
+
+        As in `schedule_meeting`, every user's scheduling right is claimed with `claim_meeting_scheduling`
+        and an advisor free at the start time is claimed, so the meetings of the list at the same time get
+        different advisors; the meetings are then inserted without their Zoom details with a single INSERT,
+        and all of it is committed as one reservation. No row lock is held while the Zoom meetings are
+        created concurrently. Their details and the invitations are then saved in a second transaction, and
+        the reservations of the meetings Zoom refused are cancelled. A meeting that cannot be scheduled does
+        not stop the others, but if anything fails after Zoom is called every reservation is cancelled and
+        the Zoom meetings are deleted again. The 7-day rule applies, to one meeting per user.
+
+        Args:
+            meetings (Sequence[schemas.BulkMeetingCreate]): The meetings to schedule.
+
+        Returns:
+            list[schemas.BulkMeetingResult]: The result of every meeting, in the order they were given.
+        """
+        results: list[Optional[schemas.BulkMeetingResult]] = [None] * len(meetings)
+
+        def fail(index: int, error: str) -> None:
+            results[index] = schemas.BulkMeetingResult(index=index, user_id=meetings[index].user_id, status=schemas.BulkMeetingStatus.FAILED, error=error)
+
+        user_service = UserService(self.db)
+        hold_keys = []
+        claims: dict[int, tuple[datetime, Optional[datetime]]] = {}
+        advisors: dict[int, tuple[int, str]] = {}
+        reserved: dict[int, int] = {}
+        try:
+            # Snapshots, since committing the reservation expires the attributes of the session's objects
+            users = {
+                user_id: CurrentUser.model_validate(user)
+                for user_id, user in (await user_service.get_users_by_ids(item.user_id for item in meetings)).items()
+            }
+            for index, item in enumerate(meetings):
+                user = users.get(item.user_id)
+                if user is None:
+                    fail(index, "User not found")
+                    continue
+                claim = None if user.id in claims else await user_service.claim_meeting_scheduling(user.id)
+                if claim is None:
+                    fail(index, "It has not been 7 days since the user last scheduled a meeting")
+                    continue
+                try:
+                    advisor = await get_next_advisor(self.db, item.start_time, commit=False)
+                except HTTPException:
+                    await user_service.release_meeting_scheduling(user.id, *claim)
+                    fail(index, "The advisors are busy, please try again later")
+                    continue
+                if advisor is None:
+                    await user_service.release_meeting_scheduling(user.id, *claim)
+                    fail(index, "No advisors available")
+                    continue
+                hold_keys.append(hold_key(advisor.id, to_utc(item.start_time)))
+                advisors[index] = (advisor.id, advisor.email)
+                claims[user.id] = claim
+
+            if advisors:
+                rows = [
+                    {"user_id": meetings[index].user_id, "advisor_id": advisor_id, "start_time": to_utc(meetings[index].start_time), "topic": meetings[index].topic}
+                    for index, (advisor_id, _) in advisors.items()
+                ]
+                statement = insert(models.Meeting).returning(models.Meeting.id, sort_by_parameter_order=True)
+                reserved = dict(zip(advisors, (await self.execute(statement, rows)).scalars().all()))
+            await self.commit()
+            schedule = get_advisor_schedule()
+            for index, meeting_id in reserved.items():
+                schedule.book(meeting_id, advisors[index][0], to_utc(meetings[index].start_time), force=True)
+        except BaseException:
+            await self.rollback()
+            raise
+        finally:
+            schedule = get_advisor_schedule()
+            for key in hold_keys:
+                schedule.cancel(key)
+        # last_meeting_scheduled is part of the cached identities
+        for user_id in claims:
+            await get_identity_cache().invalidate(users[user_id].email)
+
+        reservations = [(meeting_id, users[meetings[index].user_id], claims[meetings[index].user_id]) for index, meeting_id in reserved.items()]
+        created = []
+        refused = []
+        bookings = []
+        try:
+            created = await self.create_meetings(
+                [(meeting_id, meetings[index].start_time, meetings[index].topic) for index, meeting_id in reserved.items()]
+            )
+            email_service = EmailService(self.db)
+            for (index, (_, advisor_email)), reservation, (new_meeting, meeting_info, error) in zip(advisors.items(), reservations, created):
+                if new_meeting is None:
+                    fail(index, error)
+                    refused.append(reservation)
+                    continue
+                user = reservation[1]
+                email_service.queue_meeting_invitations_to_users(user.email, meeting_info)
+                email_service.queue_meeting_invitations_to_advisors(advisor_email, meeting_info, user)
+                # Read before committing, the commit expires the attributes of the session's objects
+                meeting = schemas.Meeting.model_validate(new_meeting)
+                bookings.append((meeting.id, meeting.advisor_id, meeting.start_time))
+                results[index] = schemas.BulkMeetingResult(index=index, user_id=user.id, status=schemas.BulkMeetingStatus.CREATED, meeting=meeting)
+            await self.commit()
+        except BaseException:
+            await self.rollback()
+            await self.delete_zoom_meetings(str(meeting_info["id"]) for _, meeting_info, _ in created if meeting_info is not None)
+            await self.cancel_reservations(reservations)
+            raise
+
+        if refused:
+            await self.cancel_reservations(refused)
+        schedule = get_advisor_schedule()
+        for booking in bookings:
+            schedule.book(*booking, force=True)
+        return results
+
+
+    async def update_meeting(self, meeting_id: str, meeting_update: schemas.MeetingUpdate) -> models.Meeting | None:
         """
         Update an existing Zoom meeting and its database record.
 
@@ -155,25 +512,71 @@ class MeetingService:
             models.Meeting: The updated meeting.
 
         Raises:
-            HTTPException: If the meeting ID is not found.
+            HTTPException: If the meeting ID is not found (404), or if the advisor is busy at the new time (409).
             PatchMeetingError: If the meeting could not be updated.
+            ServiceUnavailableError: If Zoom is not available.
         """
 
-        access_token = self.get_meeting_access_token()
-        db_meeting: models.Meeting = self.get_meeting_by_zoom_id(meeting_id)
+        db_meeting: models.Meeting = await self.get_meeting_by_zoom_id(meeting_id)
         if not db_meeting:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meeting id not found")
-        
-        url = f"https://api.zoom.us/v2/meetings/{meeting_id}"
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
+
+        # Normalized once, so the database, Zoom and the advisor schedule get the same moment
+        start_time = to_utc(meeting_update.start_time)
+        # Read before the read transaction ends, which expires them
+        advisor_id, topic, previous_start_time = db_meeting.advisor_id, db_meeting.topic, db_meeting.start_time
+        # Refused before calling Zoom, and checked again under the advisor's lock once Zoom moved the meeting
+        overlapping = advisor_id is not None and await find_overlapping_meeting(self, advisor_id, start_time, ignore=db_meeting.id) is not None
+        # No transaction, and so no connection, is held while Zoom is called
+        await self.rollback()
+        if overlapping:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="The advisor is not available at that time")
+
+        await self.patch_zoom_meeting(meeting_id, topic, start_time)
+        try:
+            if advisor_id is not None:
+                # Locking the advisor makes the overlap check race-free, bookings take the same lock for a few
+                # statements. With the synchronous engine a lock wait blocks the event loop, so a locked advisor is refused
+                locked = await self.first(
+                    select(models.Advisor.id).where(models.Advisor.id == advisor_id).with_for_update(skip_locked=not self.is_async)
+                )
+                if locked is None or await find_overlapping_meeting(self, advisor_id, start_time, ignore=db_meeting.id) is not None:
+                    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="The advisor is not available at that time")
+
+            db_meeting.start_time = start_time
+            await self.commit()
+        except BaseException:
+            await self.rollback()
+            # Move the Zoom meeting back, so Zoom and the database agree again
+            with suppress(Exception):
+                await self.patch_zoom_meeting(meeting_id, topic, previous_start_time)
+            raise
+
+        await self.refresh(db_meeting)
+        get_advisor_schedule().book(db_meeting.id, db_meeting.advisor_id, start_time, force=True)
+        return db_meeting
+
+
+    async def patch_zoom_meeting(self, meeting_id: str, topic: str, start_time: datetime) -> None:
+        """
+        Move a Zoom meeting to a new start time.
+
+        Args:
+            meeting_id (str): The Zoom ID of the meeting.
+            topic (str): The topic of the meeting.
+            start_time (datetime): The naive UTC start time.
+
+        Raises:
+            PatchMeetingError: If the meeting could not be updated.
+            ServiceUnavailableError: If Zoom is not available.
+        """
+        url = f"{ZOOM_API_BASE_URL}/meetings/{meeting_id}"
         payload = {
-            "topic": db_meeting.topic,
-            "start_time": meeting_update.start_time.isoformat(),
-            "duration": "30",
-            "timezone": "America/Bogota",
+            "topic": topic,
+            # Zoom reads times ending in "Z" as UTC whatever the timezone of the meeting
+            "start_time": start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "duration": str(MEETING_DURATION_MINUTES),
+            "timezone": MEETING_TIMEZONE,
             "settings": {
                 "join_before_host": True,
                 "jbh_time": 5,
@@ -182,21 +585,12 @@ class MeetingService:
                 "waiting_room": False
             }
         }
-        response = requests.patch(url, headers=headers, data=json.dumps(payload))
-
-        if response.status_code == 204:
-            meeting_data = meeting_update.model_dump(exclude_unset=True)
-            for key, value in meeting_data.items():
-                setattr(db_meeting, key, value)
-            
-            self.db.commit()
-            self.db.refresh(db_meeting)
-            return db_meeting
-        
-        raise PatchMeetingError
+        response = await self.zoom_request("PATCH", url, json=payload)
+        if response.status_code != 204:
+            raise PatchMeetingError
 
     
-    def delete_meeting(self, meeting_id: str) -> models.Meeting | None:
+    async def delete_meeting(self, meeting_id: str) -> models.Meeting | None:
         """
         Delete a Zoom meeting and its database record.
 
@@ -208,23 +602,20 @@ class MeetingService:
 
         Raises:
             DeleteMeetingError: If the meeting could not be deleted.
+            ServiceUnavailableError: If Zoom is not available.
         """
 
-        access_token = self.get_meeting_access_token()
-        url = f"https://api.zoom.us/v2/meetings/{meeting_id}"
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
-        response = requests.delete(url, headers=headers)
+        url = f"{ZOOM_API_BASE_URL}/meetings/{meeting_id}"
+        response = await self.zoom_request("DELETE", url)
 
         if response.status_code == 204:
-            db_meeting= self.get_meeting_by_zoom_id(meeting_id)
+            db_meeting= await self.get_meeting_by_zoom_id(meeting_id)
             if db_meeting is None:
                 return None
             
-            self.db.delete(db_meeting)
-            self.db.commit()
+            await self.delete(db_meeting)
+            await self.commit()
+            get_advisor_schedule().cancel(db_meeting.id)
             return db_meeting
 
         raise DeleteMeetingError
@@ -1,9 +1,11 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from .. import models, schemas
+from .database_service import DatabaseService, DatabaseSession
 from datetime import datetime, timezone, timedelta
 from jose import JWTError, jwt, ExpiredSignatureError
 from pydantic import EmailStr
 from typing import Optional
+import uuid
 from fastapi import HTTPException, status
 from ..config.constants import (
     CONFIRMATION_ACCOUNT_TOKEN_EXPIRE_MINUTES, EMAIL_CONFIRMATION_SECRET_KEY, ALGORITHM,
@@ -12,17 +14,17 @@ from ..config.constants import (
 from ..config.exceptions import credentials_exception, expired_token_exception
 
 
-class TokenServiceBase:
+class TokenServiceBase(DatabaseService):
 
-    def __init__(self, db: Session):
-        self.db = db
+    def __init__(self, db: DatabaseSession):
+        super().__init__(db)
 
 
-    def get_token_info(self, token: str):
+    async def get_token_info(self, token: str):
         pass
 
 
-    def insert_token(self, user_id: int, token:str, expiry: datetime):
+    async def insert_token(self, user_id: int, token:str, expiry: datetime):
         pass
 
 
@@ -30,7 +32,7 @@ class TokenServiceBase:
         pass
 
 
-    def update_token(self, token: str, token_update: schemas.PasswordResetTokenUpdate):
+    async def update_token(self, token: str, token_update: schemas.PasswordResetTokenUpdate):
         pass
 
     
@@ -44,20 +46,20 @@ class PasswordResetTokenService(TokenServiceBase):
     A service class for managing password reset tokens.
 
     Attributes:
-        db (Session): The database session.
+        db (DatabaseSession): The database session.
     """
 
-    def __init__(self, db: Session):
+    def __init__(self, db: DatabaseSession):
         """
         Initialize the PasswordResetTokenService with the provided database session.
 
         Args:
-            db (Session): The database session.
+            db (DatabaseSession): The database session.
         """
         super().__init__(db)
 
 
-    def get_token_info(self, token: str) -> models.PasswordResetToken :
+    async def get_token_info(self, token: str) -> models.PasswordResetToken :
         """
         Retrieve information about a specific password reset token.
 
@@ -67,10 +69,10 @@ class PasswordResetTokenService(TokenServiceBase):
         Returns:
             models.PasswordResetToken: The password reset token information.
         """
-        return self.db.query(models.PasswordResetToken).filter(models.PasswordResetToken.token == token).first()
+        return await self.first(select(models.PasswordResetToken).where(models.PasswordResetToken.token == token))
 
 
-    def insert_token(self, user_id: int, token:str, expiry: datetime) -> models.PasswordResetToken:
+    async def insert_token(self, user_id: int, token:str, expiry: datetime) -> models.PasswordResetToken:
         """
         Insert a new password reset token into the database.
 
@@ -89,8 +91,8 @@ class PasswordResetTokenService(TokenServiceBase):
             expiry= expiry
         )
         self.db.add(password_reset_token)
-        self.db.commit()
-        self.db.refresh(password_reset_token)
+        await self.commit()
+        await self.refresh(password_reset_token)
         return password_reset_token
 
 
@@ -110,7 +112,8 @@ class PasswordResetTokenService(TokenServiceBase):
             expire = datetime.now(timezone.utc) + expires_delta
         else:
             expire = datetime.now(timezone.utc) + timedelta(minutes=RESET_TOKEN_EXPIRE_MINUTES)
-        to_encode.update({'exp' : expire})
+        # The jti keeps tokens issued for the same user within the same second unique
+        to_encode.update({'exp' : expire, 'jti' : uuid.uuid4().hex})
 
         try:
             encoded_jwt = jwt.encode(to_encode, PASSWORD_RESET_SECRET_KEY, algorithm=ALGORITHM)
@@ -119,7 +122,7 @@ class PasswordResetTokenService(TokenServiceBase):
             raise Exception(f"Error encoding JWT: {str(e)}")
 
 
-    def update_token(self, token: str, token_update: schemas.PasswordResetTokenUpdate) -> models.PasswordResetToken :
+    async def update_token(self, token: str, token_update: schemas.PasswordResetTokenUpdate) -> models.PasswordResetToken :
         """
         Update an existing password reset token.
 
@@ -131,7 +134,7 @@ class PasswordResetTokenService(TokenServiceBase):
             models.PasswordResetToken: The updated password reset token.
         """
 
-        token_db = self.get_token_info(token)
+        token_db = await self.get_token_info(token)
         if not token_db:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Token not found")
         update_data = token_update.model_dump()
@@ -139,8 +142,8 @@ class PasswordResetTokenService(TokenServiceBase):
         for key, value in update_data.items():
             setattr(token_db, key, value)
 
-        self.db.commit()
-        self.db.refresh(token_db)
+        await self.commit()
+        await self.refresh(token_db)
         return token_db
 
 
@@ -158,7 +161,7 @@ class PasswordResetTokenService(TokenServiceBase):
             HTTPException: If the token is invalid or expired.
         """
 
-        db_token = self.get_token_info(token)
+        db_token = await self.get_token_info(token)
 
         if db_token is not None and db_token.is_used:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token")
@@ -183,10 +186,10 @@ class EmailConfirmationTokenService(TokenServiceBase):
     A service class for managing email confirmation tokens.
 
     Attributes:
-        db (Session): The database session.
+        db (DatabaseSession): The database session.
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: DatabaseSession):
         """
         Retrieve information about a specific email confirmation token.
 
@@ -199,7 +202,7 @@ class EmailConfirmationTokenService(TokenServiceBase):
         super().__init__(db)
 
 
-    def get_token_info(self, token: str) -> models.EmailConfirmationToken :
+    async def get_token_info(self, token: str) -> models.EmailConfirmationToken :
         """
         Insert a new email confirmation token into the database.
 
@@ -211,10 +214,10 @@ class EmailConfirmationTokenService(TokenServiceBase):
         Returns:
             models.EmailConfirmationToken: The newly created email confirmation token.
         """
-        return self.db.query(models.EmailConfirmationToken).filter(models.EmailConfirmationToken.token == token).first()
+        return await self.first(select(models.EmailConfirmationToken).where(models.EmailConfirmationToken.token == token))
 
 
-    def insert_token(self, user_id: int, token:str, expiry: datetime) -> models.EmailConfirmationToken :
+    async def insert_token(self, user_id: int, token:str, expiry: datetime) -> models.EmailConfirmationToken :
         confirm_account_token = models.EmailConfirmationToken(
             user_id= user_id,
             token= token, 
@@ -222,8 +225,8 @@ class EmailConfirmationTokenService(TokenServiceBase):
             expiry= expiry
         )
         self.db.add(confirm_account_token)
-        self.db.commit()
-        self.db.refresh(confirm_account_token)
+        await self.commit()
+        await self.refresh(confirm_account_token)
 
         return confirm_account_token
 
@@ -245,7 +248,8 @@ class EmailConfirmationTokenService(TokenServiceBase):
             expire = datetime.now(timezone.utc) + expires_delta
         else:
             expire = datetime.now(timezone.utc) + timedelta(minutes=CONFIRMATION_ACCOUNT_TOKEN_EXPIRE_MINUTES)
-        to_encode.update({'exp' : expire})
+        # The jti keeps tokens issued for the same user within the same second unique
+        to_encode.update({'exp' : expire, 'jti' : uuid.uuid4().hex})
 
         try:
             encoded_jwt = jwt.encode(to_encode, EMAIL_CONFIRMATION_SECRET_KEY if secret_key is None else secret_key, algorithm=ALGORITHM)
@@ -254,7 +258,7 @@ class EmailConfirmationTokenService(TokenServiceBase):
             raise Exception(f"Error encoding JWT: {str(e)}")
 
 
-    def update_token(self, token: str, token_update: schemas.PasswordResetTokenUpdate) -> models.EmailConfirmationToken :
+    async def update_token(self, token: str, token_update: schemas.PasswordResetTokenUpdate) -> models.EmailConfirmationToken :
         """
         Update an existing email confirmation token.
 
@@ -265,7 +269,7 @@ class EmailConfirmationTokenService(TokenServiceBase):
         Returns:
             models.EmailConfirmationToken: The updated email confirmation token.
         """
-        token_db = self.get_token_info(token)
+        token_db = await self.get_token_info(token)
         if not token_db:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Token not found")
         update_data = token_update.model_dump()
@@ -273,8 +277,8 @@ class EmailConfirmationTokenService(TokenServiceBase):
         for key, value in update_data.items():
             setattr(token_db, key, value)
 
-        self.db.commit()
-        self.db.refresh(token_db)
+        await self.commit()
+        await self.refresh(token_db)
         return token_db
 
 
@@ -291,7 +295,7 @@ class EmailConfirmationTokenService(TokenServiceBase):
         Raises:
             HTTPException: If the token is invalid or expired.
         """
-        db_token = self.get_token_info(token)
+        db_token = await self.get_token_info(token)
 
         if db_token is not None and db_token.is_used:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token")
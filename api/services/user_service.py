@@ -1,42 +1,75 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import selectinload, load_only, raiseload
+from typing import AsyncIterator, Iterable, Optional
+from datetime import datetime
 from .. import models, schemas
-from passlib.context import CryptContext
+from .database_service import DatabaseService, DatabaseSession
+from ..utils.password_utils import hash_password
+from ..utils.identity_cache import SNAPSHOT_FIELDS, get_identity_cache
 from fastapi import HTTPException, status
 
-crypt = CryptContext(schemes= ["bcrypt"])
 
+# Relationships serialized by schemas.User
+USER_RELATIONSHIPS = ("meetings", "reset_tokens", "email_confirmation_tokens")
 
-class UserService:
+# Unique columns checked on registration, in the order their conflicts are reported
+REGISTRATION_CONFLICTS = (
+    ("email", "Email alredy registered"),
+    ("phone_number", "Phone number alredy registered"),
+    ("document", "Document alredy registered"),
+)
+
+
+class UserService(DatabaseService):
     """
     A service class for managing user-related operations.
 
     Attributes:
-        db (Session): The database session.
+        db (DatabaseSession): The database session.
     """
 
-    def __init__(self, db: Session):
+    def __init__(self, db: DatabaseSession):
         """
         Initialize the UserService with the provided database session.
 
         Args:
-            db (Session): The database session.
+            db (DatabaseSession): The database session.
         """
-        self.db = db
+        super().__init__(db)
 
-    def get_user_by_id(self, user_id: int) -> models.User:
+    async def get_user_by_id(self, user_id: int, with_relationships: bool = False) -> models.User:
         """
         Retrieve a user by their ID.
 
         Args:
             user_id (int): The ID of the user.
+            with_relationships (bool): Whether to eager load the relationships serialized by schemas.User.
 
         Returns:
             models.User: The user with the specified ID, or None if not found.
         """
-        return self.db.query(models.User).filter(models.User.id == user_id).first()
+        statement = select(models.User).where(models.User.id == user_id)
+        if with_relationships:
+            statement = statement.options(*(selectinload(getattr(models.User, name)) for name in USER_RELATIONSHIPS))
+        return await self.first(statement)
+
+
+    async def get_users_by_ids(self, user_ids: Iterable[int]) -> dict[int, models.User]:
+        """
+        Retrieve several users by their IDs with a single query.
 
+        Args:
+            user_ids (Iterable[int]): The IDs of the users.
 
-    def get_user_by_email(self, user_email: str) -> models.User:
+        Returns:
+            dict[int, models.User]: The users found, by ID. Unknown IDs are left out.
+        """
+        users = await self.all(select(models.User).where(models.User.id.in_(set(user_ids))))
+        return {user.id: user for user in users}
+
+
+    async def get_user_by_email(self, user_email: str) -> models.User:
         """
         Retrieve a user by their email address.
 
@@ -46,10 +79,10 @@ class UserService:
         Returns:
             models.User: The user with the specified email, or None if not found.
         """
-        return self.db.query(models.User).filter(models.User.email == user_email).first()
+        return await self.first(select(models.User).where(models.User.email == user_email))
 
 
-    def get_user_by_phone_number(self, phone_number: str) -> models.User:
+    async def get_user_by_phone_number(self, phone_number: str) -> models.User:
         """
         Retrieve a user by their phone number.
 
@@ -59,10 +92,10 @@ class UserService:
         Returns:
             models.User: The user with the specified phone number, or None if not found.
         """
-        return self.db.query(models.User).filter(models.User.phone_number == phone_number).first()
+        return await self.first(select(models.User).where(models.User.phone_number == phone_number))
 
 
-    def get_user_by_document(self, document: str) -> models.User:
+    async def get_user_by_document(self, document: str) -> models.User:
         """
         Retrieve a user by their document.
 
@@ -72,38 +105,79 @@ class UserService:
         Returns:
             models.User: The user with the specified document, or None if not found.
         """
-        return self.db.query(models.User).filter(models.User.document == document).first()
+        return await self.first(select(models.User).where(models.User.document == document))
 
 
-    def create_user(self, user: schemas.UserCreate) -> models.User:
+    async def create_user(self, user: schemas.UserCreate) -> models.User:
         """
         Create a new user.
 
+        The user is inserted with a single INSERT ... ON CONFLICT DO NOTHING that relies on the unique
+        constraints on email, phone number and document, so two concurrent registrations cannot both pass
+        the check. Only when the insert conflicts is one more query run to tell which value is taken. When
+        a password is given, its email is first looked up on the unique index, so registering a taken email
+        again, the usual conflict, is answered without hashing the password. The user is not committed: it
+        is committed along with whatever the caller adds next.
+
         Args:
             user (schemas.UserCreate): The user data for creating a new user.
 
         Returns:
             models.User: The newly created user.
+
+        Raises:
+            HTTPException: If the email, phone number or document is already registered (status code 400).
         """
         data = user.model_dump(exclude_unset=True)
-        
-        password_hash = crypt.hash(user.plain_password) if "plain_password" in data else None
 
-        db_user = models.User(
-            first_name= user.first_name,
-            second_name= user.second_name,
-            lastname= user.lastname,
-            email= user.email,
-            phone_number= user.phone_number,
-            document= user.document,
-            password_hash= password_hash)
-        self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
+        password_hash = None
+        if "plain_password" in data:
+            if await self.first(select(models.User.id).where(models.User.email == user.email)) is not None:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=REGISTRATION_CONFLICTS[0][1])
+            password_hash = await hash_password(user.plain_password)
+
+        db_user = await self.first(
+            insert(models.User)
+            .values(
+                first_name= user.first_name,
+                second_name= user.second_name,
+                lastname= user.lastname,
+                email= user.email,
+                phone_number= user.phone_number,
+                document= user.document,
+                password_hash= password_hash)
+            .on_conflict_do_nothing()
+            .returning(models.User)
+        )
+        if db_user is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=await self.get_registration_conflict(user))
         return db_user
 
 
-    def create_user_google(self, user: schemas.UserCreateGoogle) -> models.User:
+    async def get_registration_conflict(self, user: schemas.UserCreate) -> str:
+        """
+        Find which unique value of a registration is already taken, with one combined query.
+
+        Args:
+            user (schemas.UserCreate): The user data that could not be inserted.
+
+        Returns:
+            str: The message of the first taken value, in the order email, phone number, document.
+        """
+        values = {column: getattr(user, column) for column, _ in REGISTRATION_CONFLICTS if getattr(user, column) is not None}
+        taken = (await self.execute(
+            select(*(getattr(models.User, column) for column in values))
+            .where(or_(*(getattr(models.User, column) == value for column, value in values.items())))
+        )).all()
+
+        for column, message in REGISTRATION_CONFLICTS:
+            if column in values and any(getattr(row, column) == values[column] for row in taken):
+                return message
+        # The conflicting user was deleted between the insert and this query
+        return "User alredy registered"
+
+
+    async def create_user_google(self, user: schemas.UserCreateGoogle) -> models.User:
         """
         Create a new user.
 
@@ -115,7 +189,7 @@ class UserService:
         """
         data = user.model_dump(exclude_unset=True)
         
-        password_hash = crypt.hash(user.plain_password) if "plain_password" in data else None
+        password_hash = await hash_password(user.plain_password) if "plain_password" in data else None
 
         db_user = models.User(
             first_name= user.first_name,
@@ -127,13 +201,13 @@ class UserService:
             password_hash= password_hash,
             google_access_token= user.google_access_token)
         self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
+        await self.commit()
+        await self.refresh(db_user)
         return db_user
 
     
 
-    def update_user(self, user_id: int, user_update: schemas.UserUpdate) -> models.User:
+    async def update_user(self, user_id: int, user_update: schemas.UserUpdate) -> models.User:
         """
         Update an existing user.
 
@@ -147,28 +221,34 @@ class UserService:
         Raises:
             HTTPException: If the user is not found or if there are unique constraint violations.
         """
-        db_user = self.get_user_by_id(user_id)
+        db_user = await self.get_user_by_id(user_id)
         if not db_user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
         
-        self.check_unique_constraints(db_user, user_update)
+        await self.check_unique_constraints(db_user, user_update)
         
         update_data = user_update.model_dump(exclude_unset=True)
+        previous_email = db_user.email
+        changes_identity = any(key in SNAPSHOT_FIELDS and getattr(db_user, key) != value for key, value in update_data.items())
 
         if "plain_password" in update_data:
-            password_hash = crypt.hash(update_data.get("plain_password"))
+            password_hash = await hash_password(update_data.get("plain_password"))
             update_data["password_hash"] = password_hash
             del update_data["plain_password"]
         
         for key, value in update_data.items():
             setattr(db_user, key, value)
 
-        self.db.commit()
-        self.db.refresh(db_user)
+        await self.commit()
+        await self.refresh(db_user)
+
+        # Cached identities would keep a stale role, status or email until they expire
+        if changes_identity:
+            await get_identity_cache().invalidate(previous_email)
         return db_user
 
 
-    def delete_user(self, user_id: int) -> models.User:
+    async def delete_user(self, user_id: int) -> models.User:
         """
         Delete an existing user.
 
@@ -178,16 +258,77 @@ class UserService:
         Returns:
             models.User: The deleted user, or None if the user was not found.
         """
-        db_user = self.get_user_by_id(user_id)
+        db_user = await self.get_user_by_id(user_id, with_relationships=True)
         if db_user is None:
             return None
         
-        self.db.delete(db_user)
-        self.db.commit()
+        email = db_user.email
+        await self.delete(db_user)
+        await self.commit()
+        await get_identity_cache().invalidate(email)
         return db_user
 
 
-    def check_unique_constraints(self, db_user: models.User ,user_update: schemas.UserUpdate) -> None:
+    async def claim_meeting_scheduling(self, user_id: int) -> Optional[tuple[datetime, Optional[datetime]]]:
+        """
+        Set the time the user last scheduled a meeting to now, if the user is allowed to schedule one.
+
+        It is a single conditional `UPDATE ... RETURNING`, so the 7-day rule holds under concurrent requests:
+        the user's row is claimed only if it has been MEETING_SCHEDULING_INTERVAL since their last meeting,
+        and it stays locked until the caller commits or rolls back. Another request of the same user skips
+        the locked row instead of waiting for it, so it is rejected in that one round-trip. Rolling back
+        releases the claim, and `release_meeting_scheduling` gives back a claim already committed. The caller
+        also invalidates the cached identities of the user after committing, since their snapshot includes
+        this time.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            Optional[tuple[datetime, Optional[datetime]]]: The new last_meeting_scheduled and the one it
+            replaced, or None if the user scheduled a meeting too recently, is scheduling one right now, or
+            does not exist.
+        """
+        claimable_user = (
+            select(models.User.id, models.User.last_meeting_scheduled.label("previous"))
+            .where(
+                models.User.id == user_id,
+                or_(models.User.last_meeting_scheduled.is_(None), models.User.last_meeting_scheduled <= func.now() - models.MEETING_SCHEDULING_INTERVAL)
+            )
+            .with_for_update(skip_locked=True)
+            .subquery()
+        )
+        claim = (await self.execute(
+            update(models.User)
+            .where(models.User.id == claimable_user.c.id)
+            .values(last_meeting_scheduled=func.now())
+            .returning(models.User.last_meeting_scheduled, claimable_user.c.previous)
+            .execution_options(synchronize_session=False)
+        )).first()
+        return tuple(claim) if claim is not None else None
+
+
+    async def release_meeting_scheduling(self, user_id: int, claimed_at: datetime, previous: Optional[datetime]) -> None:
+        """
+        Give back a committed claim of `claim_meeting_scheduling`, e.g. because the meeting could not be created.
+
+        The previous time is only restored while the user's last_meeting_scheduled is still the claimed one.
+        The caller commits.
+
+        Args:
+            user_id (int): The ID of the user.
+            claimed_at (datetime): The time set by the claim.
+            previous (Optional[datetime]): The time the claim replaced.
+        """
+        await self.execute(
+            update(models.User)
+            .where(models.User.id == user_id, models.User.last_meeting_scheduled == claimed_at)
+            .values(last_meeting_scheduled=previous)
+            .execution_options(synchronize_session=False)
+        )
+
+
+    async def check_unique_constraints(self, db_user: models.User ,user_update: schemas.UserUpdate) -> None:
         """
         Check for unique constraint violations when updating a user.
 
@@ -200,12 +341,12 @@ class UserService:
         """
 
         if user_update.email and user_update.email != db_user.email:
-            exists_email = self.get_user_by_email(user_update.email)
+            exists_email = await self.get_user_by_email(user_update.email)
             if exists_email:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
 
         if user_update.phone_number and user_update.phone_number != db_user.phone_number:
-            exists_phone_number = self.get_user_by_phone_number(user_update.phone_number)
+            exists_phone_number = await self.get_user_by_phone_number(user_update.phone_number)
             if exists_phone_number:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Phone number already registered")
 
@@ -216,20 +357,20 @@ class AdminService(UserService):
     A service class for managing admin-related user operations, extending the functionality of UserService.
 
     Attributes:
-        db (Session): The database session.
+        db (DatabaseSession): The database session.
     """
 
-    def __init__(self, db: Session):
+    def __init__(self, db: DatabaseSession):
         """
         Initialize the AdminService with the provided database session.
 
         Args:
-            db (Session): The database session.
+            db (DatabaseSession): The database session.
         """
 
         super().__init__(db)
 
-    def create_user(self, user: schemas.UserCreateByAdmin) -> models.User:
+    async def create_user(self, user: schemas.UserCreateByAdmin) -> models.User:
         """
         Create a new user with admin privileges.
 
@@ -245,7 +386,7 @@ class AdminService(UserService):
 
         data = user.model_dump(exclude_unset=True)
         
-        password_hash = crypt.hash(user.plain_password) if "plain_password" in data else None
+        password_hash = await hash_password(user.plain_password) if "plain_password" in data else None
 
         db_user = models.User(
             first_name= user.first_name,
@@ -258,6 +399,75 @@ class AdminService(UserService):
             role= user.role,
             google_access_token= user.google_access_token)
         self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
-        return db_user
\ No newline at end of file
+        await self.commit()
+        await self.refresh(db_user)
+        return db_user
+
+
+    def users_statement(self, view: schemas.UserView) -> Select:
+        """
+        Build the statement used to read users in bulk for the given projection.
+
+        The full view eager loads every relationship with one SELECT ... IN query per relationship, so a
+        page costs the same number of queries whatever its size. The summary view only loads the columns
+        it needs and refuses to lazy load any relationship.
+
+        Args:
+            view (schemas.UserView): The projection of the users.
+
+        Returns:
+            Select: The statement, ordered by user ID.
+        """
+        statement = select(models.User).order_by(models.User.id)
+        if view == schemas.UserView.FULL:
+            return statement.options(*(selectinload(getattr(models.User, name)) for name in USER_RELATIONSHIPS))
+        return statement.options(
+            load_only(
+                models.User.first_name, models.User.second_name, models.User.lastname, models.User.email,
+                models.User.phone_number, models.User.is_active, models.User.role
+            ),
+            raiseload("*")
+        )
+
+
+    async def get_users_page(self, after_id: Optional[int], limit: int, view: schemas.UserView) -> list[models.User]:
+        """
+        Retrieve a page of users using keyset pagination on the user ID.
+
+        Args:
+            after_id (Optional[int]): The ID of the last user of the previous page, or None for the first page.
+            limit (int): The maximum number of users in the page.
+            view (schemas.UserView): The projection of the users.
+
+        Returns:
+            list[models.User]: The users with an ID greater than after_id, in ID order.
+        """
+        statement = self.users_statement(view)
+        if after_id is not None:
+            statement = statement.where(models.User.id > after_id)
+        return await self.all(statement.limit(limit))
+
+
+    async def iter_user_pages(self, view: schemas.UserView, batch_size: int) -> AsyncIterator[list[models.User]]:
+        """
+        Iterate over every user, one keyset page at a time.
+
+        The users of a page are detached from the session once the next page is requested,
+        so memory stays bounded by the batch size.
+
+        Args:
+            view (schemas.UserView): The projection of the users.
+            batch_size (int): The number of users per page.
+
+        Yields:
+            list[models.User]: The next page of users.
+        """
+        after_id = None
+        while True:
+            page = await self.get_users_page(after_id, batch_size, view)
+            if not page:
+                return
+            yield page
+            after_id = page[-1].id
+            for user in page:
+                self.db.expunge(user)
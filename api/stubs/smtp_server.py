@@ -0,0 +1,118 @@
+"""
+Local SMTP stand-in for tests and benchmarks.
+
+Accepts every message without delivering it and keeps the received envelopes in memory.
+Requires the optional `aiosmtpd` package.
+
+Run it with:
+    python -m api.stubs.smtp_server --port 1025
+
+and point the API at it with MAIL_SERVER=127.0.0.1, MAIL_PORT=1025 and MAIL_STARTTLS=false.
+"""
+import argparse
+import threading
+import time
+
+
+class LocalSMTPServer:
+    """
+    An in-memory SMTP server running in a background thread.
+
+    Attributes:
+        hostname (str): The address the server listens on.
+        port (int): The port the server listens on.
+        messages (list): The envelopes received so far.
+        sessions (int): The number of SMTP connections opened by clients so far.
+    """
+
+    def __init__(self, hostname: str = "127.0.0.1", port: int = 1025):
+        self.hostname = hostname
+        self.port = port
+        self.messages: list = []
+        self.sessions = 0
+        self._lock = threading.Lock()
+        self._controller = None
+
+
+    async def handle_DATA(self, server, session, envelope) -> str:
+        with self._lock:
+            self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+    def _count_session(self, *args) -> None:
+        with self._lock:
+            self.sessions += 1
+
+
+    def start(self) -> "LocalSMTPServer":
+        """
+        Start listening in a background thread.
+
+        Returns:
+            LocalSMTPServer: The running server.
+
+        Raises:
+            RuntimeError: If aiosmtpd is not installed.
+        """
+        try:
+            from aiosmtpd.controller import Controller
+            from aiosmtpd.smtp import SMTP
+        except ImportError as error:
+            raise RuntimeError("The local SMTP server requires the 'aiosmtpd' package") from error
+
+        stub = self
+
+        class CountingSMTP(SMTP):
+            def connection_made(self, transport):
+                stub._count_session()
+                super().connection_made(transport)
+
+        class StubController(Controller):
+            def factory(self):
+                return CountingSMTP(self.handler, **self.SMTP_kwargs)
+
+        self._controller = StubController(self, hostname=self.hostname, port=self.port)
+        self._controller.start()
+        return self
+
+
+    def stop(self) -> None:
+        """
+        Stop the server.
+        """
+        if self._controller is not None:
+            self._controller.stop()
+            self._controller = None
+
+
+    def clear(self) -> None:
+        """
+        Forget the messages and sessions received so far.
+        """
+        with self._lock:
+            self.messages.clear()
+            self.sessions = 0
+
+
+    def __enter__(self) -> "LocalSMTPServer":
+        return self.start()
+
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Run a local SMTP server that accepts and discards every message.")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    argument_parser.add_argument("--port", type=int, default=1025)
+    arguments = argument_parser.parse_args()
+
+    with LocalSMTPServer(arguments.host, arguments.port) as smtp_server:
+        print(f"Local SMTP server listening on {arguments.host}:{arguments.port}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,322 @@
+"""
+Local Zoom API stand-in for load tests and CI.
+
+Implements the part of the Zoom API used by MeetingService: the Server-to-Server OAuth token endpoint and
+the create, read, update and delete meeting endpoints, answering with the status codes Zoom uses. Meetings
+are kept in memory. Latency, a random error rate and a rate limit can be configured to exercise the
+retries and the circuit breaker of the API.
+
+Run it with:
+    python -m api.stubs.zoom_server --port 8090 [--latency 0.05] [--error-rate 0.01] [--rate-limit 30]
+
+and point the API at it with ZOOM_API_BASE_URL=http://127.0.0.1:8090/v2 and
+ZOOM_OAUTH_TOKEN_URL=http://127.0.0.1:8090/oauth/token.
+"""
+import argparse
+import asyncio
+import math
+import random
+import secrets
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+
+def to_zoom_start_time(start_time: str, time_zone: Optional[str]) -> str:
+    """
+    Convert a start time the way Zoom does: times ending in "Z" are UTC, any other offset is ignored and the
+    time is read in the timezone of the meeting.
+
+    Args:
+        start_time (str): The start time sent to Zoom.
+        time_zone (Optional[str]): The timezone of the meeting. Defaults to UTC.
+
+    Returns:
+        str: The start time in UTC, formatted like Zoom ("2024-06-20T17:20:00Z").
+    """
+    if start_time.endswith("Z"):
+        moment = datetime.fromisoformat(start_time[:-1]).replace(tzinfo=timezone.utc)
+    else:
+        moment = datetime.fromisoformat(start_time).replace(tzinfo=ZoneInfo(time_zone or "UTC"))
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FakeZoom:
+    """
+    The state and behaviour of the fake Zoom API.
+
+    The settings can be changed while the server is running, e.g. by a test simulating an outage.
+
+    Attributes:
+        latency (float): Seconds every API request waits before being answered.
+        error_rate (float): Probability, between 0 and 1, that an API request fails with `error_status`.
+        error_status (int): The status of the random failures, e.g. 500 or 503.
+        rate_limit (int): API requests accepted per second, 0 for no limit. Extra requests get a 429.
+        token_ttl (int): Lifetime in seconds of the access tokens.
+        meetings (dict[int, dict]): The meetings, by ID.
+        requests (Counter): The number of requests received, by "METHOD /route".
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, error_status: int = 500, rate_limit: int = 0, token_ttl: int = 3599, seed: Optional[int] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.token_ttl = token_ttl
+        self.meetings: dict[int, dict] = {}
+        self.requests: Counter = Counter()
+        self._tokens: dict[str, float] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = 0
+        self._window_requests = 0
+        self.app = self.create_app()
+
+
+    def reset(self) -> None:
+        """
+        Forget the meetings, tokens and requests, and go back to a healthy, unlimited API.
+        """
+        with self._lock:
+            self.latency = 0.0
+            self.error_rate = 0.0
+            self.rate_limit = 0
+            self.meetings.clear()
+            self.requests.clear()
+            self._tokens.clear()
+
+
+    def _next_meeting_id(self) -> int:
+        while True:
+            meeting_id = self._random.randrange(10**10, 10**11)
+            if meeting_id not in self.meetings:
+                return meeting_id
+
+
+    def _rate_limited(self) -> Optional[float]:
+        # Fixed one-second windows; returns the seconds until the next window when the limit is reached
+        if not self.rate_limit:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            window = int(now)
+            if window != self._window:
+                self._window, self._window_requests = window, 0
+            self._window_requests += 1
+            if self._window_requests > self.rate_limit:
+                return window + 1 - now
+        return None
+
+
+    async def _api_guard(self, request: Request) -> Optional[Response]:
+        # What every API request goes through before reaching its endpoint: latency, auth, rate limit and errors
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        authorization = request.headers.get("Authorization", "")
+        token = authorization.removeprefix("Bearer ")
+        if not authorization.startswith("Bearer ") or self._tokens.get(token, 0) < time.monotonic():
+            return JSONResponse({"code": 124, "message": "Invalid access token."}, status_code=401)
+
+        wait = self._rate_limited()
+        if wait is not None:
+            return JSONResponse(
+                {"code": 429, "message": "You have reached the maximum per-second rate limit for this API. Try again later."},
+                status_code=429,
+                headers={"Retry-After": str(max(math.ceil(wait), 1))}
+            )
+
+        if self.error_rate and self._random.random() < self.error_rate:
+            return JSONResponse({"code": self.error_status, "message": "Internal error."}, status_code=self.error_status)
+        return None
+
+
+    def _meeting_not_found(self, meeting_id: int) -> JSONResponse:
+        return JSONResponse({"code": 3001, "message": f"Meeting does not exist: {meeting_id}."}, status_code=404)
+
+
+    def create_app(self) -> FastAPI:
+        """
+        Build the ASGI app serving the fake API.
+
+        Returns:
+            FastAPI: The app.
+        """
+        app = FastAPI(title="Fake Zoom API", docs_url=None, redoc_url=None, openapi_url=None)
+
+        @app.middleware("http")
+        async def count_requests(request: Request, call_next):
+            route = request.url.path
+            if route.startswith("/v2/meetings/"):
+                route = "/v2/meetings/{meetingId}"
+            with self._lock:
+                self.requests[f"{request.method} {route}"] += 1
+            return await call_next(request)
+
+        @app.post("/oauth/token")
+        async def issue_token(request: Request):
+            form = await request.form()
+            if not request.headers.get("Authorization", "").startswith("Basic ") or form.get("grant_type") != "account_credentials":
+                return JSONResponse({"reason": "Invalid client_id or client_secret", "error": "invalid_client"}, status_code=400)
+            token = secrets.token_urlsafe(32)
+            self._tokens[token] = time.monotonic() + self.token_ttl
+            return {"access_token": token, "token_type": "bearer", "expires_in": self.token_ttl, "scope": "meeting:write:admin meeting:read:admin"}
+
+        @app.post("/v2/users/me/meetings")
+        async def create_meeting(request: Request):
+            if (error := await self._api_guard(request)) is not None:
+                return error
+            payload = await request.json()
+            meeting_id = self._next_meeting_id()
+            time_zone = payload.get("timezone")
+            meeting = {
+                "id": meeting_id,
+                "uuid": secrets.token_urlsafe(16),
+                "host_id": "fake-host",
+                "topic": payload.get("topic", "Zoom Meeting"),
+                "type": payload.get("type", 2),
+                "start_time": to_zoom_start_time(payload["start_time"], time_zone),
+                "duration": int(payload.get("duration", 60)),
+                "timezone": time_zone,
+                "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "join_url": f"https://zoom.us/j/{meeting_id}?pwd={secrets.token_urlsafe(12)}",
+                "settings": payload.get("settings", {}),
+            }
+            self.meetings[meeting_id] = meeting
+            return JSONResponse(meeting, status_code=201)
+
+        @app.get("/v2/meetings/{meeting_id}")
+        async def get_meeting(meeting_id: int, request: Request):
+            if (error := await self._api_guard(request)) is not None:
+                return error
+            if meeting_id not in self.meetings:
+                return self._meeting_not_found(meeting_id)
+            return self.meetings[meeting_id]
+
+        @app.patch("/v2/meetings/{meeting_id}")
+        async def update_meeting(meeting_id: int, request: Request):
+            if (error := await self._api_guard(request)) is not None:
+                return error
+            if meeting_id not in self.meetings:
+                return self._meeting_not_found(meeting_id)
+            payload = await request.json()
+            meeting = self.meetings[meeting_id]
+            for key in ("topic", "duration", "timezone", "settings"):
+                if key in payload:
+                    meeting[key] = payload[key]
+            if "start_time" in payload:
+                meeting["start_time"] = to_zoom_start_time(payload["start_time"], meeting["timezone"])
+            return Response(status_code=204)
+
+        @app.delete("/v2/meetings/{meeting_id}")
+        async def delete_meeting(meeting_id: int, request: Request):
+            if (error := await self._api_guard(request)) is not None:
+                return error
+            if self.meetings.pop(meeting_id, None) is None:
+                return self._meeting_not_found(meeting_id)
+            return Response(status_code=204)
+
+        return app
+
+
+class FakeZoomServer:
+    """
+    A FakeZoom served over HTTP by uvicorn in a background thread.
+
+    Attributes:
+        hostname (str): The address the server listens on.
+        port (int): The port the server listens on.
+        zoom (FakeZoom): The fake API, whose settings and meetings can be inspected and changed.
+    """
+
+    def __init__(self, hostname: str = "127.0.0.1", port: int = 8090, zoom: Optional[FakeZoom] = None):
+        self.hostname = hostname
+        self.port = port
+        self.zoom = zoom if zoom is not None else FakeZoom()
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+
+    @property
+    def api_base_url(self) -> str:
+        return f"http://{self.hostname}:{self.port}/v2"
+
+
+    @property
+    def oauth_token_url(self) -> str:
+        return f"http://{self.hostname}:{self.port}/oauth/token"
+
+
+    def start(self, timeout: float = 10.0) -> "FakeZoomServer":
+        """
+        Start listening in a background thread and wait until the server accepts connections.
+
+        Args:
+            timeout (float): Seconds to wait for the server to start.
+
+        Returns:
+            FakeZoomServer: The running server.
+
+        Raises:
+            RuntimeError: If the server did not start in time.
+        """
+        import uvicorn
+
+        config = uvicorn.Config(self.zoom.app, host=self.hostname, port=self.port, log_level="warning", lifespan="off")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, name="fake-zoom", daemon=True)
+        self._thread.start()
+
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"The fake Zoom server could not start on {self.hostname}:{self.port}")
+            time.sleep(0.01)
+        return self
+
+
+    def stop(self) -> None:
+        """
+        Stop the server.
+        """
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+
+    def __enter__(self) -> "FakeZoomServer":
+        return self.start()
+
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    argument_parser = argparse.ArgumentParser(description="Run a local stand-in of the Zoom API.")
+    argument_parser.add_argument("--host", default="127.0.0.1")
+    argument_parser.add_argument("--port", type=int, default=8090)
+    argument_parser.add_argument("--latency", type=float, default=0.0, help="Seconds every API request waits before being answered")
+    argument_parser.add_argument("--error-rate", type=float, default=0.0, help="Probability that an API request fails")
+    argument_parser.add_argument("--error-status", type=int, default=500, help="Status of the random failures")
+    argument_parser.add_argument("--rate-limit", type=int, default=0, help="API requests accepted per second, 0 for no limit")
+    argument_parser.add_argument("--seed", type=int, default=None)
+    arguments = argument_parser.parse_args()
+
+    fake_zoom = FakeZoom(
+        latency=arguments.latency,
+        error_rate=arguments.error_rate,
+        error_status=arguments.error_status,
+        rate_limit=arguments.rate_limit,
+        seed=arguments.seed
+    )
+    uvicorn.run(fake_zoom.app, host=arguments.host, port=arguments.port, log_level="warning")
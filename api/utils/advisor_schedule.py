@@ -0,0 +1,305 @@
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from itertools import count
+from typing import Hashable, Iterable, Optional
+from zoneinfo import ZoneInfo
+from sqlalchemy import func, select
+from .. import models
+from ..config.constants import MEETING_DURATION_MINUTES, MEETING_TIMEZONE
+from ..services.database_service import DatabaseService
+
+_advisor_schedule: Optional["AdvisorSchedule"] = None
+
+
+def to_utc(start_time: datetime) -> datetime:
+    """
+    Convert a meeting start time to naive UTC, the way it is stored in the database.
+
+    Naive times are in MEETING_TIMEZONE, the timezone the meetings are created with in Zoom.
+
+    Args:
+        start_time (datetime): The start time of the meeting.
+
+    Returns:
+        datetime: The start time as a naive UTC datetime.
+    """
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=ZoneInfo(MEETING_TIMEZONE))
+    return start_time.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class AdvisorSchedule:
+    """
+    An in-memory index of the slots booked by every advisor.
+
+    All meetings last `duration`, so two meetings overlap exactly when their start times are less than
+    `duration` apart. That turns "who is busy at T" into a range lookup on the start times: the index keeps
+    every booked start in one sorted list (for "which advisors are busy at T") and in a sorted list per
+    advisor (for "is this advisor free at T"), and both are answered with a binary search in O(log n + k),
+    k being the number of meetings overlapping T. Advisors are also bucketed by their number of bookings,
+    so the least-loaded free advisors are found without scanning every advisor. Only the meetings that have
+    not ended are kept (see `expire`), so the loads count upcoming meetings and the index does not grow
+    with the history of the meetings table.
+
+    The index is rebuilt from the database on startup and kept up to date by this process; meetings booked
+    by other processes are only picked up by the next rebuild, or when a booking runs into them. It is a
+    hint for picking advisors: bookings are checked against the database with `find_overlapping_meeting`.
+
+    Attributes:
+        duration (timedelta): The length of every meeting.
+        loaded (bool): Whether the index has been built from the database.
+    """
+
+    def __init__(self, duration: timedelta = timedelta(minutes=MEETING_DURATION_MINUTES)):
+        self.duration = duration
+        self._reset()
+
+
+    def _reset(self) -> None:
+        self.loaded = False
+        self._sequence = count()
+        self._entries: dict[Hashable, tuple[int, datetime, int]] = {}
+        self._keys: dict[int, Hashable] = {}
+        self._starts: list[tuple[datetime, int, int]] = []
+        self._advisor_starts: dict[int, list[tuple[datetime, int]]] = {}
+        self._loads: dict[int, int] = {}
+        self._load_buckets: dict[int, set[int]] = {}
+        self._load_levels: list[int] = []
+        self._max_advisor_id = 0
+
+
+    def load(self, advisor_ids: Iterable[int], bookings: Iterable[tuple[Hashable, int, datetime]]) -> None:
+        """
+        Replace the content of the index.
+
+        Args:
+            advisor_ids (Iterable[int]): The IDs of every advisor, booked or not.
+            bookings (Iterable[tuple[Hashable, int, datetime]]): The (key, advisor ID, naive UTC start) of every booked slot.
+        """
+        self._reset()
+        for advisor_id in advisor_ids:
+            self.add_advisor(advisor_id)
+
+        for key, advisor_id, start in bookings:
+            self.add_advisor(advisor_id)
+            sequence = next(self._sequence)
+            self._entries[key] = (advisor_id, start, sequence)
+            self._keys[sequence] = key
+            self._starts.append((start, sequence, advisor_id))
+            self._advisor_starts[advisor_id].append((start, sequence))
+            self._loads[advisor_id] += 1
+
+        # Sorting once is much cheaper than inserting the bookings one by one
+        self._starts.sort()
+        for starts in self._advisor_starts.values():
+            starts.sort()
+        self._load_buckets = {}
+        for advisor_id, load in self._loads.items():
+            self._load_buckets.setdefault(load, set()).add(advisor_id)
+        self._load_levels = sorted(self._load_buckets)
+        self.loaded = True
+
+
+    async def rebuild(self, database: DatabaseService) -> None:
+        """
+        Rebuild the index from the advisors and the meetings in the database that have not ended yet.
+
+        Args:
+            database (DatabaseService): The service used to read the database.
+        """
+        advisor_ids = (await database.execute(select(models.Advisor.id))).scalars().all()
+        meetings = (await database.execute(
+            select(models.Meeting.id, models.Meeting.advisor_id, models.Meeting.start_time)
+            .where(
+                models.Meeting.advisor_id.is_not(None),
+                models.Meeting.start_time > func.timezone("UTC", func.now()) - self.duration
+            )
+        )).all()
+        self.load(advisor_ids, ((meeting_id, advisor_id, start) for meeting_id, advisor_id, start in meetings))
+
+
+    async def sync_advisors(self, database: DatabaseService) -> None:
+        """
+        Add the advisors created since the index was built. Checking for them is a single index lookup.
+
+        Args:
+            database (DatabaseService): The service used to read the database.
+        """
+        max_advisor_id = (await database.execute(select(func.max(models.Advisor.id)))).scalar()
+        if max_advisor_id is None or max_advisor_id <= self._max_advisor_id:
+            return
+        new_ids = (await database.execute(select(models.Advisor.id).where(models.Advisor.id > self._max_advisor_id))).scalars().all()
+        for advisor_id in new_ids:
+            self.add_advisor(advisor_id)
+
+
+    def add_advisor(self, advisor_id: int) -> None:
+        if advisor_id in self._loads:
+            return
+        self._loads[advisor_id] = 0
+        self._advisor_starts[advisor_id] = []
+        self._move_to_bucket(advisor_id, None, 0)
+        self._max_advisor_id = max(self._max_advisor_id, advisor_id)
+
+
+    def _move_to_bucket(self, advisor_id: int, previous: Optional[int], load: int) -> None:
+        if previous is not None:
+            bucket = self._load_buckets[previous]
+            bucket.discard(advisor_id)
+            if not bucket:
+                del self._load_buckets[previous]
+                del self._load_levels[bisect_left(self._load_levels, previous)]
+        if load not in self._load_buckets:
+            self._load_buckets[load] = set()
+            insort(self._load_levels, load)
+        self._load_buckets[load].add(advisor_id)
+
+
+    def _overlapping(self, starts: list, start: datetime) -> tuple[int, int]:
+        # Positions of the bookings starting in (start - duration, start + duration)
+        return bisect_left(starts, (start - self.duration + timedelta(microseconds=1),)), bisect_left(starts, (start + self.duration,))
+
+
+    def busy_advisors(self, start: datetime) -> set[int]:
+        """
+        Retrieve the advisors that have a booking overlapping a meeting starting at `start`.
+
+        Args:
+            start (datetime): The naive UTC start time.
+
+        Returns:
+            set[int]: The IDs of the busy advisors.
+        """
+        low, high = self._overlapping(self._starts, start)
+        return {advisor_id for _, _, advisor_id in self._starts[low:high]}
+
+
+    def is_free(self, advisor_id: int, start: datetime, ignore: Optional[Hashable] = None) -> bool:
+        """
+        Check whether an advisor can take a meeting starting at `start`.
+
+        Args:
+            advisor_id (int): The ID of the advisor.
+            start (datetime): The naive UTC start time.
+            ignore (Optional[Hashable]): The key of a booking to leave out, e.g. the meeting being moved.
+
+        Returns:
+            bool: True if none of the bookings of the advisor overlaps the meeting.
+        """
+        starts = self._advisor_starts.get(advisor_id, [])
+        low, high = self._overlapping(starts, start)
+        ignored_sequence = self._entries[ignore][2] if ignore in self._entries else None
+        return all(sequence == ignored_sequence for _, sequence in starts[low:high])
+
+
+    def free_advisors(self, start: datetime, limit: int, exclude: Iterable[int] = ()) -> list[int]:
+        """
+        Retrieve the least-loaded advisors that are free for a meeting starting at `start`.
+
+        Args:
+            start (datetime): The naive UTC start time.
+            limit (int): The maximum number of advisors to return.
+            exclude (Iterable[int]): IDs of advisors to leave out.
+
+        Returns:
+            list[int]: Free advisors, all with the lowest number of bookings among the free ones.
+        """
+        unavailable = self.busy_advisors(start).union(exclude)
+        for load in self._load_levels:
+            candidates = []
+            for advisor_id in self._load_buckets[load]:
+                if advisor_id not in unavailable:
+                    candidates.append(advisor_id)
+                    if len(candidates) == limit:
+                        break
+            if candidates:
+                return candidates
+        return []
+
+
+    def book(self, key: Hashable, advisor_id: int, start: datetime, force: bool = False) -> bool:
+        """
+        Book a slot for an advisor, unless it overlaps one of their bookings.
+
+        Args:
+            key (Hashable): The key of the booking, e.g. the meeting ID. Booking an existing key moves it.
+            advisor_id (int): The ID of the advisor.
+            start (datetime): The naive UTC start time.
+            force (bool): Book the slot even if it overlaps, e.g. to record a meeting already saved in the database.
+
+        Returns:
+            bool: True if the slot was booked, False if the advisor is busy at that time.
+        """
+        self.add_advisor(advisor_id)
+        if not force and not self.is_free(advisor_id, start, ignore=key):
+            return False
+        self.cancel(key)
+
+        sequence = next(self._sequence)
+        self._entries[key] = (advisor_id, start, sequence)
+        self._keys[sequence] = key
+        insort(self._starts, (start, sequence, advisor_id))
+        insort(self._advisor_starts[advisor_id], (start, sequence))
+        self._loads[advisor_id] += 1
+        self._move_to_bucket(advisor_id, self._loads[advisor_id] - 1, self._loads[advisor_id])
+        return True
+
+
+    def cancel(self, key: Hashable) -> None:
+        """
+        Remove a booking. Unknown keys are ignored.
+
+        Args:
+            key (Hashable): The key of the booking.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        advisor_id, start, sequence = entry
+        del self._keys[sequence]
+        del self._starts[bisect_left(self._starts, (start, sequence, advisor_id))]
+        starts = self._advisor_starts[advisor_id]
+        del starts[bisect_left(starts, (start, sequence))]
+        self._loads[advisor_id] -= 1
+        self._move_to_bucket(advisor_id, self._loads[advisor_id] + 1, self._loads[advisor_id])
+
+
+    def rekey(self, key: Hashable, new_key: Hashable) -> None:
+        """
+        Rename a booking, e.g. a hold that became a meeting.
+
+        Args:
+            key (Hashable): The current key of the booking.
+            new_key (Hashable): The new key.
+        """
+        if key in self._entries:
+            self._entries[new_key] = self._entries.pop(key)
+            self._keys[self._entries[new_key][2]] = new_key
+
+
+    def expire(self, before: datetime) -> None:
+        """
+        Remove the bookings starting before `before`, e.g. the meetings that have ended.
+
+        Args:
+            before (datetime): The naive UTC time.
+        """
+        for _, sequence, _ in self._starts[:bisect_left(self._starts, (before,))]:
+            self.cancel(self._keys[sequence])
+
+
+    def load_of(self, advisor_id: int) -> int:
+        return self._loads.get(advisor_id, 0)
+
+
+def get_advisor_schedule() -> AdvisorSchedule:
+    """
+    Retrieve the process-wide advisor schedule.
+
+    Returns:
+        AdvisorSchedule: The shared schedule. It is empty until it is rebuilt.
+    """
+    global _advisor_schedule
+    if _advisor_schedule is None:
+        _advisor_schedule = AdvisorSchedule()
+    return _advisor_schedule
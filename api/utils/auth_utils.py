@@ -2,8 +2,10 @@ from dotenv import load_dotenv
 from jose import JWTError, jwt, ExpiredSignatureError
 from fastapi import HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
 from ..database import get_db
+from ..services.database_service import DatabaseSession
+from ..services.user_service import UserService
+from .password_utils import verify_password
 from pydantic import EmailStr
 from typing import Optional
 from .. import models, schemas
@@ -12,20 +14,20 @@ from ..config.constants import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, ACCESS_TO
 
 oauth2 = OAuth2PasswordBearer(tokenUrl="login")
 
-async def authenticate_user(db: Session, email: EmailStr, password: str) -> models.User | bool:
+async def authenticate_user(db: DatabaseSession, email: EmailStr, password: str) -> models.User | bool:
     """
     Authenticate the user by checking if the user exists and the given password matches.
 
     Args:
-        db (Session): The database session.
+        db (DatabaseSession): The database session.
         email (EmailStr): The email address of the user.
         password (str): The password provided by the user.
 
     Returns:
         models.User | bool: The authenticated user object or False if authentication fails.
     """
-    user: models.User = db.query(models.User).filter(models.User.email == email).first()
-    if not user or not user.verify_password(password):
+    user: models.User = await UserService(db).get_user_by_email(email)
+    if not user or not user.password_hash or not await verify_password(password, user.password_hash):
         return False
     return user
 
@@ -0,0 +1,219 @@
+"""
+Precompiled email templates.
+
+The templates in `api/templates/emails` are rendered in two stages:
+
+1. Build time (once per process): the layout inheritance and every static value are resolved with
+   the `[% ... %]` / `[[ ... ]]` delimiters, and the CSS of the resulting document is inlined into
+   the `style` attributes of its elements.
+2. Per message: the document produced by stage 1 only has the per-message `{{ ... }}` variables
+   (token, join_url, ...) left. It is split once into its static parts, and rendering a message just
+   joins those parts with the escaped variables. Templates using anything more than plain variables
+   are compiled into a regular Jinja template instead.
+"""
+import re
+from pathlib import Path
+from typing import Optional, Union
+from jinja2 import Environment, FileSystemLoader, Template, nodes, select_autoescape
+from markupsafe import escape
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates" / "emails"
+
+_STYLE_BLOCK = re.compile(r"<style[^>]*>(.*?)</style>", re.DOTALL)
+_CSS_RULE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_START_TAG = re.compile(r"<([a-zA-Z][a-zA-Z0-9]*)((?:\s+[^<>]*?)?)\s*(/?)>")
+_CLASS_ATTRIBUTE = re.compile(r'\bclass="([^"]*)"')
+_STYLE_ATTRIBUTE = re.compile(r'\s*\bstyle="([^"]*)"')
+_SIMPLE_SELECTOR = re.compile(r"^([a-zA-Z][a-zA-Z0-9]*)?(?:\.([a-zA-Z0-9_-]+))?$")
+
+
+def _declarations(body: str) -> str:
+    return "; ".join(" ".join(declaration.split()) for declaration in body.split(";") if declaration.strip())
+
+
+def inline_css(html: str) -> str:
+    """
+    Move the rules of the `<style>` blocks of a document into the `style` attribute of the matching elements.
+
+    Only `tag`, `.class` and `tag.class` selectors are inlined. Other rules (e.g. `:hover`) cannot be
+    expressed inline and are kept in the `<style>` block for the clients that support it.
+    Declarations already present in a `style` attribute take precedence over the inlined ones.
+
+    Args:
+        html (str): The HTML document.
+
+    Returns:
+        str: The document with its CSS inlined.
+    """
+    rules: list[tuple[tuple[int, int], int, Optional[str], Optional[str], str]] = []
+    kept_rules: list[str] = []
+
+    def collect(match: re.Match) -> str:
+        for selectors, body in _CSS_RULE.findall(match.group(1)):
+            for selector in selectors.split(","):
+                selector = selector.strip()
+                simple = _SIMPLE_SELECTOR.match(selector)
+                if simple and selector:
+                    tag, css_class = simple.groups()
+                    specificity = (1 if css_class else 0, 1 if tag else 0)
+                    rules.append((specificity, len(rules), tag, css_class, _declarations(body)))
+                else:
+                    kept_rules.append(f"{selector} {{ {_declarations(body)}; }}")
+        if not kept_rules:
+            return ""
+        return "<style>\n        " + "\n        ".join(kept_rules) + "\n    </style>"
+
+    html = _STYLE_BLOCK.sub(collect, html)
+    rules.sort()
+
+    def apply(match: re.Match) -> str:
+        tag, attributes, self_closing = match.groups()
+        class_match = _CLASS_ATTRIBUTE.search(attributes)
+        classes = class_match.group(1).split() if class_match else []
+        styles = [
+            declarations for _, _, rule_tag, rule_class, declarations in rules
+            if (rule_tag is None or rule_tag == tag.lower()) and (rule_class is None or rule_class in classes)
+        ]
+        if not styles:
+            return match.group(0)
+
+        existing = _STYLE_ATTRIBUTE.search(attributes)
+        if existing:
+            styles.append(existing.group(1).rstrip("; "))
+            attributes = _STYLE_ATTRIBUTE.sub("", attributes)
+        return f'<{tag}{attributes} style="{"; ".join(styles)}"{self_closing}>'
+
+    head_end = html.find("</head>")
+    head, body = (html[:head_end], html[head_end:]) if head_end != -1 else ("", html)
+    return head + _START_TAG.sub(apply, body)
+
+
+class StaticPartsTemplate:
+    """
+    A template made only of static text and plain variables, rendered without going through Jinja.
+
+    Attributes:
+        parts (list[str]): The static text before, between and after the variables.
+        variables (list[str]): The names of the variables, in order of appearance.
+    """
+
+    def __init__(self, parts: list[str], variables: list[str]):
+        self.parts = parts
+        self.variables = variables
+
+
+    @classmethod
+    def from_source(cls, environment: Environment, source: str) -> Optional["StaticPartsTemplate"]:
+        """
+        Split a template source into its static parts and variables.
+
+        Args:
+            environment (Environment): The Jinja environment used to parse the source.
+            source (str): The template source.
+
+        Returns:
+            Optional[StaticPartsTemplate]: The split template, or None if the source uses more than plain variables.
+        """
+        parts, variables = [""], []
+        for node in environment.parse(source).body:
+            if not isinstance(node, nodes.Output):
+                return None
+            for child in node.nodes:
+                if isinstance(child, nodes.TemplateData):
+                    parts[-1] += child.data
+                elif isinstance(child, nodes.Name):
+                    variables.append(child.name)
+                    parts.append("")
+                else:
+                    return None
+        return cls(parts, variables)
+
+
+    def render(self, **context) -> str:
+        pieces = [self.parts[0]]
+        for variable, part in zip(self.variables, self.parts[1:]):
+            pieces.append(escape(context.get(variable, "")))
+            pieces.append(part)
+        return "".join(pieces)
+
+
+class EmailTemplates:
+    """
+    A registry of email templates compiled once and rendered per message.
+
+    Attributes:
+        directory (Path): The directory holding the templates. Files starting with "_" are layouts and are not compiled on their own.
+        build_environment (Environment): The Jinja environment used for the build-time stage.
+        environment (Environment): The Jinja environment used to compile the per-message templates.
+    """
+
+    def __init__(self, directory: Path = TEMPLATES_DIR):
+        self.directory = directory
+        self.build_environment = Environment(
+            loader=FileSystemLoader(directory),
+            block_start_string="[%",
+            block_end_string="%]",
+            variable_start_string="[[",
+            variable_end_string="]]",
+            trim_blocks=True,
+            lstrip_blocks=True,
+        )
+        self.environment = Environment(autoescape=select_autoescape(default_for_string=True))
+        self._templates: dict[str, Union[StaticPartsTemplate, Template]] = {}
+
+
+    def build(self, name: str) -> str:
+        """
+        Run the build-time stage of a template: resolve its layout and static values and inline its CSS.
+
+        Args:
+            name (str): The file name of the template.
+
+        Returns:
+            str: The template source left with only the per-message variables.
+        """
+        return inline_css(self.build_environment.get_template(name).render())
+
+
+    def compile(self) -> None:
+        """
+        Build and compile every template in the directory. Meant to be called once on startup.
+        """
+        for path in sorted(self.directory.glob("*.html")):
+            if path.name.startswith("_"):
+                continue
+            source = self.build(path.name)
+            template = StaticPartsTemplate.from_source(self.environment, source)
+            self._templates[path.name] = template if template is not None else self.environment.from_string(source)
+
+
+    def get_template(self, name: str) -> Union[StaticPartsTemplate, Template]:
+        """
+        Retrieve a compiled template, compiling the templates first if needed.
+
+        Args:
+            name (str): The file name of the template.
+
+        Returns:
+            Union[StaticPartsTemplate, Template]: The compiled template.
+        """
+        if not self._templates:
+            self.compile()
+        return self._templates[name]
+
+
+    def render(self, name: str, **context) -> str:
+        """
+        Render a compiled template for one message.
+
+        Args:
+            name (str): The file name of the template.
+            **context: The per-message variables. They are HTML-escaped.
+
+        Returns:
+            str: The rendered HTML.
+        """
+        return self.get_template(name).render(**context)
+
+
+email_templates = EmailTemplates()
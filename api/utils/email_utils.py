@@ -1,7 +1,8 @@
-from fastapi_mail import FastMail, ConnectionConfig, MessageSchema
-from dotenv import load_dotenv
-import os
-from ..config.constants import MAIL_FROM, MAIL_PASSWORD, MAIL_USERNAME
+from fastapi_mail import ConnectionConfig
+from email.message import EmailMessage
+import aiosmtplib
+from typing import Optional
+from ..config.constants import MAIL_FROM, MAIL_PASSWORD, MAIL_USERNAME, MAIL_SERVER, MAIL_PORT, MAIL_STARTTLS, MAIL_SSL_TLS
 
 
 # ------------------------------------ FASTMAIL CONFIGURATION! ------------------------------------
@@ -9,8 +10,56 @@ conf = ConnectionConfig(
     MAIL_USERNAME= MAIL_USERNAME,
     MAIL_PASSWORD= MAIL_PASSWORD,
     MAIL_FROM= MAIL_FROM,
-    MAIL_PORT= 587,
-    MAIL_SERVER= "smtp.gmail.com",
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
+    MAIL_PORT= MAIL_PORT,
+    MAIL_SERVER= MAIL_SERVER,
+    MAIL_STARTTLS= MAIL_STARTTLS,
+    MAIL_SSL_TLS= MAIL_SSL_TLS,
 )
+
+
+# ------------------------------------ SMTP DELIVERY ------------------------------------
+def build_message(recipient: str, subject: str, body: str, subtype: str = "html") -> EmailMessage:
+    """
+    Build a MIME message ready to be sent over SMTP.
+
+    Args:
+        recipient (str): The email address of the recipient.
+        subject (str): The subject of the message.
+        body (str): The body of the message.
+        subtype (str): The MIME subtype of the body. Defaults to "html".
+
+    Returns:
+        EmailMessage: The MIME message.
+    """
+    message = EmailMessage()
+    message["From"] = f"{conf.MAIL_FROM_NAME} <{conf.MAIL_FROM}>" if conf.MAIL_FROM_NAME else conf.MAIL_FROM
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.set_content(body, subtype=subtype)
+    return message
+
+
+async def open_smtp_connection(hostname: Optional[str] = None, port: Optional[int] = None) -> aiosmtplib.SMTP:
+    """
+    Open and authenticate an SMTP connection using the mail configuration.
+
+    Args:
+        hostname (Optional[str]): The SMTP server to connect to. Defaults to MAIL_SERVER.
+        port (Optional[int]): The port of the SMTP server. Defaults to MAIL_PORT.
+
+    Returns:
+        aiosmtplib.SMTP: The connected SMTP client. The caller is responsible for closing it.
+    """
+    smtp = aiosmtplib.SMTP(
+        hostname=hostname or conf.MAIL_SERVER,
+        port=port or conf.MAIL_PORT,
+        use_tls=conf.MAIL_SSL_TLS,
+        start_tls=conf.MAIL_STARTTLS,
+        validate_certs=conf.VALIDATE_CERTS,
+        timeout=conf.TIMEOUT,
+        local_hostname="localhost"
+    )
+    await smtp.connect()
+    if conf.USE_CREDENTIALS:
+        await smtp.login(conf.MAIL_USERNAME, conf.MAIL_PASSWORD)
+    return smtp
@@ -0,0 +1,198 @@
+import asyncio
+import base64
+import hashlib
+import json
+import time
+import uuid
+from typing import Callable, Collection, Optional
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from starlette.datastructures import Headers
+from starlette.requests import cookie_parser
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .metrics import IDEMPOTENT_REQUESTS, child
+from .redis_utils import compare_and_delete, compare_and_expire, compare_and_set, get_redis_client
+from ..config.constants import IDEMPOTENCY_KEY_TTL, IDEMPOTENCY_LOCK_TTL, IDEMPOTENCY_POLL_INTERVAL, IDEMPOTENCY_WAIT_TIMEOUT
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyMiddleware:
+    """
+    Runs a request sent with an Idempotency-Key header at most once, and answers its retries with the same response.
+
+    The first request with a key stores an in-flight record in Redis and goes through. A retry sent while it is
+    in flight waits for it, polling Redis, instead of running again. Once it finishes, its response is kept for
+    `key_ttl` seconds and replayed to the retries with an Idempotent-Replayed header. Server errors and exceptions
+    are not kept, so the retry of a request that failed runs again.
+
+    The in-flight record lasts `lock_ttl` seconds and is extended every third of it while its request runs, so a
+    request may take longer than `lock_ttl`. It holds a random token, and the request only replaces or deletes its
+    own record: if it expired anyway and a retry took over the key, the retry's record is left alone.
+
+    Keys are scoped to the credentials of the caller (the access_token cookie or the Authorization header), and a
+    retry must send the same method, path and body: reusing a key for another request is rejected with 422. Only
+    the requests to `routes`, given as route templates, are covered; the others go through untouched.
+
+    Attributes:
+        routes (frozenset[str]): Templates of the routes covered, e.g. "/delete/meeting/{meeting_id}".
+        key_ttl (int): Seconds a finished response is replayed.
+        lock_ttl (int): Seconds an in-flight record lasts once its request stops extending it, e.g. if the worker dies.
+        wait_timeout (float): Seconds a retry waits for the request in flight before answering 409.
+        poll_interval (float): Seconds between two reads of the record of the request in flight.
+    """
+
+    REDIS_KEY_PREFIX = "idempotency:"
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        routes: Collection[str],
+        redis_client_factory: Callable[[], aioredis.Redis] = get_redis_client,
+        key_ttl: int = IDEMPOTENCY_KEY_TTL,
+        lock_ttl: int = IDEMPOTENCY_LOCK_TTL,
+        wait_timeout: float = IDEMPOTENCY_WAIT_TIMEOUT,
+        poll_interval: float = IDEMPOTENCY_POLL_INTERVAL):
+        self.app = app
+        self.routes = frozenset(routes)
+        self.redis_client_factory = redis_client_factory
+        self.key_ttl = key_ttl
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+
+    def _covers(self, scope: Scope) -> bool:
+        # The middleware runs before the router, so the route is matched here the same way the router will
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", None) in self.routes
+        return False
+
+
+    def _redis_key(self, headers: Headers, idempotency_key: str) -> str:
+        # The access token is sent in a cookie by the browser clients and in the Authorization header by the others
+        credentials = f"{headers.get('authorization', '')}|{cookie_parser(headers.get('cookie', '')).get('access_token', '')}"
+        return f"{self.REDIS_KEY_PREFIX}{hashlib.sha256(credentials.encode()).hexdigest()}:{idempotency_key}"
+
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get(IDEMPOTENCY_HEADER)
+        if idempotency_key is None or not self._covers(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            response = JSONResponse({"detail": f"The {IDEMPOTENCY_HEADER} header must have between 1 and {MAX_KEY_LENGTH} characters"}, status_code=400)
+            await response(scope, receive, send)
+            return
+
+        # The body is part of the fingerprint, so it is read up front and handed to the app afterwards
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        fingerprint = hashlib.sha256(b"%s %s?%s\n%s" % (scope["method"].encode(), scope["path"].encode(), scope["query_string"], body)).hexdigest()
+
+        redis_client = self.redis_client_factory()
+        key = self._redis_key(headers, idempotency_key)
+        in_flight = json.dumps({"fingerprint": fingerprint, "token": uuid.uuid4().hex})
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            if await redis_client.set(key, in_flight, nx=True, ex=self.lock_ttl):
+                child(IDEMPOTENT_REQUESTS, "executed").inc()
+                await self._execute(scope, body, receive, send, redis_client, key, fingerprint, in_flight)
+                return
+
+            record = await redis_client.get(key)
+            if record is None:
+                # The request in flight failed and dropped its record: this one runs instead
+                continue
+            record = json.loads(record)
+            if record["fingerprint"] != fingerprint:
+                child(IDEMPOTENT_REQUESTS, "mismatch").inc()
+                response = JSONResponse({"detail": f"The {IDEMPOTENCY_HEADER} was already used for a different request"}, status_code=422)
+                await response(scope, receive, send)
+                return
+            if "status" in record:
+                child(IDEMPOTENT_REQUESTS, "replayed").inc()
+                await self._replay(record, send)
+                return
+            if time.monotonic() >= deadline:
+                child(IDEMPOTENT_REQUESTS, "conflict").inc()
+                response = JSONResponse({"detail": f"A request with this {IDEMPOTENCY_HEADER} is still being processed"}, status_code=409)
+                await response(scope, receive, send)
+                return
+            await asyncio.sleep(self.poll_interval)
+
+
+    async def _keep_in_flight(self, redis_client: aioredis.Redis, key: str, in_flight: str) -> None:
+        # Extends the in-flight record until the request finishes, or until it is no longer this request's record
+        while True:
+            await asyncio.sleep(self.lock_ttl / 3)
+            try:
+                if not await compare_and_expire(redis_client, key, in_flight, self.lock_ttl):
+                    return
+            except RedisError:
+                # The next attempt may succeed before the record expires
+                continue
+
+
+    async def _execute(self, scope: Scope, body: bytes, receive: Receive, send: Send, redis_client: aioredis.Redis, key: str, fingerprint: str, in_flight: str) -> None:
+        body_sent = False
+        response_start: Optional[Message] = None
+        response_body = b""
+
+        async def receive_body() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def send_and_keep(message: Message) -> None:
+            nonlocal response_start, response_body
+            if message["type"] == "http.response.start":
+                response_start = message
+            elif message["type"] == "http.response.body":
+                response_body += message.get("body", b"")
+            await send(message)
+
+        keep_in_flight = asyncio.create_task(self._keep_in_flight(redis_client, key, in_flight))
+        try:
+            await self.app(scope, receive_body, send_and_keep)
+        except BaseException:
+            await compare_and_delete(redis_client, key, in_flight)
+            raise
+        finally:
+            keep_in_flight.cancel()
+
+        if response_start is None or response_start["status"] >= 500:
+            await compare_and_delete(redis_client, key, in_flight)
+            return
+        record = {
+            "fingerprint": fingerprint,
+            "status": response_start["status"],
+            "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in response_start.get("headers", [])],
+            "body": base64.b64encode(response_body).decode(),
+        }
+        await compare_and_set(redis_client, key, in_flight, json.dumps(record), self.key_ttl)
+
+
+    async def _replay(self, record: dict, send: Send) -> None:
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]]
+        headers.append((REPLAYED_HEADER.lower().encode(), b"true"))
+        await send({"type": "http.response.start", "status": record["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": base64.b64decode(record["body"])})
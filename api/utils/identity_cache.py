@@ -0,0 +1,176 @@
+import time
+import redis.asyncio as aioredis
+from collections import OrderedDict
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, EmailStr
+from typing import Optional
+from .redis_utils import get_redis_client
+from .. import models
+from ..config.constants import IDENTITY_CACHE_BACKEND, IDENTITY_CACHE_TTL, IDENTITY_CACHE_MAX_ENTRIES
+
+
+class CurrentUser(BaseModel):
+    """
+    A lightweight, read-only snapshot of the authenticated user.
+
+    It is what the authentication dependencies return, so it can be cached between requests
+    without holding on to a database session.
+    """
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+    id: int
+    email: EmailStr
+    first_name: str
+    second_name: Optional[str] = None
+    lastname: str
+    is_active: bool
+    role: models.UserRole
+    last_meeting_scheduled: Optional[datetime] = None
+
+    def can_schedule_meeting(self) -> bool:
+        """
+        Check if the user can schedule a new meeting, with the same rule as models.User.can_schedule_meeting.
+
+        Returns:
+            bool: True if the user can schedule a meeting, False otherwise.
+        """
+        return models.User.can_schedule_meeting(self)
+
+
+# Fields of the snapshot. Changing any of them in the database must invalidate the cached identities of the user.
+SNAPSHOT_FIELDS = frozenset(CurrentUser.model_fields)
+
+_identity_cache: Optional["IdentityCache"] = None
+
+
+class IdentityCache:
+    """
+    A short-lived cache of authenticated users, keyed by (email, token expiry).
+
+    Snapshots are kept in memory per worker for at most `ttl` seconds (and never past the expiry of the
+    token they were read for). When a Redis client is given they are also shared with the other workers.
+    UserService invalidates the entries of a user when a snapshot field changes; the in-memory entries of
+    the other workers are only dropped when their TTL runs out, which is why the TTL is kept short.
+
+    Attributes:
+        ttl (float): Seconds a snapshot is cached. 0 disables the cache.
+        max_entries (int): The maximum number of snapshots kept in memory.
+        redis_client (Optional[aioredis.Redis]): Redis client used to share the snapshots across workers.
+    """
+
+    REDIS_KEY_PREFIX = "identity:"
+
+    def __init__(self, ttl: float = IDENTITY_CACHE_TTL, max_entries: int = IDENTITY_CACHE_MAX_ENTRIES, redis_client: Optional[aioredis.Redis] = None):
+        """
+        Initialize an empty identity cache.
+
+        Args:
+            ttl (float): Seconds a snapshot is cached. 0 disables the cache.
+            max_entries (int): The maximum number of snapshots kept in memory.
+            redis_client (Optional[aioredis.Redis]): Redis client used to share the snapshots across workers.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.redis_client = redis_client
+        self._entries: OrderedDict[tuple[str, int], tuple[float, CurrentUser]] = OrderedDict()
+
+
+    def _redis_key(self, email: str) -> str:
+        return f"{self.REDIS_KEY_PREFIX}{email}"
+
+
+    def _store(self, email: str, token_exp: int, user: CurrentUser, ttl: float) -> None:
+        key = (email, token_exp)
+        self._entries[key] = (time.monotonic() + ttl, user)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+    def _remaining_ttl(self, token_exp: int) -> float:
+        return min(self.ttl, token_exp - time.time())
+
+
+    async def get(self, email: str, token_exp: int) -> Optional[CurrentUser]:
+        """
+        Retrieve the cached snapshot of a user for a given token.
+
+        Args:
+            email (str): The email address in the token subject.
+            token_exp (int): The expiry of the token, as a Unix timestamp.
+
+        Returns:
+            Optional[CurrentUser]: The cached snapshot, or None on a cache miss.
+        """
+        if self.ttl <= 0:
+            return None
+
+        key = (email, token_exp)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, user = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(key)
+                return user
+            del self._entries[key]
+
+        if self.redis_client is None:
+            return None
+
+        cached = await self.redis_client.hget(self._redis_key(email), str(token_exp))
+        if cached is None:
+            return None
+        user = CurrentUser.model_validate_json(cached)
+        ttl = await self.redis_client.ttl(self._redis_key(email))
+        self._store(email, token_exp, user, min(ttl, self._remaining_ttl(token_exp)))
+        return user
+
+
+    async def set(self, email: str, token_exp: int, user: CurrentUser) -> None:
+        """
+        Cache the snapshot of a user for a given token.
+
+        Args:
+            email (str): The email address in the token subject.
+            token_exp (int): The expiry of the token, as a Unix timestamp.
+            user (CurrentUser): The snapshot read from the database.
+        """
+        ttl = self._remaining_ttl(token_exp)
+        if ttl <= 0:
+            return
+
+        self._store(email, token_exp, user, ttl)
+        if self.redis_client is not None:
+            key = self._redis_key(email)
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.hset(key, str(token_exp), user.model_dump_json())
+                pipe.expire(key, max(1, int(ttl)))
+                await pipe.execute()
+
+
+    async def invalidate(self, email: str) -> None:
+        """
+        Drop every cached snapshot of a user, e.g. after its role or status changed.
+
+        Args:
+            email (str): The email address of the user.
+        """
+        for key in [key for key in self._entries if key[0] == email]:
+            del self._entries[key]
+        if self.redis_client is not None:
+            await self.redis_client.delete(self._redis_key(email))
+
+
+def get_identity_cache() -> IdentityCache:
+    """
+    Retrieve the process-wide identity cache.
+
+    Returns:
+        IdentityCache: The shared identity cache, backed by Redis when IDENTITY_CACHE_BACKEND is "redis".
+    """
+    global _identity_cache
+    if _identity_cache is None:
+        _identity_cache = IdentityCache()
+    if IDENTITY_CACHE_BACKEND == "redis":
+        _identity_cache.redis_client = get_redis_client()
+    return _identity_cache
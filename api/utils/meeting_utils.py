@@ -1,22 +1,235 @@
-from sqlalchemy.orm import Session
+import asyncio
+from contextlib import asynccontextmanager
+from sqlalchemy import func, or_, select, update
 from datetime import datetime, timezone, timedelta
-from ..models import Advisor
-from typing import Optional
+from ..models import Advisor, Meeting
+from ..services.database_service import DatabaseService, DatabaseSession
+from .advisor_schedule import get_advisor_schedule, to_utc
+from ..config.constants import ADVISOR_CANDIDATES
+from ..config.exceptions import server_busy_exception
+from typing import AsyncIterator, Collection, Optional
 
+# Non-blocking claims tried before waiting for an advisor, and the base delay in seconds between them
+ADVISOR_CLAIM_ATTEMPTS = 5
+ADVISOR_CLAIM_RETRY_DELAY = 0.005
 
-async def get_next_advisor(db: Session) -> Optional[Advisor] :
+
+def claim_advisor_statement(skip_locked: bool = True, advisor_ids: Optional[Collection[int]] = None):
+    """
+    Build the statement that claims the advisor who was assigned the longest time ago.
+
+    It is a single `UPDATE ... RETURNING` whose target is picked by a `SELECT ... FOR UPDATE` subquery, so
+    choosing the advisor and moving it to the back of the rotation happen atomically. With `skip_locked`,
+    concurrent claims skip the advisor another transaction is claiming and take the next one instead of
+    waiting for it. They also skip the advisors claimed since the statement started: PostgreSQL rechecks
+    the conditions (but not the order) of a row that changed before it could be locked, so without it a
+    claim could lock an advisor that was just moved to the back of the rotation.
+
+    Args:
+        skip_locked (bool): Whether to skip the advisors locked or just claimed by other transactions instead of waiting.
+        advisor_ids (Optional[Collection[int]]): The advisors to choose from. Defaults to every advisor.
+
+    Returns:
+        Update: The statement, returning the claimed advisor.
+    """
+    next_advisor_id = (
+        select(Advisor.id)
+        .order_by(Advisor.last_assigned_time.asc().nulls_first(), Advisor.id)
+        .limit(1)
+        .with_for_update(skip_locked=skip_locked)
+    )
+    if advisor_ids is not None:
+        next_advisor_id = next_advisor_id.where(Advisor.id.in_(advisor_ids))
+    if skip_locked:
+        statement_start = func.timezone("UTC", func.statement_timestamp())
+        next_advisor_id = next_advisor_id.where(or_(Advisor.last_assigned_time.is_(None), Advisor.last_assigned_time < statement_start))
+    next_advisor_id = next_advisor_id.scalar_subquery()
+    return (
+        update(Advisor)
+        .where(Advisor.id == next_advisor_id)
+        .values(last_assigned_time=func.timezone("UTC", func.clock_timestamp()))
+        .returning(Advisor)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+
+
+async def claim_advisor(database: DatabaseService, advisor_ids: Optional[Collection[int]] = None, commit: bool = True) -> Optional[Advisor]:
+    """
+    Claim the advisor who was assigned the longest time ago and update their last assigned time.
+
+    Args:
+        database (DatabaseService): The service used to run the claim.
+        advisor_ids (Optional[Collection[int]]): The advisors to choose from. Defaults to every advisor.
+        commit (bool): Whether to commit the claim. Otherwise it is part of the caller's transaction, and the
+            advisor stays locked (skipped by the other claims) until the caller commits or rolls back.
+
+    Returns:
+        Advisor: The advisor object with the updated last assigned time, or None if there are no advisors to choose from.
+
+    Raises:
+        HTTPException: If the advisors are still being claimed by other transactions after a few attempts and
+            the session is synchronous (status code 503).
+    """
+    # Every advisor may be in the middle of a claim: those transactions only last one statement, so retry shortly
+    for attempt in range(ADVISOR_CLAIM_ATTEMPTS):
+        advisor = await database.first(claim_advisor_statement(advisor_ids=advisor_ids))
+        if advisor is not None:
+            if commit:
+                await database.commit()
+            return advisor
+        if attempt == 0:
+            existing = select(Advisor.id).limit(1)
+            if advisor_ids is not None:
+                existing = existing.where(Advisor.id.in_(advisor_ids))
+            if await database.first(existing) is None:
+                return None
+        await asyncio.sleep(ADVISOR_CLAIM_RETRY_DELAY * (attempt + 1))
+
+    if not database.is_async:
+        # A blocking wait would block the event loop, and with it the request of this process holding the lock
+        raise server_busy_exception
+
+    # Still contended: wait for the oldest advisor instead of failing
+    advisor = await database.first(claim_advisor_statement(skip_locked=False, advisor_ids=advisor_ids))
+    if advisor is not None and commit:
+        await database.commit()
+    return advisor
+
+
+async def find_overlapping_meeting(database: DatabaseService, advisor_id: int, start: datetime, ignore: Optional[int] = None) -> Optional[tuple[int, datetime]]:
+    """
+    Look in the database for a meeting of the advisor overlapping a meeting starting at `start`.
+
+    The advisor schedule only knows the meetings booked by this process, so it is a hint: this check is the
+    authority. It is only race-free while the caller holds the advisor's row lock, which every booking takes.
+
+    Args:
+        database (DatabaseService): The service used to run the query.
+        advisor_id (int): The ID of the advisor.
+        start (datetime): The naive UTC start time of the meeting.
+        ignore (Optional[int]): The ID of a meeting to leave out, e.g. the one being moved.
+
+    Returns:
+        Optional[tuple[int, datetime]]: The ID and start time of an overlapping meeting, or None if the advisor is free.
+    """
+    duration = get_advisor_schedule().duration
+    statement = (
+        select(Meeting.id, Meeting.start_time)
+        .where(Meeting.advisor_id == advisor_id, Meeting.start_time > start - duration, Meeting.start_time < start + duration)
+        .limit(1)
+    )
+    if ignore is not None:
+        statement = statement.where(Meeting.id != ignore)
+    row = (await database.execute(statement)).first()
+    return tuple(row) if row is not None else None
+
+
+def hold_key(advisor_id: int, start: datetime) -> tuple:
+    return ("hold", advisor_id, start)
+
+
+async def get_next_advisor(db: DatabaseSession, start_time: Optional[datetime] = None, commit: bool = True) -> Optional[Advisor] :
     """
-    Retrieve the advisor who was assigned the longest time ago and update their last assigned time.
+    Claim the next advisor of the rotation and update their last assigned time.
+
+    When `start_time` is given, only the advisors free at that time are considered, least loaded first, and
+    the slot is held in the advisor schedule until it is released with `release_advisor`. The schedule picks
+    the candidates, and the claimed advisor is then checked against the meetings in the database. An advisor
+    rejected by that check is given back by rolling back to a savepoint, so it is neither moved to the back
+    of the rotation nor left locked until the caller commits.
 
     Args:
-        db (Session): The database session.
+        db (DatabaseSession): The database session.
+        start_time (Optional[datetime]): The start time of the meeting the advisor is claimed for.
+        commit (bool): Whether to commit the claim, see `claim_advisor`.
 
     Returns:
-        Advisor: The advisor object with the updated last assigned time.
+        Advisor: The advisor object with the updated last assigned time, or None if no advisor is available.
+    """
+
+    database = DatabaseService(db)
+    if start_time is None:
+        return await claim_advisor(database, commit=commit)
+
+    schedule = get_advisor_schedule()
+    if schedule.loaded:
+        await schedule.sync_advisors(database)
+    else:
+        await schedule.rebuild(database)
+
+    start = to_utc(start_time)
+    # Past meetings no longer make an advisor busy or count toward its load
+    schedule.expire(datetime.now(timezone.utc).replace(tzinfo=None) - schedule.duration)
+    rejected: set[int] = set()
+    while True:
+        candidates = schedule.free_advisors(start, ADVISOR_CANDIDATES, exclude=rejected)
+        if not candidates:
+            return None
+        # Rolling back to it gives a rejected advisor back: its last assigned time and its row lock
+        savepoint = await database.savepoint()
+        try:
+            advisor = await claim_advisor(database, candidates, commit=False)
+            if advisor is None:
+                # The candidates no longer exist in the database
+                await database.release_savepoint(savepoint)
+                rejected.update(candidates)
+                continue
+            advisor_id = advisor.id
+            # Checked while the claim holds the advisor's row lock
+            overlapping = await find_overlapping_meeting(database, advisor_id, start)
+        except BaseException:
+            await database.rollback_to_savepoint(savepoint)
+            raise
+        if overlapping is not None:
+            await database.rollback_to_savepoint(savepoint)
+            # Booked by another process: bring the index up to date and try another advisor
+            schedule.book(overlapping[0], advisor_id, overlapping[1], force=True)
+            rejected.add(advisor_id)
+            continue
+        # Holding the slot happens without awaiting, so concurrent requests of this process cannot both take it
+        if not schedule.book(hold_key(advisor_id, start), advisor_id, start):
+            await database.rollback_to_savepoint(savepoint)
+            rejected.add(advisor_id)
+            continue
+        await database.release_savepoint(savepoint)
+        if commit:
+            try:
+                await database.commit()
+            except BaseException:
+                schedule.cancel(hold_key(advisor_id, start))
+                raise
+        return advisor
+
+
+def release_advisor(advisor: Advisor, start_time: datetime) -> None:
+    """
+    Release the slot held by `get_next_advisor`, once the meeting has been booked or has failed.
+
+    Args:
+        advisor (Advisor): The advisor returned by `get_next_advisor`.
+        start_time (datetime): The start time it was claimed for.
     """
+    get_advisor_schedule().cancel(hold_key(advisor.id, to_utc(start_time)))
 
-    advisor = db.query(Advisor).order_by(Advisor.last_assigned_time.asc()).first()
-    if advisor:
-        advisor.last_assigned_time = datetime.now(timezone.utc)
-        db.commit()
-        return advisor
\ No newline at end of file
+
+@asynccontextmanager
+async def assign_advisor(db: DatabaseSession, start_time: datetime, commit: bool = True) -> AsyncIterator[Optional[Advisor]]:
+    """
+    Claim an advisor free at `start_time` and hold the slot for the duration of the block.
+
+    Args:
+        db (DatabaseSession): The database session.
+        start_time (datetime): The start time of the meeting.
+        commit (bool): Whether to commit the claim, see `claim_advisor`.
+
+    Yields:
+        Optional[Advisor]: The claimed advisor, or None if no advisor is available at that time.
+    """
+    advisor = await get_next_advisor(db, start_time, commit=commit)
+    # Read now: once the caller commits, the advisor's attributes are expired and reading them is a query
+    key = hold_key(advisor.id, to_utc(start_time)) if advisor is not None else None
+    try:
+        yield advisor
+    finally:
+        if key is not None:
+            get_advisor_schedule().cancel(key)
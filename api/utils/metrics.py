@@ -0,0 +1,125 @@
+"""
+Prometheus metrics of the API, exposed on /metrics.
+
+Events on the hot path (requests, Redis commands, Zoom calls, rate limit rejections, emails) update prometheus_client
+metrics directly. The connection pools and circuit breakers keep their own counters (api.utils.pool_metrics and
+api.utils.resilience), which are copied into gauges by update_process_metrics().
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty directory shared by the workers: each worker
+writes its metrics to its own files there and /metrics aggregates them, whichever worker serves the scrape.
+"""
+import asyncio
+import os
+from typing import Optional
+# prometheus_client picks its storage when imported, so PROMETHEUS_MULTIPROC_DIR must be loaded from .env first
+from ..config.constants import PROMETHEUS_MULTIPROC_DIR
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+
+# Upper bounds, in seconds, of the duration histograms
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests served, by route template and status.", ["method", "route", "status"])
+HTTP_REQUEST_DURATION = Histogram("http_request_duration_seconds", "Duration of the HTTP requests, by route template.", ["method", "route"], buckets=DURATION_BUCKETS)
+HTTP_REQUEST_PHASE_DURATION = Histogram("http_request_phase_duration_seconds", "Time a request spent in each dependency (db, redis, zoom, smtp, bcrypt), by route template.", ["route", "phase"], buckets=DURATION_BUCKETS)
+REDIS_COMMAND_DURATION = Histogram("redis_command_duration_seconds", "Duration of the Redis commands.", ["command"], buckets=DURATION_BUCKETS)
+RATE_LIMIT_REJECTIONS = Counter("rate_limit_rejections_total", "Requests rejected by rate_limit_exceeded.", ["algorithm"])
+EMAILS = Counter("emails_total", "Outbox messages handled by the email worker, by outcome (sent, failed, dead, postponed).", ["outcome"])
+OUTBOUND_REQUESTS = Counter("outbound_requests_total", "Calls to external services, retries included, by outcome (2xx, 4xx, 5xx or unavailable).", ["service", "method", "outcome"])
+OUTBOUND_REQUEST_DURATION = Histogram("outbound_request_duration_seconds", "Duration of the calls to external services, retries included.", ["service"], buckets=DURATION_BUCKETS)
+OUTBOUND_RETRIES = Counter("outbound_retries_total", "Attempts sent again to external services.", ["service"])
+ZOOM_WEBHOOK_EVENTS = Counter("zoom_webhook_events_total", "Zoom webhook events, by outcome (queued, applied, stale, unmatched, ignored, retried or dead).", ["outcome"])
+IDEMPOTENT_REQUESTS = Counter("idempotent_requests_total", "Requests sent with an Idempotency-Key, by outcome (executed, replayed, conflict or mismatch).", ["outcome"])
+
+# Gauges copied from the pool and circuit breaker counters. Peaks and states are the highest of the live workers,
+# everything else is summed over them
+DB_POOL_GAUGES = {
+    key: Gauge(f"db_pool_{key}", f"{key.replace('_', ' ').capitalize()} of the database connection pool.", ["pool"], multiprocess_mode="livemax" if key.endswith(("_max", "_peak")) else "livesum")
+    for key in (
+        "checkouts", "checkout_timeouts", "checkout_seconds_total", "checkout_seconds_max", "connections_opened",
+        "connections_closed", "invalidations", "in_use", "in_use_peak", "overflow", "overflow_peak"
+    )
+}
+CIRCUIT_BREAKER_GAUGES = {
+    "state": Gauge("circuit_breaker_state", "State of the circuit breaker: 0 closed, 1 half-open, 2 open.", ["service"], multiprocess_mode="livemax"),
+    "failures": Gauge("circuit_breaker_failures", "Consecutive failures seen by the circuit breaker.", ["service"], multiprocess_mode="livemax"),
+    "opened_total": Gauge("circuit_breaker_opened_total", "Times the circuit breaker has opened.", ["service"], multiprocess_mode="livesum"),
+    "rejected_total": Gauge("circuit_breaker_rejected_total", "Calls rejected while the circuit breaker was open.", ["service"], multiprocess_mode="livesum"),
+}
+
+# Children of the labeled metrics, so the hot path skips the locked lookup of Metric.labels()
+_children: dict[tuple, object] = {}
+
+
+def child(metric, *labels: str):
+    """
+    Retrieve the child of a labeled metric for the given label values, caching it.
+
+    Args:
+        metric: The labeled metric, e.g. HTTP_REQUESTS.
+        *labels (str): The label values, in the order of the label names.
+
+    Returns:
+        The child metric.
+    """
+    key = (metric, labels)
+    metric_child = _children.get(key)
+    if metric_child is None:
+        metric_child = _children[key] = metric.labels(*labels)
+    return metric_child
+
+
+def update_process_metrics() -> None:
+    """
+    Copy the counters of the connection pools and circuit breakers of this process into their gauges.
+    """
+    # Imported here because both modules report their calls through this one
+    from .pool_metrics import pool_metrics
+    from .resilience import circuit_breakers
+
+    for name, metrics in list(pool_metrics.items()):
+        snapshot = metrics.snapshot()
+        for key, gauge in DB_POOL_GAUGES.items():
+            child(gauge, name).set(snapshot[key])
+    for name, breaker in list(circuit_breakers.items()):
+        snapshot = breaker.snapshot()
+        for key, gauge in CIRCUIT_BREAKER_GAUGES.items():
+            child(gauge, name).set(snapshot[key])
+
+
+async def update_process_metrics_periodically(interval: float) -> None:
+    """
+    Keep the gauges of this worker up to date for the scrapes served by the other workers.
+
+    Args:
+        interval (float): Seconds between two updates.
+    """
+    while True:
+        update_process_metrics()
+        await asyncio.sleep(interval)
+
+
+def render_metrics() -> bytes:
+    """
+    Render the metrics in the Prometheus text format, aggregated over every worker in multiprocess mode.
+
+    Returns:
+        bytes: The metrics.
+    """
+    update_process_metrics()
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead(pid: Optional[int] = None) -> None:
+    """
+    Drop the live gauges of a worker that exits. Does nothing outside multiprocess mode.
+
+    Args:
+        pid (Optional[int]): The process ID of the worker. Defaults to the current process.
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid if pid is not None else os.getpid())
+
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Optional
+from ..models import crypt
+from .request_timing import timed_phase
+from ..config.exceptions import server_busy_exception
+from ..config.constants import PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+
+
+def _hash(plain_password: str) -> str:
+    return crypt.hash(plain_password)
+
+
+def _verify(plain_password: str, password_hash: str) -> bool:
+    return crypt.verify(plain_password, password_hash)
+
+
+class PasswordHasher:
+    """
+    Async facade that runs bcrypt hashing and verification on a bounded worker pool.
+
+    bcrypt releases the GIL, so a thread pool already runs several hashes in parallel without
+    blocking the event loop; a process pool can be selected instead. At most `max_pending`
+    operations may be queued or running at once, further calls are rejected with a 503.
+
+    Attributes:
+        executor_type (str): "thread" or "process".
+        max_workers (int): The number of workers in the pool.
+        max_pending (int): The maximum number of operations queued or running at once.
+    """
+
+    def __init__(self, executor_type: str = PASSWORD_HASH_EXECUTOR, max_workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        """
+        Initialize the hasher. The pool itself is created on first use.
+
+        Args:
+            executor_type (str): "thread" or "process".
+            max_workers (int): The number of workers in the pool.
+            max_pending (int): The maximum number of operations queued or running at once.
+        """
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor_lock = threading.Lock()
+
+
+    def _get_executor(self) -> Executor:
+        with self._executor_lock:
+            if self._executor is None:
+                if self.executor_type == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hasher")
+            return self._executor
+
+
+    async def _run(self, func: Callable, *args):
+        if not self._slots.acquire(blocking=False):
+            raise server_busy_exception
+        try:
+            loop = asyncio.get_running_loop()
+            with timed_phase("bcrypt"):
+                return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._slots.release()
+
+
+    async def hash(self, plain_password: str) -> str:
+        """
+        Hash a plain password with bcrypt.
+
+        Args:
+            plain_password (str): The plain text password.
+
+        Returns:
+            str: The password hash.
+
+        Raises:
+            HTTPException: If the pool is saturated (status code 503).
+        """
+        return await self._run(_hash, plain_password)
+
+
+    async def verify(self, plain_password: str, password_hash: str) -> bool:
+        """
+        Verify a plain password against a bcrypt hash.
+
+        Args:
+            plain_password (str): The plain text password to verify.
+            password_hash (str): The stored password hash.
+
+        Returns:
+            bool: True if the password matches, False otherwise.
+
+        Raises:
+            HTTPException: If the pool is saturated (status code 503).
+        """
+        return await self._run(_verify, plain_password, password_hash)
+
+
+    def shutdown(self) -> None:
+        """
+        Shut down the worker pool. Meant to be called on application shutdown.
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
+
+
+async def hash_password(plain_password: str) -> str:
+    """
+    Hash a plain password on the shared password hasher.
+
+    Args:
+        plain_password (str): The plain text password.
+
+    Returns:
+        str: The password hash.
+    """
+    return await password_hasher.hash(plain_password)
+
+
+async def verify_password(plain_password: str, password_hash: str) -> bool:
+    """
+    Verify a plain password on the shared password hasher.
+
+    Args:
+        plain_password (str): The plain text password to verify.
+        password_hash (str): The stored password hash.
+
+    Returns:
+        bool: True if the password matches, False otherwise.
+    """
+    return await password_hasher.verify(plain_password, password_hash)
@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+from typing import Optional
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the checkout latency histogram
+CHECKOUT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+# Metrics of the instrumented pools, by name
+pool_metrics: dict[str, "PoolMetrics"] = {}
+
+
+class PoolMetrics:
+    """
+    Counters and gauges of a connection pool.
+
+    Attributes:
+        name (str): The name of the pool, e.g. "sync" or "async".
+        pool_size (int): The number of connections the pool keeps open.
+        checkouts (int): Connections handed out by the pool.
+        checkout_timeouts (int): Checkouts that gave up after waiting `pool_timeout` seconds.
+        checkout_seconds_total (float): Total time spent waiting for a connection, including the pre-ping.
+        checkout_seconds_max (float): Longest time spent waiting for a connection.
+        checkout_latency_buckets (list[int]): Checkouts per bucket of CHECKOUT_LATENCY_BUCKETS (not cumulative).
+        connections_opened (int): New database connections opened by the pool.
+        connections_closed (int): Database connections closed by the pool (overflow, recycled or broken ones).
+        invalidations (int): Connections discarded because they were broken (e.g. by the pre-ping).
+        in_use (int): Connections currently checked out.
+        in_use_peak (int): Highest number of connections checked out at once.
+        overflow (int): Connections currently open beyond `pool_size`.
+        overflow_peak (int): Highest number of connections open beyond `pool_size`.
+    """
+
+    def __init__(self, name: str, pool_size: int = 0):
+        self.name = name
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+        self.checkout_latency_buckets = [0] * len(CHECKOUT_LATENCY_BUCKETS)
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.invalidations = 0
+        self.in_use = 0
+        self.in_use_peak = 0
+        self.overflow = 0
+        self.overflow_peak = 0
+
+
+    def record_checkout(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.in_use_peak = max(self.in_use_peak, self.in_use)
+
+
+    def record_checkout_latency(self, seconds: float) -> None:
+        with self._lock:
+            self.checkout_seconds_total += seconds
+            self.checkout_seconds_max = max(self.checkout_seconds_max, seconds)
+            for index, bound in enumerate(CHECKOUT_LATENCY_BUCKETS):
+                if seconds <= bound:
+                    self.checkout_latency_buckets[index] += 1
+                    break
+
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.checkout_timeouts += 1
+
+
+    def record_checkin(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+
+    def record_connections(self, opened: int = 0, closed: int = 0) -> None:
+        with self._lock:
+            self.connections_opened += opened
+            self.connections_closed += closed
+            self.overflow = max(self.connections_opened - self.connections_closed - self.pool_size, 0)
+            self.overflow_peak = max(self.overflow_peak, self.overflow)
+
+
+    def record_invalidation(self) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+
+    def snapshot(self) -> dict:
+        """
+        Read every metric at once.
+
+        Returns:
+            dict: The metrics, by attribute name.
+        """
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "checkout_seconds_total": self.checkout_seconds_total,
+                "checkout_seconds_max": self.checkout_seconds_max,
+                "checkout_latency_buckets": list(self.checkout_latency_buckets),
+                "connections_opened": self.connections_opened,
+                "connections_closed": self.connections_closed,
+                "invalidations": self.invalidations,
+                "in_use": self.in_use,
+                "in_use_peak": self.in_use_peak,
+                "overflow": self.overflow,
+                "overflow_peak": self.overflow_peak,
+            }
+
+
+class TimedPoolMixin:
+    """
+    Times every checkout of a pool, since the pool events only fire once a connection has been obtained.
+    """
+    metrics: Optional[PoolMetrics] = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_timeout()
+                logger.warning("Timed out waiting for a database connection from the %s pool: %s", self.metrics.name, self.status())
+            raise
+        if self.metrics is not None:
+            self.metrics.record_checkout_latency(time.perf_counter() - start)
+        return connection
+
+
+    def recreate(self):
+        # engine.dispose() replaces the pool; the event listeners are carried over but attributes are not
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_pool(pool: Pool, name: str) -> PoolMetrics:
+    """
+    Record the metrics of a pool through the SQLAlchemy pool events.
+
+    In-use and overflow counts follow the checkout/checkin and connect/close events. Checkout latency
+    and timeouts are only recorded for TimedQueuePool and TimedAsyncAdaptedQueuePool.
+
+    Args:
+        pool (Pool): The pool of the engine (`engine.pool`, or `async_engine.sync_engine.pool`).
+        name (str): The name the metrics are registered under in `pool_metrics`.
+
+    Returns:
+        PoolMetrics: The metrics of the pool.
+    """
+    metrics = PoolMetrics(name, pool.size() if isinstance(pool, QueuePool) else 0)
+    if isinstance(pool, TimedPoolMixin):
+        pool.metrics = metrics
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.record_connections(opened=1)
+
+    @event.listens_for(pool, "close")
+    def on_close(dbapi_connection, connection_record):
+        metrics.record_connections(closed=1)
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.record_checkout()
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.record_checkin()
+
+    @event.listens_for(pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.record_invalidation()
+
+    pool_metrics[name] = metrics
+    return metrics
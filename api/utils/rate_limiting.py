@@ -1,28 +1,119 @@
-from redis import Redis
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
+from hashlib import sha1
+import enum
+import uuid
+from .metrics import RATE_LIMIT_REJECTIONS, child
 
-def rate_limit_exceeded(redis_client: Redis, identifier: str, max_requests: int, period: int):
+
+class RateLimitAlgorithm(str, enum.Enum):
+    FIXED_WINDOW = "fixed_window"
+    SLIDING_WINDOW_LOG = "sliding_window_log"
+    TOKEN_BUCKET = "token_bucket"
+
+
+# ------------------------------------ LUA SCRIPTS ------------------------------------
+# Every script receives the key in KEYS[1], max_requests in ARGV[1] and the period (seconds) in ARGV[2],
+# and returns 1 when the request must be rejected or 0 when it is allowed (and counted).
+
+# Counter that resets when the key expires at the end of the window.
+FIXED_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if current >= tonumber(ARGV[1]) then
+    return 1
+end
+current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Sorted set holding the timestamp of every accepted request within the last period.
+SLIDING_WINDOW_LOG_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local window = tonumber(ARGV[2]) * 1000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 1
+end
+redis.call('ZADD', KEYS[1], now, ARGV[3])
+redis.call('PEXPIRE', KEYS[1], window)
+return 0
+"""
+
+# Bucket of max_requests tokens refilled continuously at max_requests per period.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local capacity = tonumber(ARGV[1])
+local window = tonumber(ARGV[2]) * 1000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + (now - ts) * capacity / window)
+local limited = 1
+if tokens >= 1 then
+    tokens = tokens - 1
+    limited = 0
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], window)
+return limited
+"""
+
+RATE_LIMIT_SCRIPTS = {
+    RateLimitAlgorithm.FIXED_WINDOW: FIXED_WINDOW_SCRIPT,
+    RateLimitAlgorithm.SLIDING_WINDOW_LOG: SLIDING_WINDOW_LOG_SCRIPT,
+    RateLimitAlgorithm.TOKEN_BUCKET: TOKEN_BUCKET_SCRIPT,
+}
+
+# SHA1 digests are computed once so every check is a single EVALSHA round-trip.
+RATE_LIMIT_SCRIPT_SHAS = {
+    algorithm: sha1(script.encode()).hexdigest() for algorithm, script in RATE_LIMIT_SCRIPTS.items()
+}
+
+
+async def rate_limit_exceeded(
+    redis_client: Redis,
+    identifier: str,
+    max_requests: int,
+    period: int,
+    algorithm: RateLimitAlgorithm = RateLimitAlgorithm.FIXED_WINDOW) -> bool:
     """
     Check if the rate limit has been exceeded for a given identifier.
 
+    The whole check-and-count runs atomically on the Redis server in a single round-trip. The script is
+    called by its SHA1 and only sent to the server again if Redis does not have it cached yet.
+
     Args:
-        redis_client (Redis): The Redis client.
+        redis_client (Redis): The asyncio Redis client.
         identifier (str): The unique identifier for rate limiting (e.g., user IP address).
         max_requests (int): The maximum number of allowed requests within the period.
         period (int): The time period (in seconds) for rate limiting.
+        algorithm (RateLimitAlgorithm): The rate limiting algorithm. Defaults to a fixed window.
 
     Returns:
         bool: True if the rate limit has been exceeded, False otherwise.
     """
-    key = f"rate_limit:{identifier}"
-    current_requests = redis_client.get(key)
-
-    if current_requests and int(current_requests) >= max_requests:
-        return True
-    else: 
-        # Increment the request count and set the expiration if it's a new key
-        pipe = redis_client.pipeline()
-        pipe.incr(key, 1)
-        if not current_requests:
-            pipe.expire(key, period)
-        pipe.execute()
-        return False
\ No newline at end of file
+    algorithm = RateLimitAlgorithm(algorithm)
+    key = f"rate_limit:{algorithm.value}:{identifier}"
+    args = [max_requests, period]
+    if algorithm == RateLimitAlgorithm.SLIDING_WINDOW_LOG:
+        args.append(uuid.uuid4().hex)
+
+    try:
+        result = await redis_client.evalsha(RATE_LIMIT_SCRIPT_SHAS[algorithm], 1, key, *args)
+    except NoScriptError:
+        await redis_client.script_load(RATE_LIMIT_SCRIPTS[algorithm])
+        result = await redis_client.evalsha(RATE_LIMIT_SCRIPT_SHAS[algorithm], 1, key, *args)
+
+    exceeded = bool(int(result))
+    if exceeded:
+        child(RATE_LIMIT_REJECTIONS, algorithm.value).inc()
+    return exceeded
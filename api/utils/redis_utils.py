@@ -0,0 +1,139 @@
+import asyncio
+import time
+import redis.asyncio as aioredis
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
+from redis.exceptions import ConnectionError
+from typing import Optional
+from .metrics import REDIS_COMMAND_DURATION, child
+from .request_timing import record_phase
+from ..config.constants import REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_MAX_CONNECTIONS, REDIS_RECONNECT_ATTEMPTS
+
+
+# ------------------------------------ REDIS CLIENT ------------------------------------
+class TimedRedis(aioredis.Redis):
+    """
+    Redis client whose commands are timed as the "redis" phase of the current request and in the
+    redis_command_duration_seconds histogram.
+    """
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            duration = time.perf_counter() - started
+            record_phase("redis", duration)
+            child(REDIS_COMMAND_DURATION, str(args[0]).upper()).observe(duration)
+
+
+_redis_client: Optional[aioredis.Redis] = None
+_redis_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def create_redis_client() -> aioredis.Redis:
+    """
+    Build a new asyncio Redis client backed by its own connection pool.
+
+    A command whose pooled connection was dropped, e.g. by a Redis restart or failover, is sent again on a new
+    connection up to REDIS_RECONNECT_ATTEMPTS times instead of failing the request.
+
+    Returns:
+        aioredis.Redis: The Redis client.
+    """
+    pool = aioredis.ConnectionPool(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        decode_responses=True,
+        retry=Retry(NoBackoff(), REDIS_RECONNECT_ATTEMPTS),
+        retry_on_error=[ConnectionError]
+    )
+    return TimedRedis.from_pool(pool)
+
+
+def get_redis_client() -> aioredis.Redis:
+    """
+    Retrieve the shared Redis client, creating it if needed.
+
+    Like the Zoom client, it is rebuilt when the running event loop changes so that pooled
+    connections are never reused across loops.
+
+    Returns:
+        aioredis.Redis: The shared Redis client.
+    """
+    global _redis_client, _redis_client_loop
+    loop = asyncio.get_running_loop()
+    if _redis_client is None or _redis_client_loop is not loop:
+        _redis_client = create_redis_client()
+        _redis_client_loop = loop
+    return _redis_client
+
+
+async def close_redis_client() -> None:
+    """
+    Close the shared Redis client and disconnect its pool. Meant to be called on application shutdown.
+    """
+    global _redis_client, _redis_client_loop
+    if _redis_client is not None:
+        await _redis_client.aclose()
+    _redis_client = None
+    _redis_client_loop = None
+
+
+# ------------------------------------ OWNED KEYS ------------------------------------
+# Lua scripts changing KEYS[1] only while it still holds ARGV[1], the value written by its owner (e.g. a
+# lock with a random token), so an owner whose key expired and was taken by someone else cannot touch it.
+
+COMPARE_AND_DELETE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+COMPARE_AND_EXPIRE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+COMPARE_AND_SET_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+async def compare_and_delete(redis_client: aioredis.Redis, key: str, expected: str) -> bool:
+    """
+    Delete a key if it still holds `expected`.
+
+    Returns:
+        bool: Whether the key was deleted.
+    """
+    return bool(await redis_client.eval(COMPARE_AND_DELETE_SCRIPT, 1, key, expected))
+
+
+async def compare_and_expire(redis_client: aioredis.Redis, key: str, expected: str, ttl: int) -> bool:
+    """
+    Set the time to live of a key to `ttl` seconds if it still holds `expected`.
+
+    Returns:
+        bool: Whether the time to live was set.
+    """
+    return bool(await redis_client.eval(COMPARE_AND_EXPIRE_SCRIPT, 1, key, expected, ttl))
+
+
+async def compare_and_set(redis_client: aioredis.Redis, key: str, expected: str, value: str, ttl: int) -> bool:
+    """
+    Replace the value of a key with `value`, expiring in `ttl` seconds, if it still holds `expected`.
+
+    Returns:
+        bool: Whether the value was replaced.
+    """
+    return bool(await redis_client.eval(COMPARE_AND_SET_SCRIPT, 1, key, expected, value, ttl))
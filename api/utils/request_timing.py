@@ -0,0 +1,155 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION, HTTP_REQUEST_PHASE_DURATION, child
+
+# Phase every request is timed under in the Server-Timing header, on top of the phases of its dependencies
+TOTAL_PHASE = "total"
+
+# Route label of the requests that did not match any route, so unknown paths do not create new series
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestTimings:
+    """
+    The time a request spent in each of its dependencies.
+
+    Calls made by concurrent tasks of the same request all add up, so a phase can last longer than the request.
+
+    Attributes:
+        phases (dict[str, list]): The total seconds and the number of calls, by phase.
+    """
+
+    def __init__(self):
+        self.phases: dict[str, list] = {}
+
+
+    def record(self, phase: str, seconds: float) -> None:
+        totals = self.phases.get(phase)
+        if totals is None:
+            self.phases[phase] = [seconds, 1]
+        else:
+            totals[0] += seconds
+            totals[1] += 1
+
+
+    def server_timing(self, total: float) -> str:
+        """
+        Format the timings as a Server-Timing header value, e.g. `db;dur=4.1;desc="3 calls", total;dur=12.5`.
+
+        Args:
+            total (float): The seconds the request took.
+
+        Returns:
+            str: The header value.
+        """
+        metrics = [f'{phase};dur={seconds * 1000:.1f};desc="{calls} call{"s" if calls > 1 else ""}"' for phase, (seconds, calls) in self.phases.items()]
+        metrics.append(f"{TOTAL_PHASE};dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def record_phase(phase: str, seconds: float) -> None:
+    """
+    Add the duration of a call to a dependency to the timings of the current request. Does nothing outside a request.
+
+    Args:
+        phase (str): The dependency, e.g. "db", "redis", "zoom", "smtp" or "bcrypt".
+        seconds (float): The duration of the call.
+    """
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.record(phase, seconds)
+
+
+@contextmanager
+def timed_phase(phase: str) -> Iterator[None]:
+    """
+    Time the enclosed block as a call to a dependency of the current request.
+
+    Args:
+        phase (str): The dependency, e.g. "redis" or "zoom".
+    """
+    if _request_timings.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - started)
+
+
+def instrument_queries(engine: Engine) -> None:
+    """
+    Time every statement executed by an engine as the "db" phase of the current request.
+
+    Args:
+        engine (Engine): The engine (`engine`, or `async_engine.sync_engine`).
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_phase("db", time.perf_counter() - conn.info["query_started"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # A failed statement never reaches after_cursor_execute
+        if exception_context.connection is not None and exception_context.connection.info.get("query_started"):
+            record_phase("db", time.perf_counter() - exception_context.connection.info["query_started"].pop())
+
+
+class ServerTimingMiddleware:
+    """
+    Times every request and the calls it makes to its dependencies (database, Redis, Zoom, SMTP and bcrypt).
+
+    The breakdown is sent back in a Server-Timing header when `server_timing_header` is True. The requests, their
+    duration and the time spent in each dependency are recorded in the Prometheus metrics by route template. Work
+    done after the response has started, such as background tasks, is only recorded in the metrics.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing_header: bool = True):
+        self.app = app
+        self.server_timing_header = server_timing_header
+
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing_header:
+                    MutableHeaders(scope=message).append("Server-Timing", timings.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            duration = time.perf_counter() - started
+            # The router leaves the matched route in the scope; its template keeps the path parameters out of the labels
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            child(HTTP_REQUESTS, method, route, str(status_code)).inc()
+            child(HTTP_REQUEST_DURATION, method, route).observe(duration)
+            for phase, (seconds, _) in timings.phases.items():
+                child(HTTP_REQUEST_PHASE_DURATION, route, phase).observe(seconds)
@@ -0,0 +1,363 @@
+import asyncio
+import logging
+import random
+import time
+import httpx
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional
+from ..config.exceptions import ServiceUnavailableError
+from .metrics import OUTBOUND_REQUESTS, OUTBOUND_REQUEST_DURATION, OUTBOUND_RETRIES, child
+from .request_timing import record_phase
+
+logger = logging.getLogger(__name__)
+
+# Circuit breakers of the outbound integrations, by name
+circuit_breakers: dict[str, "CircuitBreaker"] = {}
+
+# Methods that can be sent twice without changing the result
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "PATCH"})
+
+
+class CircuitBreaker:
+    """
+    Stops calling a service that keeps failing, so requests fail fast instead of waiting on it.
+
+    The breaker is closed while calls succeed. After `failure_threshold` consecutive failures it opens and
+    rejects every call for `reset_timeout` seconds; then it lets a single trial call through (half-open):
+    the breaker closes again if it succeeds and opens for another `reset_timeout` if it fails.
+
+    Attributes:
+        name (str): The name of the service, e.g. "zoom".
+        failure_threshold (int): Consecutive failures that open the breaker.
+        reset_timeout (float): Seconds the breaker stays open before a trial call.
+        failures (int): Current number of consecutive failures.
+        opened_total (int): Times the breaker has opened.
+        rejected_total (int): Calls rejected while the breaker was open.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    # Values of the state gauge
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.failures = 0
+        self.opened_total = 0
+        self.rejected_total = 0
+
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+
+    def retry_after(self) -> float:
+        """
+        Seconds until the breaker lets a trial call through, 0 if it is not open.
+        """
+        if self.state != self.OPEN:
+            return 0.0
+        return max(self.reset_timeout - (self._clock() - self._opened_at), 0.0)
+
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may be sent, reserving the trial call when the breaker is half-open.
+
+        Returns:
+            bool: True if the call may be sent.
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected_total += 1
+        return False
+
+
+    def release_trial(self) -> None:
+        """
+        Give the trial call back without a verdict, e.g. because it was cancelled, so the next call can be the trial.
+        """
+        self._trial_in_flight = False
+
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info("Circuit breaker %s closed", self.name)
+        self._state = self.CLOSED
+        self._trial_in_flight = False
+        self.failures = 0
+
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_in_flight or (self._state == self.CLOSED and self.failures >= self.failure_threshold):
+            self._state = self.OPEN
+            self._opened_at = self._clock()
+            self.opened_total += 1
+            logger.warning("Circuit breaker %s opened after %d consecutive failures", self.name, self.failures)
+        self._trial_in_flight = False
+
+
+    def snapshot(self) -> dict:
+        """
+        Read every metric at once.
+
+        Returns:
+            dict: The metrics, by name. `state` is 0 when closed, 1 when half-open and 2 when open.
+        """
+        return {
+            "state": self.STATE_VALUES[self.state],
+            "failures": self.failures,
+            "opened_total": self.opened_total,
+            "rejected_total": self.rejected_total,
+        }
+
+
+def get_circuit_breaker(name: str, failure_threshold: int, reset_timeout: float) -> CircuitBreaker:
+    """
+    Retrieve the process-wide circuit breaker of a service, creating it if needed.
+
+    Args:
+        name (str): The name of the service.
+        failure_threshold (int): Consecutive failures that open the breaker.
+        reset_timeout (float): Seconds the breaker stays open before a trial call.
+
+    Returns:
+        CircuitBreaker: The shared breaker.
+    """
+    if name not in circuit_breakers:
+        circuit_breakers[name] = CircuitBreaker(name, failure_threshold, reset_timeout)
+    return circuit_breakers[name]
+
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """
+    Read the Retry-After header of a response, given either in seconds or as an HTTP date.
+
+    Args:
+        response (httpx.Response): The response.
+
+    Returns:
+        Optional[float]: The seconds to wait, or None if the header is missing or invalid.
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RetryPolicy:
+    """
+    When and how long to wait before sending a failed request again.
+
+    Delays grow exponentially with "full jitter": a random delay between 0 and base_delay * 2 ** attempt,
+    capped at max_delay, so clients that failed together do not retry together. A Retry-After header
+    sent by the server takes precedence.
+
+    Attributes:
+        attempts (int): The maximum number of attempts, the first one included.
+        base_delay (float): The cap of the first delay, in seconds.
+        max_delay (float): The longest delay, in seconds.
+        retry_statuses (frozenset[int]): The response statuses worth retrying.
+    """
+
+    def __init__(self, attempts: int, base_delay: float, max_delay: float, retry_statuses: frozenset[int] = frozenset({429, 500, 502, 503, 504})):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = retry_statuses
+
+
+    def should_retry(self, method: str, response: Optional[httpx.Response], error: Optional[Exception]) -> bool:
+        """
+        Decide whether a failed attempt can be sent again.
+
+        Requests that are not idempotent (POST) are only retried when the server surely did not process them:
+        the connection could not be opened, or the server answered 429 or 503.
+
+        Args:
+            method (str): The HTTP method.
+            response (Optional[httpx.Response]): The response, if one was received.
+            error (Optional[Exception]): The transport error, if no response was received.
+
+        Returns:
+            bool: True if the request should be sent again.
+        """
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        if error is not None:
+            return idempotent or isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+        if response.status_code not in self.retry_statuses:
+            return False
+        return idempotent or response.status_code in (429, 503)
+
+
+    def delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """
+        Compute the wait before the next attempt.
+
+        Args:
+            attempt (int): The number of the attempt that failed, starting at 0.
+            response (Optional[httpx.Response]): The response of the failed attempt, if any.
+
+        Returns:
+            float: The seconds to wait.
+        """
+        if response is not None:
+            retry_after = parse_retry_after(response)
+            if retry_after is not None:
+                return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class ResilientClient:
+    """
+    Sends outbound HTTP requests with a deadline, retries and a circuit breaker.
+
+    Every call has a total time budget (`deadline`): each attempt is given what is left of it as timeout,
+    and a retry that would have to wait past it is not made. Server errors, rate limits and transport
+    errors count as failures of the circuit breaker; while it is open, calls fail immediately with
+    ServiceUnavailableError. Idempotent GET requests can also be hedged: if the first attempt has not
+    answered after `hedge_delay` seconds, a second one is sent and the first answer wins.
+
+    Attributes:
+        client (httpx.AsyncClient): The HTTP client.
+        breaker (CircuitBreaker): The circuit breaker of the service.
+        retry_policy (RetryPolicy): The retry policy.
+        deadline (float): The total seconds a call may take, retries included.
+        hedge_delay (float): Seconds before a GET request is hedged. 0 disables hedging.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, breaker: CircuitBreaker, retry_policy: RetryPolicy, deadline: float, hedge_delay: float = 0.0):
+        self.client = client
+        self.breaker = breaker
+        self.retry_policy = retry_policy
+        self.deadline = deadline
+        self.hedge_delay = hedge_delay
+
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying it while the retry policy and the deadline allow. The whole call, retries
+        included, is timed as a phase of the current request named after the breaker, and counted in the
+        outbound request metrics by outcome.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The URL.
+            **kwargs: Extra arguments forwarded to the HTTP client (headers, json, data, ...).
+
+        Returns:
+            httpx.Response: The last response received. It can still be an error the request was not retried for.
+
+        Raises:
+            ServiceUnavailableError: If the breaker is open, or the service kept failing until the attempts or the deadline ran out.
+        """
+        started = time.perf_counter()
+        outcome = "unavailable"
+        try:
+            response = await self._request(method, url, **kwargs)
+            outcome = f"{response.status_code // 100}xx"
+            return response
+        finally:
+            duration = time.perf_counter() - started
+            record_phase(self.breaker.name, duration)
+            child(OUTBOUND_REQUESTS, self.breaker.name, method.upper(), outcome).inc()
+            child(OUTBOUND_REQUEST_DURATION, self.breaker.name).observe(duration)
+
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.monotonic()
+        for attempt in range(self.retry_policy.attempts):
+            if not self.breaker.allow():
+                raise ServiceUnavailableError(self.breaker.name, retry_after=self.breaker.retry_after())
+
+            remaining = self.deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                raise ServiceUnavailableError(self.breaker.name)
+            response, error = None, None
+            try:
+                response = await self._send(method, url, timeout=self._timeout(remaining), **kwargs)
+            except httpx.TransportError as transport_error:
+                error = transport_error
+            except BaseException:
+                # Cancelled, or failed before reaching the service: says nothing about it, but must not keep the trial
+                self.breaker.release_trial()
+                raise
+
+            failed = error is not None or response.status_code >= 500 or response.status_code == 429
+            if failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+                return response
+
+            if attempt + 1 < self.retry_policy.attempts and self.retry_policy.should_retry(method, response, error):
+                delay = self.retry_policy.delay(attempt, response)
+                if time.monotonic() - started + delay < self.deadline:
+                    logger.info("Retrying %s %s in %.2f s after %s", method, url, delay, error or response.status_code)
+                    child(OUTBOUND_RETRIES, self.breaker.name).inc()
+                    await asyncio.sleep(delay)
+                    continue
+
+            if error is not None:
+                raise ServiceUnavailableError(self.breaker.name) from error
+            if response.status_code == 429 or response.status_code in (502, 503, 504):
+                raise ServiceUnavailableError(self.breaker.name, retry_after=parse_retry_after(response))
+            return response
+
+
+    def _timeout(self, remaining: float) -> httpx.Timeout:
+        # The client timeouts still apply to every attempt, but none may outlive the deadline
+        timeout = self.client.timeout
+        cap = lambda value: remaining if value is None else min(value, remaining)
+        return httpx.Timeout(connect=cap(timeout.connect), read=cap(timeout.read), write=cap(timeout.write), pool=cap(timeout.pool))
+
+
+    async def _send(self, method: str, url: str, timeout: httpx.Timeout, **kwargs) -> httpx.Response:
+        send: Callable[[], Awaitable[httpx.Response]] = lambda: self.client.request(method, url, timeout=timeout, **kwargs)
+        if self.hedge_delay <= 0 or method.upper() != "GET":
+            return await send()
+
+        first = asyncio.ensure_future(send())
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+        if done:
+            return first.result()
+
+        # The first attempt is slow: race it against a second one and keep whichever answers first
+        pending = {first, asyncio.ensure_future(send())}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
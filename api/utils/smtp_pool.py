@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import time
+import aiosmtplib
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from .email_utils import open_smtp_connection
+from .request_timing import timed_phase
+from ..config.constants import SMTP_POOL_SIZE, SMTP_POOL_HEALTH_CHECK_INTERVAL, SMTP_POOL_MAX_LIFETIME
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPSession:
+    """
+    An authenticated SMTP connection kept open by the pool.
+
+    Attributes:
+        smtp (aiosmtplib.SMTP): The underlying SMTP client.
+        created_at (float): Monotonic time when the connection was opened.
+        last_used (float): Monotonic time when the connection last talked to the server successfully.
+    """
+
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+    async def send(self, message: EmailMessage) -> None:
+        with timed_phase("smtp"):
+            await self.smtp.send_message(message)
+        self.last_used = time.monotonic()
+
+
+    async def noop(self) -> None:
+        await self.smtp.noop()
+        self.last_used = time.monotonic()
+
+
+    async def close(self) -> None:
+        try:
+            await self.smtp.quit()
+        except Exception:
+            self.smtp.close()
+
+
+class SMTPConnectionPool:
+    """
+    A pool of authenticated SMTP connections reused across messages.
+
+    Connections are opened lazily up to `size`. A connection that has been idle longer than
+    `health_check_interval` is checked with NOOP before being handed out, and one that fails
+    the check (or breaks while sending) is replaced by a new one. Connections older than
+    `max_lifetime` are closed and reopened, since most providers cap the length of a session.
+    Several messages can be sent back to back over the same session, avoiding a STARTTLS
+    handshake and login per message.
+
+    Attributes:
+        size (int): The maximum number of open connections.
+        health_check_interval (float): Idle seconds after which a connection is checked with NOOP before use.
+        max_lifetime (float): Seconds after which a connection is closed and replaced by a new one.
+        connect (Callable): Coroutine function that opens a new authenticated SMTP connection.
+    """
+
+    def __init__(
+        self,
+        size: int = SMTP_POOL_SIZE,
+        health_check_interval: float = SMTP_POOL_HEALTH_CHECK_INTERVAL,
+        max_lifetime: float = SMTP_POOL_MAX_LIFETIME,
+        connect: Callable[[], Awaitable[aiosmtplib.SMTP]] = open_smtp_connection):
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.max_lifetime = max_lifetime
+        self.connect = connect
+        self._idle: list[SMTPSession] = []
+        self._slots = asyncio.Semaphore(size)
+        self._closed = False
+
+
+    async def _open_session(self) -> SMTPSession:
+        return SMTPSession(await self.connect())
+
+
+    def _expired(self, session: SMTPSession) -> bool:
+        return time.monotonic() - session.created_at > self.max_lifetime
+
+
+    async def _checkout(self) -> SMTPSession:
+        while self._idle:
+            session = self._idle.pop()
+            if not session.smtp.is_connected or self._expired(session):
+                await session.close()
+                continue
+            if time.monotonic() - session.last_used > self.health_check_interval:
+                try:
+                    await session.noop()
+                except Exception as error:
+                    logger.info("Dropping broken SMTP connection: %r", error)
+                    session.smtp.close()
+                    continue
+            return session
+        return await self._open_session()
+
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[SMTPSession]:
+        """
+        Borrow a healthy SMTP session from the pool.
+
+        The session goes back to the pool when the block exits normally. If the block raises an
+        SMTP or connection error the session is discarded so the next borrower gets a new one.
+
+        Yields:
+            SMTPSession: The borrowed session.
+        """
+        if self._closed:
+            raise RuntimeError("The SMTP connection pool is closed")
+        async with self._slots:
+            session = await self._checkout()
+            try:
+                yield session
+            except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, ConnectionError, asyncio.TimeoutError):
+                session.smtp.close()
+                raise
+            except BaseException:
+                await self._release(session)
+                raise
+            else:
+                await self._release(session)
+
+
+    async def _release(self, session: SMTPSession) -> None:
+        if self._closed or not session.smtp.is_connected or self._expired(session):
+            await session.close()
+            return
+        self._idle.append(session)
+
+
+    async def send_message(self, message: EmailMessage) -> None:
+        """
+        Send a single message, reconnecting once if the pooled connection turns out to be dead.
+
+        Args:
+            message (EmailMessage): The message to send.
+        """
+        for attempt in range(2):
+            try:
+                async with self.session() as session:
+                    await session.send(message)
+                return
+            except (aiosmtplib.SMTPServerDisconnected, ConnectionError):
+                if attempt == 1:
+                    raise
+
+
+    async def health_check(self) -> None:
+        """
+        Send NOOP over every idle connection, dropping the ones that fail or have reached their lifetime.
+        """
+        idle, self._idle = self._idle, []
+        for session in idle:
+            if self._expired(session):
+                await session.close()
+                continue
+            try:
+                await session.noop()
+            except Exception:
+                session.smtp.close()
+                continue
+            self._idle.append(session)
+
+
+    async def close(self) -> None:
+        """
+        Close every idle connection and refuse new borrowers.
+        """
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for session in idle:
+            await session.close()
+
+
+# ------------------------------------ SHARED POOL ------------------------------------
+_smtp_pool: Optional[SMTPConnectionPool] = None
+_health_check_task: Optional[asyncio.Task] = None
+
+
+async def _run_health_checks(pool: SMTPConnectionPool) -> None:
+    while True:
+        await asyncio.sleep(pool.health_check_interval)
+        try:
+            await pool.health_check()
+        except Exception:
+            logger.exception("SMTP pool health check failed")
+
+
+async def open_smtp_pool() -> SMTPConnectionPool:
+    """
+    Create the shared SMTP connection pool and start its periodic NOOP health checks.
+    Meant to be called on application (or worker) startup.
+
+    Returns:
+        SMTPConnectionPool: The shared pool.
+    """
+    global _smtp_pool, _health_check_task
+    if _smtp_pool is None:
+        _smtp_pool = SMTPConnectionPool()
+        _health_check_task = asyncio.create_task(_run_health_checks(_smtp_pool))
+    return _smtp_pool
+
+
+def get_smtp_pool() -> Optional[SMTPConnectionPool]:
+    """
+    Retrieve the shared SMTP connection pool.
+
+    Returns:
+        Optional[SMTPConnectionPool]: The shared pool, or None if it has not been opened.
+    """
+    return _smtp_pool
+
+
+async def close_smtp_pool() -> None:
+    """
+    Stop the health checks and close the shared SMTP connection pool.
+    Meant to be called on application (or worker) shutdown.
+    """
+    global _smtp_pool, _health_check_task
+    if _health_check_task is not None:
+        _health_check_task.cancel()
+        _health_check_task = None
+    if _smtp_pool is not None:
+        await _smtp_pool.close()
+        _smtp_pool = None
@@ -0,0 +1,321 @@
+import asyncio
+import logging
+import time
+import uuid
+import httpx
+import redis.asyncio as aioredis
+from typing import Awaitable, Callable, Optional
+from .redis_utils import compare_and_delete, get_redis_client
+from .resilience import CircuitBreaker, ResilientClient, RetryPolicy, get_circuit_breaker
+from ..config.constants import (
+    ZOOM_HTTP_TIMEOUT, ZOOM_HTTP_CONNECT_TIMEOUT, ZOOM_HTTP_MAX_CONNECTIONS,
+    ZOOM_HTTP_MAX_KEEPALIVE_CONNECTIONS, ZOOM_HTTP_KEEPALIVE_EXPIRY,
+    ZOOM_TOKEN_CACHE_BACKEND, ZOOM_TOKEN_REFRESH_MARGIN,
+    ZOOM_CALL_DEADLINE, ZOOM_RETRY_ATTEMPTS, ZOOM_RETRY_BASE_DELAY, ZOOM_RETRY_MAX_DELAY,
+    ZOOM_BREAKER_FAILURE_THRESHOLD, ZOOM_BREAKER_RESET_TIMEOUT, ZOOM_HEDGE_DELAY
+    )
+
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------ ZOOM HTTP CLIENT ------------------------------------
+_zoom_client: Optional[httpx.AsyncClient] = None
+_zoom_client_loop: Optional[asyncio.AbstractEventLoop] = None
+# Closings of replaced clients, referenced until they finish so they are not garbage collected
+_closing_clients: set[asyncio.Future] = set()
+
+
+def create_zoom_client() -> httpx.AsyncClient:
+    """
+    Build a new async HTTP client configured for the Zoom API.
+
+    Returns:
+        httpx.AsyncClient: A client with keep-alive connection pooling and default timeouts.
+    """
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(ZOOM_HTTP_TIMEOUT, connect=ZOOM_HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=ZOOM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=ZOOM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=ZOOM_HTTP_KEEPALIVE_EXPIRY
+        )
+    )
+
+
+def get_zoom_client() -> httpx.AsyncClient:
+    """
+    Retrieve the shared Zoom HTTP client, creating it if needed.
+
+    The client is normally opened by the application lifespan. It is created lazily here as well
+    so the services keep working when the lifespan does not run (e.g. a TestClient used without a
+    context manager), and it is rebuilt if the event loop it was bound to is no longer the running one.
+
+    Returns:
+        httpx.AsyncClient: The shared Zoom HTTP client.
+    """
+    global _zoom_client, _zoom_client_loop
+    loop = asyncio.get_running_loop()
+    if _zoom_client is None or _zoom_client.is_closed or _zoom_client_loop is not loop:
+        if _zoom_client is not None and not _zoom_client.is_closed:
+            _close_replaced_client(_zoom_client, _zoom_client_loop)
+        _zoom_client = create_zoom_client()
+        _zoom_client_loop = loop
+    return _zoom_client
+
+
+async def _aclose_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except Exception:
+        logger.debug("Could not close a replaced Zoom client", exc_info=True)
+
+
+def _close_replaced_client(client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """
+    Close a client bound to another event loop without waiting for it, so its pooled connections are released.
+
+    Its connections belong to its loop, so it is closed there while that loop still runs (in another thread).
+    Otherwise it is closed on the running loop: its connections can no longer be used anyway.
+
+    Args:
+        client (httpx.AsyncClient): The replaced client.
+        loop (Optional[asyncio.AbstractEventLoop]): The event loop the client was bound to.
+    """
+    if loop is not None and loop.is_running() and not loop.is_closed():
+        closing = asyncio.wrap_future(asyncio.run_coroutine_threadsafe(_aclose_quietly(client), loop))
+    else:
+        closing = asyncio.ensure_future(_aclose_quietly(client))
+    _closing_clients.add(closing)
+    closing.add_done_callback(_closing_clients.discard)
+
+
+async def open_zoom_client() -> httpx.AsyncClient:
+    """
+    Open the shared Zoom HTTP client. Meant to be called on application startup.
+
+    Returns:
+        httpx.AsyncClient: The shared Zoom HTTP client.
+    """
+    return get_zoom_client()
+
+
+async def close_zoom_client() -> None:
+    """
+    Close the shared Zoom HTTP client and release its pooled connections.
+    Meant to be called on application shutdown.
+    """
+    global _zoom_client, _zoom_client_loop
+    if _zoom_client is not None and not _zoom_client.is_closed:
+        await _zoom_client.aclose()
+    _zoom_client = None
+    _zoom_client_loop = None
+
+
+# ------------------------------------ ZOOM RESILIENCE ------------------------------------
+def get_zoom_circuit_breaker() -> CircuitBreaker:
+    """
+    Retrieve the process-wide circuit breaker of the Zoom API.
+
+    Returns:
+        CircuitBreaker: The breaker shared by every call to Zoom.
+    """
+    return get_circuit_breaker("zoom", ZOOM_BREAKER_FAILURE_THRESHOLD, ZOOM_BREAKER_RESET_TIMEOUT)
+
+
+def create_zoom_resilient_client(http_client: httpx.AsyncClient) -> ResilientClient:
+    """
+    Wrap a Zoom HTTP client with the deadline, retries, circuit breaker and hedging configured for Zoom.
+
+    Args:
+        http_client (httpx.AsyncClient): The HTTP client for the Zoom API.
+
+    Returns:
+        ResilientClient: The wrapped client.
+    """
+    return ResilientClient(
+        http_client,
+        get_zoom_circuit_breaker(),
+        RetryPolicy(ZOOM_RETRY_ATTEMPTS, ZOOM_RETRY_BASE_DELAY, ZOOM_RETRY_MAX_DELAY),
+        deadline=ZOOM_CALL_DEADLINE,
+        hedge_delay=ZOOM_HEDGE_DELAY
+    )
+
+
+# ------------------------------------ ZOOM ACCESS TOKEN CACHE ------------------------------------
+TokenFetcher = Callable[[], Awaitable[tuple[Optional[str], int]]]
+_zoom_token_cache: Optional["ZoomTokenCache"] = None
+
+
+class ZoomTokenCache:
+    """
+    A process-wide cache for the Zoom Server-to-Server OAuth access token.
+
+    The token is stored together with its expiry. Once it enters the refresh margin it keeps being
+    served while a single background task fetches a new one; once it is actually expired, callers
+    wait on a single-flight lock so a burst of requests triggers exactly one refresh. When a Redis
+    client is given, the token is also shared with the other workers through Redis.
+
+    Attributes:
+        refresh_margin (float): Seconds before expiry at which the token is refreshed in the background.
+        redis_client (Optional[aioredis.Redis]): Redis client used to share the token across workers.
+    """
+
+    EXPIRY_SKEW = 30
+    REDIS_KEY = "zoom:access_token"
+    REDIS_LOCK_KEY = "zoom:access_token:lock"
+    REDIS_LOCK_TIMEOUT = 10
+    REDIS_WAIT_INTERVAL = 0.05
+
+    def __init__(self, refresh_margin: float = ZOOM_TOKEN_REFRESH_MARGIN, redis_client: Optional[aioredis.Redis] = None):
+        """
+        Initialize an empty token cache.
+
+        Args:
+            refresh_margin (float): Seconds before expiry at which the token is refreshed in the background.
+            redis_client (Optional[aioredis.Redis]): Redis client used to share the token across workers.
+        """
+        self.refresh_margin = refresh_margin
+        self.redis_client = redis_client
+        self._token: Optional[str] = None
+        self._expires_at: float = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+
+    def _is_valid(self) -> bool:
+        return self._token is not None and time.monotonic() < self._expires_at - self.EXPIRY_SKEW
+
+
+    def _needs_refresh(self) -> bool:
+        return time.monotonic() >= self._expires_at - self.refresh_margin
+
+
+    def _store(self, token: str, expires_in: float) -> None:
+        self._token = token
+        self._expires_at = time.monotonic() + expires_in
+
+
+    async def get_token(self, fetch: TokenFetcher) -> Optional[str]:
+        """
+        Return a valid access token, fetching a new one only when needed.
+
+        Args:
+            fetch (TokenFetcher): Coroutine function that requests a new token from Zoom and returns (token, expires_in).
+
+        Returns:
+            Optional[str]: The access token, or None if Zoom did not return one.
+        """
+        if self._is_valid():
+            if self._needs_refresh():
+                self._schedule_refresh(fetch)
+            return self._token
+
+        async with self._get_lock():
+            # Another coroutine may have refreshed the token while we were waiting for the lock
+            if self._is_valid():
+                return self._token
+            await self._refresh(fetch)
+            return self._token
+
+
+    def _schedule_refresh(self, fetch: TokenFetcher) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.create_task(self._background_refresh(fetch))
+
+
+    async def _background_refresh(self, fetch: TokenFetcher) -> None:
+        lock = self._get_lock()
+        if lock.locked():
+            return
+        async with lock:
+            if not self._needs_refresh():
+                return
+            try:
+                await self._refresh(fetch, require_fresh=True)
+            except Exception:
+                # The current token is still valid; the next caller will try again.
+                pass
+
+
+    async def _refresh(self, fetch: TokenFetcher, require_fresh: bool = False) -> None:
+        if self.redis_client is None:
+            await self._fetch_and_store(fetch)
+            return
+
+        # Another worker may already have published a token we can reuse
+        if await self._load_shared() and not (require_fresh and self._needs_refresh()):
+            return
+
+        # The token identifies this holder, so a lock that expired and was taken by another worker is not released
+        lock_token = uuid.uuid4().hex
+        acquired = await self.redis_client.set(self.REDIS_LOCK_KEY, lock_token, nx=True, ex=self.REDIS_LOCK_TIMEOUT)
+        if acquired:
+            try:
+                await self._fetch_and_store(fetch)
+            finally:
+                await compare_and_delete(self.redis_client, self.REDIS_LOCK_KEY, lock_token)
+            return
+
+        # Another worker is refreshing: wait for it to publish the token before fetching our own
+        waited = 0.0
+        while waited < self.REDIS_LOCK_TIMEOUT:
+            await asyncio.sleep(self.REDIS_WAIT_INTERVAL)
+            waited += self.REDIS_WAIT_INTERVAL
+            if await self._load_shared() and not self._needs_refresh():
+                return
+            if not await self.redis_client.exists(self.REDIS_LOCK_KEY):
+                break
+        await self._fetch_and_store(fetch)
+
+
+    async def _load_shared(self) -> bool:
+        token = await self.redis_client.get(self.REDIS_KEY)
+        ttl = await self.redis_client.ttl(self.REDIS_KEY)
+        if token and ttl > self.EXPIRY_SKEW:
+            self._store(token, ttl)
+            return True
+        return False
+
+
+    async def _fetch_and_store(self, fetch: TokenFetcher) -> None:
+        token, expires_in = await fetch()
+        if not token:
+            return
+        self._store(token, expires_in)
+        if self.redis_client is not None:
+            await self.redis_client.set(self.REDIS_KEY, token, ex=int(expires_in))
+
+
+    async def invalidate(self) -> None:
+        """
+        Drop the cached token, e.g. after Zoom rejected it.
+        """
+        self._token = None
+        self._expires_at = 0.0
+        if self.redis_client is not None:
+            await self.redis_client.delete(self.REDIS_KEY)
+
+
+def get_zoom_token_cache() -> ZoomTokenCache:
+    """
+    Retrieve the process-wide Zoom access token cache.
+
+    Returns:
+        ZoomTokenCache: The shared token cache, backed by Redis when ZOOM_TOKEN_CACHE_BACKEND is "redis".
+    """
+    global _zoom_token_cache
+    if _zoom_token_cache is None:
+        _zoom_token_cache = ZoomTokenCache()
+    if ZOOM_TOKEN_CACHE_BACKEND == "redis":
+        _zoom_token_cache.redis_client = get_redis_client()
+    return _zoom_token_cache
@@ -0,0 +1,76 @@
+import hashlib
+import hmac
+import time
+from typing import Optional
+
+# Redis list the webhook endpoint pushes the events to and the worker pops them from
+ZOOM_WEBHOOK_QUEUE = "zoom:webhook-events"
+# Batch being applied by the worker, and events that could not be applied
+ZOOM_WEBHOOK_PROCESSING_QUEUE = "zoom:webhook-events:processing"
+ZOOM_WEBHOOK_DEAD_QUEUE = "zoom:webhook-events:dead"
+# Events applied to the meetings, the others are acknowledged and dropped
+ZOOM_MEETING_EVENTS = frozenset({"meeting.updated", "meeting.deleted", "meeting.started", "meeting.ended"})
+
+
+def sign_zoom_payload(secret_token: str, timestamp: str, body: bytes) -> str:
+    """
+    Compute the signature Zoom sends in the x-zm-signature header of a webhook request.
+
+    Args:
+        secret_token (str): The Secret Token of the Zoom app.
+        timestamp (str): The x-zm-request-timestamp header, in seconds.
+        body (bytes): The raw body of the request.
+
+    Returns:
+        str: The signature, e.g. "v0=3f1c...".
+    """
+    message = b"v0:%s:%s" % (timestamp.encode(), body)
+    return "v0=" + hmac.new(secret_token.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_zoom_signature(
+    secret_token: str,
+    timestamp: Optional[str],
+    signature: Optional[str],
+    body: bytes,
+    max_age: float,
+    now: Optional[float] = None) -> bool:
+    """
+    Check that a webhook request was signed by Zoom and is recent.
+
+    Args:
+        secret_token (str): The Secret Token of the Zoom app.
+        timestamp (Optional[str]): The x-zm-request-timestamp header.
+        signature (Optional[str]): The x-zm-signature header.
+        body (bytes): The raw body of the request.
+        max_age (float): Seconds after which a signed request is rejected, so it cannot be replayed later.
+        now (Optional[float]): The current time in seconds, defaults to time.time().
+
+    Returns:
+        bool: True if the signature matches and the timestamp is within `max_age` seconds.
+    """
+    if not timestamp or not signature:
+        return False
+    try:
+        age = (time.time() if now is None else now) - int(timestamp)
+    except ValueError:
+        return False
+    if abs(age) > max_age:
+        return False
+    return hmac.compare_digest(sign_zoom_payload(secret_token, timestamp, body), signature)
+
+
+def zoom_url_validation_response(secret_token: str, plain_token: str) -> dict:
+    """
+    Build the answer to the endpoint.url_validation challenge Zoom sends when the webhook URL is saved,
+    and periodically afterwards.
+
+    Args:
+        secret_token (str): The Secret Token of the Zoom app.
+        plain_token (str): The plainToken of the challenge.
+
+    Returns:
+        dict: The plainToken and its HMAC-SHA256, as Zoom expects them.
+    """
+    encrypted_token = hmac.new(secret_token.encode(), plain_token.encode(), hashlib.sha256).hexdigest()
+    return {"plainToken": plain_token, "encryptedToken": encrypted_token}
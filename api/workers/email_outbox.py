@@ -0,0 +1,221 @@
+"""
+Email outbox worker.
+
+Drains the `email_outbox` table in batches and delivers the messages over the persistent
+connections of an SMTP connection pool. Failed messages are retried with exponential backoff
+and moved to the DEAD status (dead-lettered) once EMAIL_OUTBOX_MAX_ATTEMPTS is reached.
+
+Run it with:
+    python -m api.workers.email_outbox
+
+or set EMAIL_OUTBOX_IN_PROCESS=true to let the API process drain the outbox itself.
+"""
+from sqlalchemy.orm import Session, sessionmaker
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+import aiosmtplib
+import asyncio
+import logging
+import random
+import signal
+
+from ..database import SessionLocal
+from ..models import EmailOutbox, EmailOutboxStatus
+from ..utils.email_utils import build_message
+from ..utils.metrics import EMAILS, child
+from ..utils.smtp_pool import SMTPConnectionPool, open_smtp_pool, close_smtp_pool
+from ..config.constants import (
+    EMAIL_OUTBOX_BATCH_SIZE, EMAIL_OUTBOX_POLL_INTERVAL, EMAIL_OUTBOX_MAX_ATTEMPTS, EMAIL_OUTBOX_RETRY_BACKOFF
+    )
+
+logger = logging.getLogger(__name__)
+
+
+class EmailOutboxWorker:
+    """
+    A worker that delivers the messages queued in the email outbox.
+
+    Attributes:
+        session_factory (sessionmaker): Factory for the database sessions used by the worker.
+        batch_size (int): The maximum number of messages claimed per batch.
+        poll_interval (float): Seconds to wait before polling again when the outbox is empty.
+        max_attempts (int): Delivery attempts after which a message is dead-lettered.
+        retry_backoff (float): Base delay in seconds for the exponential retry backoff.
+        smtp_pool (SMTPConnectionPool): The pool of SMTP connections the messages are sent through.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        batch_size: int = EMAIL_OUTBOX_BATCH_SIZE,
+        poll_interval: float = EMAIL_OUTBOX_POLL_INTERVAL,
+        max_attempts: int = EMAIL_OUTBOX_MAX_ATTEMPTS,
+        retry_backoff: float = EMAIL_OUTBOX_RETRY_BACKOFF,
+        smtp_pool: Optional[SMTPConnectionPool] = None):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.smtp_pool = smtp_pool if smtp_pool is not None else SMTPConnectionPool()
+        self._stopped = asyncio.Event()
+
+
+    def claim_batch(self, db: Session) -> list[EmailOutbox]:
+        """
+        Lock the next batch of messages that are due for delivery.
+
+        SKIP LOCKED lets several workers drain the outbox concurrently without claiming the same rows.
+
+        Args:
+            db (Session): The database session holding the locks until it commits.
+
+        Returns:
+            list[EmailOutbox]: The claimed messages.
+        """
+        return (
+            db.query(EmailOutbox)
+            .filter(EmailOutbox.status == EmailOutboxStatus.PENDING, EmailOutbox.next_attempt_at <= datetime.now(timezone.utc))
+            .order_by(EmailOutbox.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+
+    def mark_failed(self, message: EmailOutbox, error: Exception) -> None:
+        """
+        Record a failed delivery attempt and schedule the next one, or dead-letter the message.
+
+        Args:
+            message (EmailOutbox): The message that could not be delivered.
+            error (Exception): The error raised while delivering it.
+        """
+        message.attempts += 1
+        message.last_error = repr(error)
+        if message.attempts >= self.max_attempts:
+            message.status = EmailOutboxStatus.DEAD
+            child(EMAILS, "dead").inc()
+            logger.error("Email %s to %s dead-lettered after %s attempts: %r", message.id, message.recipient, message.attempts, error)
+            return
+
+        delay = self.retry_backoff * 2 ** (message.attempts - 1)
+        delay += random.uniform(0, delay / 2)
+        message.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        child(EMAILS, "failed").inc()
+
+
+    def postpone(self, messages: list[EmailOutbox], error: Exception) -> None:
+        """
+        Schedule messages for a later attempt without using up their attempts,
+        e.g. because the SMTP server could not be reached.
+
+        Args:
+            messages (list[EmailOutbox]): The messages that were not sent.
+            error (Exception): The error that prevented sending them.
+        """
+        for message in messages:
+            message.last_error = repr(error)
+            message.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=self.retry_backoff)
+        child(EMAILS, "postponed").inc(len(messages))
+
+
+    async def deliver(self, messages: list[EmailOutbox]) -> None:
+        """
+        Deliver a batch of messages, spreading it over the connections of the SMTP pool.
+
+        Args:
+            messages (list[EmailOutbox]): The messages to deliver. Their status is updated in place.
+        """
+        chunks = [messages[index::self.smtp_pool.size] for index in range(min(self.smtp_pool.size, len(messages)))]
+        await asyncio.gather(*(self._deliver_over_one_session(chunk) for chunk in chunks))
+
+
+    async def _deliver_over_one_session(self, messages: list[EmailOutbox]) -> None:
+        pending = list(messages)
+        try:
+            async with self.smtp_pool.session() as session:
+                while pending:
+                    message = pending[0]
+                    try:
+                        await session.send(build_message(message.recipient, message.subject, message.body, message.subtype))
+                    except (aiosmtplib.SMTPServerDisconnected, ConnectionError) as error:
+                        # The connection died under this message: count the attempt and postpone the rest
+                        self.mark_failed(pending.pop(0), error)
+                        raise
+                    except Exception as error:
+                        self.mark_failed(message, error)
+                    else:
+                        message.attempts += 1
+                        message.status = EmailOutboxStatus.SENT
+                        message.sent_at = datetime.now(timezone.utc)
+                        child(EMAILS, "sent").inc()
+                    pending.pop(0)
+        except Exception as error:
+            # The messages themselves are fine, so an SMTP outage postpones them without using up their attempts
+            logger.warning("Could not deliver through the SMTP server: %r", error)
+            self.postpone(pending, error)
+
+
+    async def drain_once(self) -> int:
+        """
+        Claim and deliver one batch of messages.
+
+        Returns:
+            int: The number of messages processed.
+        """
+        db: Session = self.session_factory()
+        try:
+            # The database calls run in a thread so the worker can share the event loop of the API
+            messages = await asyncio.to_thread(self.claim_batch, db)
+            if messages:
+                await self.deliver(messages)
+            await asyncio.to_thread(db.commit)
+            return len(messages)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+    async def run(self) -> None:
+        """
+        Drain the outbox until stop() is called. Full batches are followed immediately by the next one.
+        """
+        while not self._stopped.is_set():
+            try:
+                processed = await self.drain_once()
+            except Exception:
+                logger.exception("Error while draining the email outbox")
+                processed = 0
+
+            if processed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+    def stop(self) -> None:
+        """
+        Ask the worker to stop after the current batch.
+        """
+        self._stopped.set()
+
+
+async def main() -> None:
+    worker = EmailOutboxWorker(smtp_pool=await open_smtp_pool())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    logger.info("Email outbox worker started")
+    try:
+        await worker.run()
+    finally:
+        await close_smtp_pool()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
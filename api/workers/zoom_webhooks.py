@@ -0,0 +1,306 @@
+"""
+Zoom webhook worker.
+
+Pops the events queued by the /webhooks/zoom endpoint from Redis in batches and applies them to the
+`meetings` table, one transaction per batch: meeting.updated changes the start time, topic or join URL,
+meeting.deleted deletes the meeting, and meeting.started and meeting.ended change its status. Every meeting
+keeps the time of the last event applied to it, so events delivered twice or out of order are skipped.
+
+A batch is moved atomically from the queue to a processing list and only removed from it once its transaction
+is committed, so the events of a worker that dies mid-batch are applied by the next one it starts. A batch the
+database rejects stays in the processing list and is tried again on the next poll; after
+ZOOM_WEBHOOK_MAX_ATTEMPTS failures its events are applied one by one, and the ones that still fail are moved to
+a dead-letter list to be inspected, so they do not hold up the events behind them.
+
+Every worker needs a processing list of its own: run several with different `processing_queue` names.
+
+Run it with:
+    python -m api.workers.zoom_webhooks
+
+or set ZOOM_WEBHOOK_IN_PROCESS=true to let the API process apply the events itself, which also keeps the
+advisor schedule of that process up to date.
+"""
+from sqlalchemy.orm import Session, sessionmaker
+from datetime import datetime
+from typing import Callable
+import redis.asyncio as aioredis
+import asyncio
+import json
+import logging
+import signal
+
+from ..database import SessionLocal
+from ..models import Meeting, MeetingStatus
+from ..utils.advisor_schedule import get_advisor_schedule, to_utc
+from ..utils.metrics import ZOOM_WEBHOOK_EVENTS, child
+from ..utils.redis_utils import get_redis_client, close_redis_client
+from ..utils.zoom_webhooks import ZOOM_MEETING_EVENTS, ZOOM_WEBHOOK_DEAD_QUEUE, ZOOM_WEBHOOK_PROCESSING_QUEUE, ZOOM_WEBHOOK_QUEUE
+from ..config.constants import ZOOM_WEBHOOK_BATCH_SIZE, ZOOM_WEBHOOK_MAX_ATTEMPTS, ZOOM_WEBHOOK_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+MEETING_STATUSES = {"meeting.started": MeetingStatus.STARTED, "meeting.ended": MeetingStatus.ENDED}
+
+
+class ZoomWebhookWorker:
+    """
+    A worker that applies the queued Zoom webhook events to the meetings.
+
+    Attributes:
+        session_factory (sessionmaker): Factory for the database sessions used by the worker.
+        redis_client_factory (Callable[[], aioredis.Redis]): Factory for the Redis client holding the queue.
+        batch_size (int): The maximum number of events applied per transaction.
+        poll_interval (float): Seconds to wait before polling again when the queue is empty.
+        max_attempts (int): Failed attempts of a batch after which its events are applied one by one.
+        processing_queue (str): The Redis list holding the batch being applied.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        redis_client_factory: Callable[[], aioredis.Redis] = get_redis_client,
+        batch_size: int = ZOOM_WEBHOOK_BATCH_SIZE,
+        poll_interval: float = ZOOM_WEBHOOK_POLL_INTERVAL,
+        max_attempts: int = ZOOM_WEBHOOK_MAX_ATTEMPTS,
+        processing_queue: str = ZOOM_WEBHOOK_PROCESSING_QUEUE):
+        self.session_factory = session_factory
+        self.redis_client_factory = redis_client_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.processing_queue = processing_queue
+        self.attempts_key = f"{processing_queue}:attempts"
+        self._stopped = asyncio.Event()
+
+
+    def apply_batch(self, db: Session, events: list[dict]) -> dict[int, tuple[int, datetime] | None]:
+        """
+        Apply a batch of events to the meetings they refer to, without committing.
+
+        The meetings are read with a single locking SELECT, and the events of each meeting are applied in
+        the order Zoom sent them.
+
+        Args:
+            db (Session): The database session holding the locks until it commits.
+            events (list[dict]): The parsed events, as sent by Zoom.
+
+        Returns:
+            dict[int, tuple[int, datetime] | None]: The advisor and start time of the meetings to book in the
+                advisor schedule once committed, by meeting ID; None for the meetings to cancel.
+        """
+        events_by_meeting: dict[str, list[dict]] = {}
+        for event in events:
+            events_by_meeting.setdefault(str(event["payload"]["object"]["id"]), []).append(event)
+        if not events_by_meeting:
+            return {}
+
+        meetings = (
+            db.query(Meeting)
+            .filter(Meeting.zoom_meeting_id.in_(events_by_meeting))
+            .with_for_update()
+            .all()
+        )
+        meetings = {meeting.zoom_meeting_id: meeting for meeting in meetings}
+
+        schedule_changes: dict[int, tuple[int, datetime] | None] = {}
+        for zoom_meeting_id, meeting_events in events_by_meeting.items():
+            meeting = meetings.get(zoom_meeting_id)
+            if meeting is None:
+                child(ZOOM_WEBHOOK_EVENTS, "unmatched").inc(len(meeting_events))
+                continue
+
+            deleted = False
+            for event in sorted(meeting_events, key=lambda event: event["event_ts"]):
+                if deleted or (meeting.zoom_event_ts is not None and event["event_ts"] <= meeting.zoom_event_ts):
+                    # Already applied, or sent before the last event applied
+                    child(ZOOM_WEBHOOK_EVENTS, "stale").inc()
+                    continue
+
+                changes = event["payload"]["object"]
+                if event["event"] == "meeting.deleted":
+                    db.delete(meeting)
+                    deleted = True
+                    schedule_changes[meeting.id] = None
+                elif event["event"] == "meeting.updated":
+                    if "start_time" in changes:
+                        meeting.start_time = to_utc(datetime.fromisoformat(changes["start_time"]))
+                        schedule_changes[meeting.id] = (meeting.advisor_id, meeting.start_time)
+                    if "topic" in changes:
+                        meeting.topic = changes["topic"]
+                    if "join_url" in changes:
+                        meeting.join_url = changes["join_url"]
+                else:
+                    meeting.status = MEETING_STATUSES[event["event"]]
+                meeting.zoom_event_ts = event["event_ts"]
+                child(ZOOM_WEBHOOK_EVENTS, "applied").inc()
+
+        return schedule_changes
+
+
+    def parse(self, raw_events: list[str]) -> list[dict]:
+        """
+        Parse the queued events, dropping the malformed ones so they cannot hold up the queue.
+
+        Args:
+            raw_events (list[str]): The bodies of the webhook requests.
+
+        Returns:
+            list[dict]: The meeting events.
+        """
+        events = []
+        for raw_event in raw_events:
+            try:
+                event = json.loads(raw_event)
+                changes = event["payload"]["object"]
+                if event["event"] in ZOOM_MEETING_EVENTS and changes["id"] and isinstance(event["event_ts"], int):
+                    if "start_time" in changes:
+                        datetime.fromisoformat(changes["start_time"])
+                    events.append(event)
+                    continue
+            except (ValueError, TypeError, KeyError):
+                pass
+            logger.warning("Dropped a malformed Zoom webhook event: %.200s", raw_event)
+            child(ZOOM_WEBHOOK_EVENTS, "ignored").inc()
+        return events
+
+
+    async def claim_batch(self, redis_client: aioredis.Redis) -> list[str]:
+        """
+        Retrieve the batch left in the processing list, or move the next one there from the queue.
+
+        The events are moved with LMOVE in a MULTI transaction, so each one is either still queued or in the
+        processing list, whatever happens to the worker.
+
+        Args:
+            redis_client (aioredis.Redis): The Redis client holding the queue.
+
+        Returns:
+            list[str]: The bodies of the webhook requests of the batch, oldest first.
+        """
+        raw_events = await redis_client.lrange(self.processing_queue, 0, -1)
+        if raw_events:
+            # Left by a failed attempt, or by a worker that stopped before committing
+            return raw_events
+
+        async with redis_client.pipeline(transaction=True) as pipeline:
+            for _ in range(self.batch_size):
+                pipeline.lmove(ZOOM_WEBHOOK_QUEUE, self.processing_queue, "LEFT", "RIGHT")
+            moved = await pipeline.execute()
+        return [raw_event for raw_event in moved if raw_event is not None]
+
+
+    async def apply(self, raw_events: list[str]) -> None:
+        """
+        Apply events in one transaction, then update the advisor schedule of this process.
+
+        Args:
+            raw_events (list[str]): The bodies of the webhook requests.
+        """
+        db: Session = self.session_factory()
+        try:
+            # The database calls run in a thread so the worker can share the event loop of the API
+            schedule_changes = await asyncio.to_thread(self.apply_batch, db, self.parse(raw_events))
+            await asyncio.to_thread(db.commit)
+        except Exception:
+            await asyncio.to_thread(db.rollback)
+            raise
+        finally:
+            await asyncio.to_thread(db.close)
+
+        schedule = get_advisor_schedule()
+        for meeting_id, booking in schedule_changes.items():
+            if booking is None:
+                schedule.cancel(meeting_id)
+            else:
+                schedule.book(meeting_id, *booking, force=True)
+
+
+    async def apply_one_by_one(self, redis_client: aioredis.Redis, raw_events: list[str]) -> None:
+        """
+        Apply the events of a batch that kept failing in a transaction each, moving the ones that fail to the
+        dead-letter list.
+
+        Args:
+            redis_client (aioredis.Redis): The Redis client holding the dead-letter list.
+            raw_events (list[str]): The bodies of the webhook requests.
+        """
+        for raw_event in raw_events:
+            try:
+                await self.apply([raw_event])
+            except Exception as error:
+                logger.error("Zoom webhook event dead-lettered after %s attempts: %r, %.200s", self.max_attempts, error, raw_event)
+                await redis_client.rpush(ZOOM_WEBHOOK_DEAD_QUEUE, raw_event)
+                child(ZOOM_WEBHOOK_EVENTS, "dead").inc()
+
+
+    async def drain_once(self) -> int:
+        """
+        Claim and apply one batch of events.
+
+        Returns:
+            int: The number of events processed.
+
+        Raises:
+            Exception: The error raised by a failed attempt, the batch is then tried again on the next call.
+        """
+        redis_client = self.redis_client_factory()
+        raw_events = await self.claim_batch(redis_client)
+        if not raw_events:
+            return 0
+
+        try:
+            await self.apply(raw_events)
+        except Exception:
+            attempts = await redis_client.incr(self.attempts_key)
+            child(ZOOM_WEBHOOK_EVENTS, "retried").inc(len(raw_events))
+            if attempts < self.max_attempts:
+                raise
+            logger.exception("Zoom webhook batch failed %s times, applying its events one by one", attempts)
+            await self.apply_one_by_one(redis_client, raw_events)
+
+        async with redis_client.pipeline(transaction=True) as pipeline:
+            pipeline.delete(self.processing_queue, self.attempts_key)
+            await pipeline.execute()
+        return len(raw_events)
+
+
+    async def run(self) -> None:
+        """
+        Apply the queued events until stop() is called. Full batches are followed immediately by the next one.
+        """
+        while not self._stopped.is_set():
+            try:
+                processed = await self.drain_once()
+            except Exception:
+                logger.exception("Error while applying the Zoom webhook events")
+                processed = 0
+
+            if processed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+    def stop(self) -> None:
+        """
+        Ask the worker to stop after the current batch.
+        """
+        self._stopped.set()
+
+
+async def main() -> None:
+    worker = ZoomWebhookWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    logger.info("Zoom webhook worker started")
+    try:
+        await worker.run()
+    finally:
+        await close_redis_client()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
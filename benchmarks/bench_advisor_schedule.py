@@ -0,0 +1,90 @@
+"""
+Micro-benchmark of the advisor availability lookups.
+
+Builds an AdvisorSchedule (api/utils/advisor_schedule.py) with random meetings and compares
+"which advisors are free at T" against a linear scan of the meetings, the in-memory
+equivalent of filtering the meetings table on every request.
+
+Run it with:
+    python -m benchmarks.bench_advisor_schedule [--advisors 10000] [--meetings 1000000]
+"""
+import argparse
+import random
+import time
+import timeit
+from datetime import datetime, timedelta
+from itertools import cycle
+
+from api.utils.advisor_schedule import AdvisorSchedule
+
+DURATION = timedelta(minutes=30)
+HORIZON_START = datetime(2030, 1, 1)
+
+
+def generate_meetings(advisors: int, meetings: int, slots: int) -> list[tuple[int, int, datetime]]:
+    per_advisor, remainder = divmod(meetings, advisors)
+    rows = []
+    for advisor_id in range(1, advisors + 1):
+        count = per_advisor + (1 if advisor_id <= remainder else 0)
+        for slot in random.sample(range(slots), count):
+            rows.append((len(rows) + 1, advisor_id, HORIZON_START + slot * DURATION))
+    return rows
+
+
+def linear_free_advisors(advisor_ids: list[int], meetings: list[tuple[int, int, datetime]], start: datetime) -> list[int]:
+    busy = {advisor_id for _, advisor_id, booked in meetings if abs(booked - start) < DURATION}
+    return [advisor_id for advisor_id in advisor_ids if advisor_id not in busy]
+
+
+def per_call_microseconds(function, number: int) -> float:
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argument_parser.add_argument("--advisors", type=int, default=10000, help="Number of advisors")
+    argument_parser.add_argument("--meetings", type=int, default=1000000, help="Number of booked meetings")
+    argument_parser.add_argument("--days", type=int, default=365, help="Days the meetings are spread over")
+    argument_parser.add_argument("--number", type=int, default=2000, help="Lookups per timing run")
+    argument_parser.add_argument("--seed", type=int, default=7)
+    arguments = argument_parser.parse_args()
+    random.seed(arguments.seed)
+
+    slots = arguments.days * 48
+    meetings = generate_meetings(arguments.advisors, arguments.meetings, slots)
+    advisor_ids = list(range(1, arguments.advisors + 1))
+
+    schedule = AdvisorSchedule(duration=DURATION)
+    start = time.perf_counter()
+    schedule.load(advisor_ids, meetings)
+    print(f"Loading {arguments.meetings:,} meetings of {arguments.advisors:,} advisors: {time.perf_counter() - start:.2f} s (once per process)\n")
+
+    # Half of the lookups fall on the 30-minute grid of the bookings, half in between them
+    times = [HORIZON_START + random.randrange(slots * 2) * DURATION / 2 for _ in range(arguments.number)]
+    lookups = cycle(times)
+    advisor_lookups = cycle([(random.choice(advisor_ids), moment) for moment in times])
+    busy = sum(len(schedule.busy_advisors(moment)) for moment in times) / len(times)
+
+    def book_and_cancel():
+        moment = next(lookups)
+        if schedule.book("benchmark", 1, moment):
+            schedule.cancel("benchmark")
+
+    print(f"{'operation':<44}{'time (us)':>12}")
+    results = {
+        "free_advisors(T, limit=8)": lambda: schedule.free_advisors(next(lookups), 8),
+        "busy_advisors(T)": lambda: schedule.busy_advisors(next(lookups)),
+        "is_free(advisor, T)": lambda: schedule.is_free(*next(advisor_lookups)),
+        "book + cancel": book_and_cancel,
+    }
+    for name, function in results.items():
+        print(f"{name:<44}{per_call_microseconds(function, arguments.number // 2):>12.2f}")
+
+    linear_runs = 5
+    linear_time = timeit.timeit(lambda: linear_free_advisors(advisor_ids, meetings, random.choice(times)), number=linear_runs) / linear_runs
+    print(f"{'linear scan of the meetings (baseline)':<44}{linear_time * 1e6:>12.2f}")
+    print(f"\nAdvisors busy at a random time: {busy:.1f} on average")
+
+
+if __name__ == "__main__":
+    main()
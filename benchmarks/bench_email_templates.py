@@ -0,0 +1,70 @@
+"""
+Micro-benchmark of the email rendering cost.
+
+Compares the legacy f-string lambdas of api/config/email_messages.py with the precompiled
+Jinja templates of api/utils/email_templates.py, and reports the one-off build cost of the latter.
+
+Run it with:
+    python -m benchmarks.bench_email_templates [--number 20000]
+"""
+import argparse
+import timeit
+
+from api.config import email_messages
+from api.utils.email_templates import EmailTemplates
+
+TOKEN = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJzdWIiOiJqb2huQGVtYWlsLmNvbSJ9.signature"
+JOIN_URL = "https://us05web.zoom.us/j/81234567890?pwd=AbCdEfGhIjKlMnOpQrStUvWxYz"
+FORMATTED_TIME = "2024-07-01 10:30"
+
+CASES = {
+    "confirmation.html": (
+        lambda: email_messages.confirmation_message(TOKEN),
+        {"token": TOKEN},
+    ),
+    "reset_password.html": (
+        lambda: email_messages.reset_message(TOKEN),
+        {"token": TOKEN},
+    ),
+    "user_invitation.html": (
+        lambda: email_messages.user_invitation_message(FORMATTED_TIME, JOIN_URL),
+        {"formatted_time": FORMATTED_TIME, "join_url": JOIN_URL},
+    ),
+    "advisor_invitation.html": (
+        lambda: email_messages.advisor_invitation_message(FORMATTED_TIME, JOIN_URL, "Jane", "Smith", "Consulting"),
+        {"formatted_time": FORMATTED_TIME, "join_url": JOIN_URL, "user_first_name": "Jane", "user_last_name": "Smith", "topic": "Consulting"},
+    ),
+    "user_reschedule.html": (
+        lambda: email_messages.user_reschedule_message(FORMATTED_TIME, JOIN_URL),
+        {"formatted_time": FORMATTED_TIME, "join_url": JOIN_URL},
+    ),
+    "advisor_reschedule.html": (
+        lambda: email_messages.advisor_reschedule_message(FORMATTED_TIME, JOIN_URL, "Consulting", "Jane", "Smith"),
+        {"formatted_time": FORMATTED_TIME, "join_url": JOIN_URL, "user_first_name": "Jane", "user_last_name": "Smith", "topic": "Consulting"},
+    ),
+}
+
+
+def per_call_microseconds(function, number: int) -> float:
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argument_parser.add_argument("--number", type=int, default=20000, help="Renders per timing run")
+    arguments = argument_parser.parse_args()
+
+    templates = EmailTemplates()
+    build_seconds = timeit.timeit(templates.compile, number=1)
+    print(f"Building and compiling {len(templates._templates)} templates: {build_seconds * 1000:.1f} ms (once per process)\n")
+
+    print(f"{'template':<26}{'lambda (us)':>14}{'template (us)':>15}{'lambda size':>14}{'template size':>15}")
+    for name, (legacy, context) in CASES.items():
+        template = templates.get_template(name)
+        legacy_time = per_call_microseconds(legacy, arguments.number)
+        template_time = per_call_microseconds(lambda: template.render(**context), arguments.number)
+        print(f"{name:<26}{legacy_time:>14.2f}{template_time:>15.2f}{len(legacy()):>14}{len(template.render(**context)):>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark of the database round-trips of a registration.
+
+Registers bursts of users through the services the /register endpoint uses, once with the previous flow (a
+lookup per unique column, then insert, commit and refresh of the user, then the token and the email in a
+second transaction) and once with the current one (a single INSERT ... ON CONFLICT DO NOTHING, committed
+with the token and the email). A share of the signups reuse an email already registered, which is where
+the current flow runs its one extra query. Passwords are hashed once up front, so only the database work
+is timed.
+
+Run it with:
+    python -m benchmarks.bench_registration [--database-url postgresql://...] [--signups 500] [--concurrency 10]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, delete, event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from api import models, schemas
+from api.services import user_service as user_service_module
+from api.services.email_service import EmailService
+from api.services.token_service import EmailConfirmationTokenService
+from api.services.user_service import UserService
+
+
+async def legacy_register(db, user: schemas.UserCreate) -> None:
+    user_service = UserService(db)
+    if await user_service.get_user_by_email(user.email) \
+            or (user.phone_number and await user_service.get_user_by_phone_number(user.phone_number)) \
+            or (user.document and await user_service.get_user_by_document(user.document)):
+        raise HTTPException(status_code=400, detail="alredy registered")
+    db_user = models.User(first_name=user.first_name, lastname=user.lastname, email=user.email, phone_number=user.phone_number,
+                          document=user.document, password_hash=await user_service_module.hash_password(user.plain_password))
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    await finish_registration(db, db_user)
+
+
+async def current_register(db, user: schemas.UserCreate) -> None:
+    await finish_registration(db, await UserService(db).create_user(user))
+
+
+async def finish_registration(db, db_user: models.User) -> None:
+    token_service = EmailConfirmationTokenService(db)
+    token, expiry = await token_service.create_token(data={"sub": db_user.email, "aud": "email-confirmation"})
+    EmailService(db).queue_confirmation_account_message(db_user.email, token)
+    await token_service.insert_token(db_user.id, token, expiry)
+
+
+def build_signups(prefix: str, signups: int, duplicates: float) -> list[schemas.UserCreate]:
+    users = []
+    for number in range(signups):
+        # Every n-th signup repeats the email of the previous one
+        repeated = duplicates and number and number % round(1 / duplicates) == 0
+        email_number = number - 1 if repeated else number
+        users.append(schemas.UserCreate(
+            first_name="Bench", lastname="Registration", email=f"{prefix}-{email_number}@example.com",
+            plain_password="benchmarkpassword", phone_number=f"+57315{number:07d}",
+        ))
+    return users
+
+
+def run_burst(engine, Session, register, users: list[schemas.UserCreate], concurrency: int) -> dict:
+    # Statements and COMMITs, the BEGIN is sent along with the first statement
+    round_trips = []
+    record = lambda conn, *args: round_trips.append(args[1] if args else "COMMIT")
+    latencies, rejected = [], 0
+
+    def signup(user: schemas.UserCreate) -> bool:
+        with Session() as db:
+            started = time.perf_counter()
+            try:
+                asyncio.run(register(db, user))
+                return True
+            except (HTTPException, IntegrityError):
+                # Two concurrent signups with the same email can both pass the lookups of the previous flow
+                db.rollback()
+                return False
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+    event.listen(engine, "before_cursor_execute", record)
+    event.listen(engine, "commit", record)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(concurrency) as executor:
+            rejected = sum(not created for created in executor.map(signup, users))
+    finally:
+        elapsed = time.perf_counter() - started
+        event.remove(engine, "before_cursor_execute", record)
+        event.remove(engine, "commit", record)
+
+    return {
+        "round-trips": len(round_trips) / len(users),
+        "signups/s": len(users) / elapsed,
+        "p50 ms": statistics.median(latencies) * 1000,
+        "p95 ms": statistics.quantiles(latencies, n=20)[-1] * 1000,
+        "rejected": rejected,
+    }
+
+
+def cleanup(engine, prefix: str) -> None:
+    users = select(models.User.id).where(models.User.email.like(f"{prefix}-%")).scalar_subquery()
+    with engine.begin() as connection:
+        connection.execute(delete(models.EmailConfirmationToken).where(models.EmailConfirmationToken.user_id.in_(users)))
+        connection.execute(delete(models.EmailOutbox).where(models.EmailOutbox.recipient.like(f"{prefix}-%")))
+        connection.execute(delete(models.User).where(models.User.id.in_(users)))
+
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argument_parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL", os.getenv("SQLALCHEMY_TEST_DATABASE_URL")), help="PostgreSQL database to run against")
+    argument_parser.add_argument("--signups", type=int, default=500, help="Signups per flow")
+    argument_parser.add_argument("--concurrency", type=int, default=10, help="Signups in flight at a time")
+    argument_parser.add_argument("--duplicates", type=float, default=0.1, help="Share of signups with an email already registered")
+    arguments = argument_parser.parse_args()
+    if not arguments.database_url:
+        argument_parser.error("--database-url (or BENCHMARK_DATABASE_URL) is required")
+
+    engine = create_engine(arguments.database_url, pool_size=arguments.concurrency)
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    password_hash = asyncio.run(user_service_module.hash_password("benchmarkpassword"))
+    async def precomputed_hash(password: str) -> str:
+        return password_hash
+    user_service_module.hash_password = precomputed_hash
+
+    flows = {"lookups, then insert (previous)": legacy_register, "single insert (current)": current_register}
+    print(f"{'flow':<34}{'round-trips/signup':>20}{'signups/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'rejected':>10}")
+    for name, register in flows.items():
+        prefix = f"bench-registration-{uuid.uuid4().hex[:8]}"
+        try:
+            result = run_burst(engine, Session, register, build_signups(prefix, arguments.signups, arguments.duplicates), arguments.concurrency)
+        finally:
+            cleanup(engine, prefix)
+        print(f"{name:<34}{result['round-trips']:>20.2f}{result['signups/s']:>11.0f}{result['p50 ms']:>9.2f}{result['p95 ms']:>9.2f}{result['rejected']:>10}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark of the startup time of the API.
+
+Measures, over several fresh processes, how long `import api.main` takes and how long uvicorn takes from
+being launched to answering its first request, with schema creation and seeding on startup (the default)
+and without them (schema managed by Alembic, seeding done with `python -m api.seed`).
+
+The database settings are read from the environment or the .env file; the database must be reachable.
+
+Run it with:
+    python -m benchmarks.bench_startup [--runs 5]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+MODES = {
+    "schema and seeding on startup": {"CREATE_SCHEMA_ON_STARTUP": "true", "SEED_ON_STARTUP": "true"},
+    "schema and seeding left out": {"CREATE_SCHEMA_ON_STARTUP": "false", "SEED_ON_STARTUP": "false"},
+}
+
+IMPORT_SCRIPT = "import time; started = time.perf_counter(); import api.main; print(time.perf_counter() - started)"
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def time_import(env: dict) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], env=env, check=True, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def time_first_request(env: dict, timeout: float = 60.0) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited:\n{server.stderr.read().decode()[-2000:]}")
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/", timeout=1.0).raise_for_status()
+                return time.perf_counter() - started
+            except httpx.TransportError:
+                time.sleep(0.005)
+        raise RuntimeError(f"uvicorn did not answer within {timeout} s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argument_parser.add_argument("--runs", type=int, default=5)
+    arguments = argument_parser.parse_args()
+
+    print(f"{'mode':<34}{'import median':>16}{'first request median':>24}{'first request min':>20}")
+    for mode, settings in MODES.items():
+        env = {**os.environ, **settings}
+        imports = [time_import(env) for _ in range(arguments.runs)]
+        first_requests = [time_first_request(env) for _ in range(arguments.runs)]
+        print(f"{mode:<34}{statistics.median(imports) * 1000:>13.0f} ms{statistics.median(first_requests) * 1000:>21.0f} ms{min(first_requests) * 1000:>17.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""
+End-to-end load test of the API.
+
+Starts the API with uvicorn against local stand-ins (api.stubs.zoom_server for Zoom, optionally fakeredis for
+Redis and api.stubs.smtp_server for SMTP) and a PostgreSQL database, then drives realistic scenarios with
+concurrent clients: a registration burst, a login storm, a wave of meeting schedules and admin list reads.
+Reports requests/sec and p50/p95/p99 latency per scenario and saves them as JSON, so the runs of two commits
+can be compared.
+
+The database has to be PostgreSQL: the advisor rotation relies on SKIP LOCKED and PostgreSQL functions, which
+SQLite does not have. Use a disposable database; the rows created by a run are deleted at the end unless
+--keep-data is given. With DATABASE_MODE=sync the sessions block the event loop, so a concurrency above
+DB_POOL_SIZE + DB_MAX_OVERFLOW stalls every request until DB_POOL_TIMEOUT. The usual API settings (secret keys,
+ADMIN_EMAIL, ADMIN_PASSWORD...) are read from the environment or the .env file.
+
+Run it with:
+    python -m benchmarks.load_test [--database-url postgresql://...] [--users 200] [--concurrency 10] [--fake-redis]
+    python -m benchmarks.load_test --compare benchmarks/results/<previous run>.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import httpx
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, delete, select, update
+
+load_dotenv()
+
+RESULTS_DIRECTORY = Path(__file__).parent / "results"
+PERCENTILES = (50, 95, 99)
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def percentile(sorted_values: list[float], rank: int) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(math.ceil(rank / 100 * len(sorted_values)) - 1, 0)]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class ScenarioResult:
+    """
+    The measurements of one scenario.
+
+    Attributes:
+        name (str): The name of the scenario.
+        endpoint (str): The endpoint it drives, e.g. "POST /login".
+        latencies (list[float]): The latency of every request, in seconds.
+        statuses (Counter): The number of responses by status code ("error" for transport errors).
+        seconds (float): The wall-clock duration of the scenario.
+    """
+
+    def __init__(self, name: str, endpoint: str):
+        self.name = name
+        self.endpoint = endpoint
+        self.latencies: list[float] = []
+        self.statuses: Counter = Counter()
+        self.seconds = 0.0
+
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "endpoint": self.endpoint,
+            "requests": len(latencies),
+            "seconds": round(self.seconds, 3),
+            "requests_per_second": round(len(latencies) / self.seconds, 1) if self.seconds else 0.0,
+            **{f"p{rank}_ms": round(percentile(latencies, rank) * 1000, 2) for rank in PERCENTILES},
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items(), key=str)},
+        }
+
+
+async def run_scenario(name: str, endpoint: str, requests: list[Callable[[], Awaitable[httpx.Response]]], concurrency: int) -> tuple[ScenarioResult, list[Optional[httpx.Response]]]:
+    """
+    Send requests with at most `concurrency` of them in flight and time each of them.
+
+    Args:
+        name (str): The name of the scenario.
+        endpoint (str): The endpoint the requests are sent to.
+        requests (list[Callable[[], Awaitable[httpx.Response]]]): Functions sending one request each.
+        concurrency (int): The maximum number of requests in flight.
+
+    Returns:
+        tuple: The result of the scenario and the responses, in order (None for transport errors).
+    """
+    result = ScenarioResult(name, endpoint)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(send: Callable[[], Awaitable[httpx.Response]]) -> Optional[httpx.Response]:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await send()
+            except httpx.HTTPError:
+                response = None
+            result.latencies.append(time.perf_counter() - started)
+            result.statuses[response.status_code if response is not None else "error"] += 1
+            return response
+
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(timed(send) for send in requests))
+    result.seconds = time.perf_counter() - started
+    return result, responses
+
+
+class ManagedProcess:
+    """
+    A Python module or script run as a subprocess, with its output kept in a log file.
+    """
+
+    def __init__(self, name: str, arguments: list[str], env: dict, log_directory: Path):
+        self.name = name
+        self.log_path = log_directory / f"{name}.log"
+        self._log = open(self.log_path, "w")
+        self.process = subprocess.Popen([sys.executable, *arguments], env=env, stdout=self._log, stderr=subprocess.STDOUT)
+
+
+    def wait_until_ready(self, port: int, timeout: float = 30.0) -> None:
+        # uvicorn only listens once the startup of the app is done, so an open port means ready
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.process.poll() is None:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1.0).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError(f"{self.name} did not start, see {self.log_path}:\n{self.log_path.read_text()[-2000:]}")
+
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self._log.close()
+
+
+FAKE_REDIS_SCRIPT = "import sys; from fakeredis import TcpFakeServer; TcpFakeServer(('127.0.0.1', int(sys.argv[1])), server_type='redis').serve_forever()"
+
+
+class LoadTest:
+    """
+    Seeds the database, drives the scenarios against a running API and cleans up afterwards.
+
+    Every user and advisor created by a run has the run ID in its email address, so runs do not collide and
+    their rows can be deleted.
+    """
+
+    def __init__(self, arguments: argparse.Namespace, base_url: str):
+        self.arguments = arguments
+        self.base_url = base_url
+        self.run_id = uuid.uuid4().hex[:8]
+        self.engine = create_engine(arguments.database_url)
+        self.results: list[ScenarioResult] = []
+
+
+    def user_email(self, number: int) -> str:
+        return f"bench-{self.run_id}-{number}@example.com"
+
+
+    def seed_advisors(self) -> None:
+        from api.models import Advisor, Base
+        Base.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            connection.execute(Advisor.__table__.insert(), [
+                {"name": f"Bench Advisor {number}", "email": f"bench-advisor-{self.run_id}-{number}@example.com"}
+                for number in range(self.arguments.advisors)
+            ])
+
+
+    def activate_users(self) -> None:
+        from api.models import User
+        with self.engine.begin() as connection:
+            connection.execute(update(User).where(User.email.like(f"bench-{self.run_id}-%")).values(is_active=True))
+
+
+    def cleanup(self) -> None:
+        from api.models import Advisor, EmailConfirmationToken, EmailOutbox, Meeting, PasswordResetToken, User
+        users = select(User.id).where(User.email.like(f"bench-{self.run_id}-%")).scalar_subquery()
+        advisors = select(Advisor.id).where(Advisor.email.like(f"bench-advisor-{self.run_id}-%")).scalar_subquery()
+        with self.engine.begin() as connection:
+            connection.execute(delete(Meeting).where(Meeting.user_id.in_(users) | Meeting.advisor_id.in_(advisors)))
+            connection.execute(delete(EmailConfirmationToken).where(EmailConfirmationToken.user_id.in_(users)))
+            connection.execute(delete(PasswordResetToken).where(PasswordResetToken.user_id.in_(users)))
+            connection.execute(delete(EmailOutbox).where(EmailOutbox.recipient.like(f"bench-%{self.run_id}-%")))
+            connection.execute(delete(User).where(User.id.in_(users)))
+            connection.execute(delete(Advisor).where(Advisor.id.in_(advisors)))
+        self.engine.dispose()
+
+
+    async def run(self) -> None:
+        arguments = self.arguments
+        limits = httpx.Limits(max_connections=arguments.concurrency, max_keepalive_connections=arguments.concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=60) as client:
+            users = range(arguments.users)
+
+            result, _ = await run_scenario("registration_burst", "POST /register", [
+                lambda number=number: client.post("/register", json={
+                    "first_name": "Bench", "lastname": f"User {number}",
+                    "email": self.user_email(number), "plain_password": "bench-password"
+                })
+                for number in users
+            ], arguments.concurrency)
+            self.results.append(result)
+            self.activate_users()
+
+            # Cookies are sent explicitly, so the client must not keep the ones set by the login responses
+            result, responses = await run_scenario("login_storm", "POST /login", [
+                lambda number=number: client.post("/login", data={"username": self.user_email(number), "password": "bench-password"})
+                for number in users
+            ], arguments.concurrency)
+            self.results.append(result)
+            tokens = [response.cookies.get("access_token") if response is not None else None for response in responses]
+            client.cookies.clear()
+
+            # Enough slots for every user: each slot is taken by up to one meeting per advisor
+            first_slot = (datetime.now(timezone.utc) + timedelta(days=random.randrange(60, 360))).replace(minute=0, second=0, microsecond=0, tzinfo=None)
+            advisors = max(arguments.advisors, 1)
+            result, _ = await run_scenario("schedule_meeting_wave", "POST /schedule-meeting/", [
+                lambda number=number, token=token: client.post(
+                    "/schedule-meeting/",
+                    json={"start_time": (first_slot + number // advisors * timedelta(minutes=30)).isoformat(), "topic": "Load test meeting"},
+                    headers={"Cookie": f"access_token={token}"}
+                )
+                for number, token in zip(users, tokens) if token
+            ], arguments.concurrency)
+            self.results.append(result)
+
+            try:
+                login = await client.post("/login", data={"username": os.environ["ADMIN_EMAIL"], "password": os.environ["ADMIN_PASSWORD"]})
+            except httpx.HTTPError as error:
+                print(f"Skipping the admin reads: the admin could not log in ({error!r})")
+                return
+            admin_token = login.cookies.get("access_token")
+            client.cookies.clear()
+            if admin_token is None:
+                print(f"Skipping the admin reads: the admin could not log in ({login.status_code})")
+                return
+            result, _ = await run_scenario("admin_list_reads", "GET /admin/read-users", [
+                lambda: client.get("/admin/read-users", params={"view": "summary", "limit": 50}, headers={"Cookie": f"access_token={admin_token}"})
+                for _ in range(arguments.admin_reads)
+            ], arguments.concurrency)
+            self.results.append(result)
+
+
+def print_results(results: dict) -> None:
+    print(f"\n{'scenario':<24}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+    for name, summary in results.items():
+        print(f"{name:<24}{summary['requests']:>10}{summary['requests_per_second']:>10}{summary['p50_ms']:>10}{summary['p95_ms']:>10}{summary['p99_ms']:>10}  {summary['statuses']}")
+
+
+def print_comparison(current: dict, previous_path: Path) -> None:
+    previous = json.loads(previous_path.read_text())
+    print(f"\nCompared with {previous_path.name} (commit {previous.get('commit')}):")
+    print(f"{'scenario':<24}{'req/s':>16}{'p95 ms':>16}{'p99 ms':>16}")
+    for name, summary in current["results"].items():
+        before = previous["results"].get(name)
+        if before is None:
+            continue
+        changes = []
+        for key in ("requests_per_second", "p95_ms", "p99_ms"):
+            change = (summary[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            changes.append(f"{change:+.1f}%")
+        print(f"{name:<24}{changes[0]:>16}{changes[1]:>16}{changes[2]:>16}")
+
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argument_parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL", os.getenv("SQLALCHEMY_TEST_DATABASE_URL")), help="PostgreSQL database to run against")
+    argument_parser.add_argument("--users", type=int, default=200, help="Users registered, logged in and scheduling a meeting")
+    argument_parser.add_argument("--advisors", type=int, default=10, help="Advisors created for the run")
+    argument_parser.add_argument("--admin-reads", type=int, default=200, help="Admin list reads")
+    argument_parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight at a time")
+    argument_parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    argument_parser.add_argument("--database-mode", choices=("sync", "async"), default=os.getenv("DATABASE_MODE", "sync"))
+    argument_parser.add_argument("--zoom-latency", type=float, default=0.05, help="Seconds the fake Zoom takes to answer")
+    argument_parser.add_argument("--fake-redis", action="store_true", help="Serve Redis from fakeredis instead of REDIS_HOST")
+    argument_parser.add_argument("--deliver-emails", action="store_true", help="Deliver the outbox in process to a local SMTP server")
+    argument_parser.add_argument("--keep-data", action="store_true", help="Keep the users, advisors and meetings of the run")
+    argument_parser.add_argument("--output", type=Path, help="JSON file for the results. Defaults to benchmarks/results/<time>-<commit>.json")
+    argument_parser.add_argument("--compare", type=Path, help="Results of a previous run to compare with")
+    arguments = argument_parser.parse_args()
+    if not arguments.database_url:
+        argument_parser.error("--database-url (or BENCHMARK_DATABASE_URL) is required")
+
+    # The API modules read their settings when imported, so the environment is set up first
+    app_port, zoom_port = free_port(), free_port()
+    env = dict(os.environ)
+    env.update({
+        "SQLALCHEMY_DATABASE_URL": arguments.database_url,
+        "DATABASE_MODE": arguments.database_mode,
+        "ZOOM_API_BASE_URL": f"http://127.0.0.1:{zoom_port}/v2",
+        "ZOOM_OAUTH_TOKEN_URL": f"http://127.0.0.1:{zoom_port}/oauth/token",
+        "ZOOM_CLIENT_ID": env.get("ZOOM_CLIENT_ID", "load-test"),
+        "ZOOM_CLIENT_SECRET": env.get("ZOOM_CLIENT_SECRET", "load-test"),
+        "ZOOM_ACCOUNT_ID": env.get("ZOOM_ACCOUNT_ID", "load-test"),
+        "EMAIL_OUTBOX_IN_PROCESS": "true" if arguments.deliver_emails else "false",
+    })
+    os.environ.update(env)
+
+    log_directory = Path(tempfile.mkdtemp(prefix="load-test-"))
+    processes: list[ManagedProcess] = []
+    load_test = None
+    try:
+        if arguments.fake_redis:
+            try:
+                import fakeredis  # noqa: F401
+            except ImportError:
+                argument_parser.error("--fake-redis requires the 'fakeredis' package")
+            redis_port = free_port()
+            redis = ManagedProcess("redis", ["-c", FAKE_REDIS_SCRIPT, str(redis_port)], env, log_directory)
+            processes.append(redis)
+            redis.wait_until_ready(redis_port)
+            # fakeredis closes the connection after a NOSCRIPT error, so the rate limiter scripts are loaded up front
+            from redis import Redis
+            from api.utils.rate_limiting import RATE_LIMIT_SCRIPTS
+            with Redis(host="127.0.0.1", port=redis_port) as redis_client:
+                for script in RATE_LIMIT_SCRIPTS.values():
+                    redis_client.script_load(script)
+            env.update({"REDIS_HOST": "127.0.0.1", "REDIS_PORT": str(redis_port)})
+        if arguments.deliver_emails:
+            smtp_port = free_port()
+            smtp = ManagedProcess("smtp", ["-m", "api.stubs.smtp_server", "--port", str(smtp_port)], env, log_directory)
+            processes.append(smtp)
+            smtp.wait_until_ready(smtp_port)
+            env.update({"MAIL_SERVER": "127.0.0.1", "MAIL_PORT": str(smtp_port), "MAIL_STARTTLS": "false", "MAIL_SSL_TLS": "false"})
+
+        zoom = ManagedProcess("zoom", ["-m", "api.stubs.zoom_server", "--port", str(zoom_port), "--latency", str(arguments.zoom_latency)], env, log_directory)
+        processes.append(zoom)
+        zoom.wait_until_ready(zoom_port)
+
+        load_test = LoadTest(arguments, f"http://127.0.0.1:{app_port}")
+        # The advisors must exist before the API builds its schedule on startup
+        load_test.seed_advisors()
+
+        api = ManagedProcess("api", ["-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(app_port), "--workers", str(arguments.workers), "--log-level", "warning"], env, log_directory)
+        processes.append(api)
+        api.wait_until_ready(app_port)
+
+        print(f"Load test {load_test.run_id}: {arguments.users} users, {arguments.advisors} advisors, concurrency {arguments.concurrency}, {arguments.workers} worker(s), {arguments.database_mode} sessions")
+        asyncio.run(load_test.run())
+    finally:
+        for process in reversed(processes):
+            process.stop()
+        if load_test is not None and not arguments.keep_data:
+            load_test.cleanup()
+
+    report = {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "settings": {key: str(value) for key, value in vars(arguments).items() if key not in ("database_url", "output", "compare")},
+        "results": {result.name: result.summary() for result in load_test.results},
+    }
+    print_results(report["results"])
+
+    output = arguments.output or RESULTS_DIRECTORY / f"{datetime.now():%Y%m%d-%H%M%S}-{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults saved to {output}")
+    if arguments.compare:
+        print_comparison(report, arguments.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,14 @@ load_dotenv()
 os.environ["LOGIN_RATE_LIMIT_PERIOD"] = "1"
 os.environ["PASSWORD_RATE_LIMIT_PERIOD"] = "2"
 os.environ["CONFIRMATION_ACCOUNT_TOKEN_EXPIRE_MINUTES"] = "0.1"
+# Fixtures change users straight in the database, bypassing the identity cache invalidation
+os.environ["IDENTITY_CACHE_TTL"] = "0"
+# Signs the recorded Zoom webhook payloads
+os.environ["ZOOM_WEBHOOK_SECRET_TOKEN"] = "test-zoom-webhook-secret"
+# Zoom calls go to the local stand-in started by the zoom_server fixture
+TEST_ZOOM_PORT = int(os.getenv("TEST_ZOOM_PORT", "8091"))
+os.environ["ZOOM_API_BASE_URL"] = f"http://127.0.0.1:{TEST_ZOOM_PORT}/v2"
+os.environ["ZOOM_OAUTH_TOKEN_URL"] = f"http://127.0.0.1:{TEST_ZOOM_PORT}/oauth/token"
 
 
 import pytest 
@@ -21,6 +29,8 @@ from api.services.token_service import EmailConfirmationTokenService
 from api.models import Advisor, User
 from api.config.constants import ACCESS_TOKEN_SECRET_KEY, ALGORITHM, EMAIL_CONFIRMATION_SECRET_KEY
 from api.models import crypt
+from api.stubs.smtp_server import LocalSMTPServer
+from api.stubs.zoom_server import FakeZoomServer
 from .func.test_meeting_scheduling import get_datetimes
 
 SQLALCHEMY_DATABASE_URL = os.getenv("SQLALCHEMY_TEST_DATABASE_URL")
@@ -37,14 +47,15 @@ def db_session():
 
     This fixture creates a connection to the test database and a session bound to it.
     A transaction is started at the beginning and rolled back at the end to ensure
-    that each test runs in isolation without affecting the database state.
+    that each test runs in isolation without affecting the database state. The session
+    works in savepoints, so the code under test can commit and roll back its own work.
 
     Yields:
         session: The SQLAlchemy session object.
     """
     connection = engine_test.connect()
     transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
+    session = TestingSessionLocal(bind=connection, join_transaction_mode="create_savepoint")
 
     yield session
 
@@ -79,6 +90,32 @@ def client(db_session):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope="module")
+def smtp_server():
+    """
+    Fixture to run a local SMTP server that keeps the received messages in memory.
+
+    Yields:
+        LocalSMTPServer: The running server.
+    """
+    with LocalSMTPServer(port=int(os.getenv("TEST_SMTP_PORT", "8025"))) as server:
+        yield server
+
+
+@pytest.fixture(scope="session", autouse=True)
+def zoom_server():
+    """
+    Fixture to serve the Zoom API from a local stand-in for the whole test session.
+
+    Tests can change its latency, error rate or rate limit through `zoom_server.zoom`, and must restore them.
+
+    Yields:
+        FakeZoomServer: The running server.
+    """
+    with FakeZoomServer(port=TEST_ZOOM_PORT) as server:
+        yield server
+
+
 @pytest.fixture(scope="module")
 def register_users_for_login(client):
     """
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import pytest
+import pytest_asyncio
+from collections import Counter
+from sqlalchemy import delete, make_url, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from api.models import Advisor
+from api.utils.meeting_utils import get_next_advisor
+
+ADVISORS = 5
+SCHEDULES = 300
+
+
+@pytest_asyncio.fixture
+async def rotation_engine():
+    """
+    Fixture to create committed advisors that concurrent sessions can claim, and remove them afterwards.
+
+    Unlike the other fixtures this one commits, because the rotation is only contended across separate
+    connections and transactions.
+
+    Yields:
+        tuple[AsyncEngine, list[int]]: The engine and the IDs of the advisors of the rotation.
+    """
+    url = make_url(os.getenv("SQLALCHEMY_TEST_DATABASE_URL")).set(drivername="postgresql+asyncpg")
+    engine = create_async_engine(url, pool_size=20, max_overflow=0)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        existing = (await session.execute(select(Advisor.id))).scalars().all()
+        assert not existing, "The rotation test expects no committed advisors in the test database"
+        advisors = [Advisor(name=f"Rotation Advisor {number}", email=f"rotation.advisor{number}@example.com") for number in range(ADVISORS)]
+        session.add_all(advisors)
+        await session.commit()
+        advisor_ids = [advisor.id for advisor in advisors]
+
+    yield engine, advisor_ids
+
+    async with AsyncSession(engine) as session:
+        await session.execute(delete(Advisor).where(Advisor.id.in_(advisor_ids)))
+        await session.commit()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_claims_rotate_advisors_evenly(rotation_engine):
+    """
+    Given hundreds of schedules claiming an advisor at the same time, every claim gets an advisor and
+    the assignments are spread evenly across the advisors.
+    """
+    engine, advisor_ids = rotation_engine
+
+    async def schedule() -> int:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            advisor = await get_next_advisor(session)
+            return advisor.id
+
+    assigned = Counter(await asyncio.gather(*(schedule() for _ in range(SCHEDULES))))
+
+    assert sum(assigned.values()) == SCHEDULES
+    assert set(assigned) == set(advisor_ids)
+    expected = SCHEDULES / ADVISORS
+    assert all(abs(count - expected) <= expected * 0.1 for count in assigned.values()), assigned
+
+
+@pytest.mark.asyncio
+async def test_claims_follow_round_robin_order(rotation_engine):
+    """
+    Given sequential claims, the advisors are returned in round-robin order.
+    """
+    engine, advisor_ids = rotation_engine
+
+    claimed = []
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        for _ in range(ADVISORS * 2):
+            claimed.append((await get_next_advisor(session)).id)
+
+    assert sorted(claimed[:ADVISORS]) == sorted(advisor_ids)
+    assert claimed[ADVISORS:] == claimed[:ADVISORS]
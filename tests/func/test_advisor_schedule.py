@@ -0,0 +1,179 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from api.models import Advisor, Meeting
+from api.utils import advisor_schedule as advisor_schedule_module
+from api.services.database_service import DatabaseService
+from api.utils.advisor_schedule import AdvisorSchedule, to_utc
+from api.utils.meeting_utils import assign_advisor, get_next_advisor
+
+START = datetime(2030, 1, 7, 15, 0)
+
+
+@pytest.fixture
+def schedule():
+    """
+    Fixture to give each test an empty process-wide advisor schedule.
+    """
+    schedule = AdvisorSchedule(duration=timedelta(minutes=30))
+    advisor_schedule_module._advisor_schedule = schedule
+    yield schedule
+    advisor_schedule_module._advisor_schedule = None
+
+
+def test_busy_advisors_overlap_the_meeting(schedule):
+    """
+    Given a booking at 15:00, its advisor is busy for meetings starting less than 30 minutes before or after it.
+    """
+    schedule.load([1, 2], [(10, 1, START)])
+
+    assert schedule.busy_advisors(START) == {1}
+    assert schedule.busy_advisors(START + timedelta(minutes=29)) == {1}
+    assert schedule.busy_advisors(START - timedelta(minutes=29)) == {1}
+    assert schedule.busy_advisors(START + timedelta(minutes=30)) == set()
+    assert schedule.busy_advisors(START - timedelta(minutes=30)) == set()
+    assert schedule.free_advisors(START, limit=5) == [2]
+    assert schedule.is_free(1, START + timedelta(minutes=30))
+
+
+def test_free_advisors_are_least_loaded_first(schedule):
+    """
+    Given advisors with 2, 0 and 1 bookings, the least-loaded free advisor is offered first, and the next
+    least-loaded one when it is busy.
+    """
+    later = START + timedelta(days=1)
+    schedule.load([1, 2, 3], [(10, 1, later), (11, 1, later + timedelta(hours=1)), (12, 3, later)])
+
+    assert schedule.free_advisors(START, limit=5) == [2]
+    assert schedule.book(13, 2, START)
+    assert schedule.load_of(2) == 1
+    assert sorted(schedule.free_advisors(START + timedelta(hours=3), limit=5)) == [2, 3]
+    assert schedule.free_advisors(START, limit=5) == [3]
+    assert schedule.free_advisors(START, limit=5, exclude=[3]) == [1]
+
+
+def test_bookings_move_and_cancel(schedule):
+    """
+    Given a booked meeting, booking its key again moves it, overlapping bookings are refused unless forced,
+    and cancelling it frees the advisor.
+    """
+    schedule.load([1], [])
+
+    assert schedule.book(10, 1, START)
+    assert not schedule.book(11, 1, START + timedelta(minutes=15))
+    assert schedule.book(10, 1, START + timedelta(minutes=15))
+    assert schedule.busy_advisors(START + timedelta(minutes=40)) == {1}
+    assert schedule.load_of(1) == 1
+
+    schedule.rekey(10, 20)
+    schedule.cancel(10)
+    assert schedule.load_of(1) == 1
+    assert schedule.book(11, 1, START + timedelta(minutes=30), force=True)
+    assert schedule.load_of(1) == 2
+
+    schedule.cancel(20)
+    schedule.cancel(11)
+    assert schedule.load_of(1) == 0
+    assert schedule.busy_advisors(START + timedelta(minutes=15)) == set()
+
+
+def test_ended_bookings_expire(schedule):
+    """
+    Given a meeting that has ended and one still ahead, expiring the ended ones frees their slot and leaves
+    only the meeting ahead in the advisor's load.
+    """
+    schedule.load([1], [(10, 1, START - timedelta(hours=2)), (11, 1, START + timedelta(hours=1))])
+
+    schedule.expire(START - schedule.duration)
+
+    assert schedule.load_of(1) == 1
+    assert schedule.is_free(1, START - timedelta(hours=2))
+    assert schedule.busy_advisors(START + timedelta(hours=1)) == {1}
+    schedule.cancel(11)
+    assert schedule.load_of(1) == 0
+
+
+def test_to_utc():
+    """
+    Given naive start times, they are read in the meetings timezone (America/Bogota by default).
+    """
+    assert to_utc(datetime(2030, 1, 7, 10, 0)) == datetime(2030, 1, 7, 15, 0)
+    assert to_utc(datetime(2030, 1, 7, 10, 0, tzinfo=timezone.utc)) == datetime(2030, 1, 7, 10, 0)
+
+
+@pytest.mark.asyncio
+async def test_get_next_advisor_only_claims_free_advisors(schedule, db_session):
+    """
+    Given two advisors, claiming an advisor for the same slot three times gives each advisor once and then
+    none, while a slot that is free for both still gets an advisor.
+    """
+    advisors = [Advisor(name=f"Schedule Advisor {number}", email=f"schedule.advisor{number}@example.com") for number in range(2)]
+    db_session.add_all(advisors)
+    db_session.commit()
+    start = START.replace(tzinfo=timezone.utc)
+
+    async with assign_advisor(db_session, start) as first:
+        second = await get_next_advisor(db_session, start)
+        third = await get_next_advisor(db_session, start + timedelta(minutes=10))
+
+    assert {first.id, second.id} == {advisor.id for advisor in advisors}
+    assert third is None
+    assert schedule.busy_advisors(START) == {second.id}
+    assert (await get_next_advisor(db_session, start + timedelta(hours=1))) is not None
+
+
+@pytest.mark.asyncio
+async def test_get_next_advisor_checks_the_database(schedule, db_session):
+    """
+    Given a slot booked for every advisor by another process after the schedule was built, no advisor is
+    claimed for it, and the schedule learns of the bookings.
+    """
+    schedule.load([advisor.id for advisor in db_session.query(Advisor)], [])
+    start = datetime(2030, 2, 4, 15, 0)
+    for advisor in db_session.query(Advisor):
+        db_session.add(Meeting(start_time=start, topic="Booked elsewhere", zoom_meeting_id=f"elsewhere-{advisor.id}",
+                               join_url=f"https://zoom.us/j/elsewhere-{advisor.id}", advisor_id=advisor.id))
+    db_session.commit()
+
+    assert await get_next_advisor(db_session, start.replace(tzinfo=timezone.utc)) is None
+    assert schedule.free_advisors(start, limit=5) == []
+
+
+@pytest.mark.asyncio
+async def test_rebuild_leaves_out_ended_meetings(schedule, db_session):
+    """
+    Given an advisor with a meeting long over and one ahead, the rebuilt schedule only counts the one ahead.
+    """
+    advisor = Advisor(name="Past Advisor", email="past.advisor@example.com")
+    db_session.add(advisor)
+    db_session.flush()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for number, start in enumerate([now - timedelta(days=30), now + timedelta(days=30)]):
+        db_session.add(Meeting(start_time=start, topic="Past and ahead", zoom_meeting_id=f"past-{number}",
+                               join_url=f"https://zoom.us/j/past-{number}", advisor_id=advisor.id))
+    db_session.commit()
+
+    await schedule.rebuild(DatabaseService(db_session))
+
+    assert schedule.load_of(advisor.id) == 1
+    assert schedule.is_free(advisor.id, now - timedelta(days=30))
+
+
+@pytest.mark.asyncio
+async def test_rejected_advisors_are_given_back(schedule, db_session):
+    """
+    Given a slot booked for every advisor by another process, a claim that is not committed rejects them all
+    without moving any of them to the back of the rotation.
+    """
+    schedule.load([advisor.id for advisor in db_session.query(Advisor)], [])
+    start = datetime(2030, 3, 4, 15, 0)
+    for advisor in db_session.query(Advisor):
+        db_session.add(Meeting(start_time=start, topic="Booked elsewhere", zoom_meeting_id=f"elsewhere-rotation-{advisor.id}",
+                               join_url=f"https://zoom.us/j/elsewhere-rotation-{advisor.id}", advisor_id=advisor.id))
+    db_session.commit()
+    rotation = {advisor.id: advisor.last_assigned_time for advisor in db_session.query(Advisor)}
+
+    assert await get_next_advisor(db_session, start.replace(tzinfo=timezone.utc), commit=False) is None
+
+    db_session.expire_all()
+    assert {advisor.id: advisor.last_assigned_time for advisor in db_session.query(Advisor)} == rotation
+    db_session.rollback()
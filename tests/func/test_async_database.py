@@ -0,0 +1,86 @@
+import os
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from api import models, schemas
+from api.services.user_service import AdminService, UserService
+from api.services.token_service import EmailConfirmationTokenService
+
+
+@pytest_asyncio.fixture
+async def async_db_session():
+    """
+    Fixture to set up an AsyncSession (asyncpg) on the test database.
+
+    Like db_session, everything runs inside a transaction that is rolled back at the end; the commits
+    of the services only release savepoints.
+
+    Yields:
+        AsyncSession: The async session.
+    """
+    url = make_url(os.getenv("SQLALCHEMY_TEST_DATABASE_URL")).set(drivername="postgresql+asyncpg")
+    engine = create_async_engine(url)
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(bind=connection, expire_on_commit=False, join_transaction_mode="create_savepoint")
+
+        yield session
+
+        await session.close()
+        await transaction.rollback()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_user_service_with_async_session(async_db_session):
+    """
+    Given an AsyncSession, the user service creates and reads users the same way it does with a Session.
+    """
+    user_service = UserService(async_db_session)
+    assert user_service.is_async
+
+    created = await user_service.create_user(schemas.UserCreate(
+        first_name="Async",
+        lastname="User",
+        email="async.user@example.com",
+        plain_password="Password123!",
+        phone_number="+573102349999",
+        document="4455667788"
+    ))
+
+    assert (await user_service.get_user_by_email("async.user@example.com")).id == created.id
+    assert (await user_service.get_user_by_phone_number(created.phone_number)).id == created.id
+    assert (await user_service.get_user_by_document("4455667788")).id == created.id
+
+    updated = await user_service.update_user(created.id, schemas.UserUpdate(is_active=True))
+    assert updated.is_active
+
+
+@pytest.mark.asyncio
+async def test_aware_datetimes_with_async_session(async_db_session):
+    """
+    Given aware datetimes and ISO strings, the columns without time zone store them as naive UTC
+    (asyncpg would otherwise reject them).
+    """
+    user = await UserService(async_db_session).create_user(schemas.UserCreate(
+        first_name="Async",
+        lastname="Tokens",
+        email="async.tokens@example.com",
+        plain_password="Password123!"
+    ))
+
+    expiry = datetime.now(timezone(timedelta(hours=-5))) + timedelta(minutes=10)
+    token = await EmailConfirmationTokenService(async_db_session).insert_token(user.id, "async-token", expiry)
+    await async_db_session.refresh(token)
+    assert token.expiry == expiry.astimezone(timezone.utc).replace(tzinfo=None)
+
+    advisor = models.Advisor(name="Async Advisor", email="async.advisor@example.com", last_assigned_time="2024-06-01T10:00:00+02:00")
+    async_db_session.add(advisor)
+    await async_db_session.commit()
+    await async_db_session.refresh(advisor)
+    assert advisor.last_assigned_time == datetime(2024, 6, 1, 8, 0)
+
+    page = await AdminService(async_db_session).get_users_page(None, 500, schemas.UserView.FULL)
+    assert any(db_user.id == user.id and len(db_user.email_confirmation_tokens) == 1 for db_user in page)
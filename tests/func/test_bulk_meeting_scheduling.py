@@ -0,0 +1,192 @@
+import asyncio
+import httpx
+import json
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import count
+from sqlalchemy import event
+from api import schemas
+from api.models import Advisor, EmailOutbox, Meeting, User
+from api.services import meeting_service as meeting_service_module
+from api.services.meeting_service import MeetingService
+from api.utils import advisor_schedule as advisor_schedule_module
+from api.utils.advisor_schedule import AdvisorSchedule, get_advisor_schedule
+
+START = datetime(2031, 3, 3, 9, 0)
+# Zoom meeting IDs are unique in the meetings table, so they are not reused across tests
+ZOOM_MEETING_IDS = count(9100000000)
+
+
+class FakeZoom:
+    """
+    Answers the Zoom requests of the meeting service and records how many meeting creations are in flight.
+    Meetings whose topic is "Zoom fails" are refused, and the IDs of the deleted meetings are recorded.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.deleted = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/oauth/token":
+            return httpx.Response(200, json={"access_token": "fake-token", "expires_in": 3600})
+        if request.method == "DELETE":
+            self.deleted.append(request.url.path.rsplit("/", 1)[-1])
+            return httpx.Response(204)
+
+        meeting = json.loads(request.content)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+
+        if meeting["topic"] == "Zoom fails":
+            return httpx.Response(500, json={"message": "Internal error"})
+        meeting_id = next(ZOOM_MEETING_IDS)
+        return httpx.Response(201, json={
+            "id": meeting_id,
+            "topic": meeting["topic"],
+            "start_time": meeting["start_time"],
+            "join_url": f"https://zoom.us/j/{meeting_id}"
+        })
+
+
+@pytest.fixture
+def fake_zoom(monkeypatch):
+    """
+    Fixture to send the Zoom requests of the meeting service to a FakeZoom, with an empty advisor schedule.
+    """
+    zoom = FakeZoom()
+    monkeypatch.setattr(meeting_service_module, "get_zoom_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(zoom)))
+    advisor_schedule_module._advisor_schedule = AdvisorSchedule(duration=timedelta(minutes=30))
+    yield zoom
+    advisor_schedule_module._advisor_schedule = None
+
+
+@contextmanager
+def record_statements(db_session, prefix: str):
+    statements = []
+    engine = db_session.get_bind().engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith(prefix):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.mark.asyncio
+async def test_create_meetings_is_bounded_and_batched(fake_zoom, register_users_for_login, insert_advisors_for_meeting_scheduling, db_session):
+    """
+    Given ten reserved meetings and a concurrency of 3, at most 3 Zoom meetings are created at a time, the
+    meetings are saved with a single UPDATE, and the one Zoom refuses is reported in its place.
+    """
+    user = db_session.query(User).filter(User.email == "johndoe@email.com").first()
+    advisor = db_session.query(Advisor).first()
+    reserved = [
+        Meeting(user_id=user.id, advisor_id=advisor.id, start_time=START + timedelta(hours=hour), topic="Zoom fails" if hour == 4 else f"Bulk topic {hour}")
+        for hour in range(10)
+    ]
+    db_session.add_all(reserved)
+    db_session.flush()
+    reservations = [(meeting.id, meeting.start_time, meeting.topic) for meeting in reserved]
+
+    with record_statements(db_session, "UPDATE meetings") as statements:
+        results = await MeetingService(db_session).create_meetings(reservations, concurrency=3)
+
+    assert fake_zoom.max_in_flight == 3
+    assert len(statements) == 1
+    assert [new_meeting is None for new_meeting, _, _ in results] == [hour == 4 for hour in range(10)]
+    assert results[4][2] == "Zoom could not create the meeting"
+    assert [new_meeting.topic for new_meeting, _, _ in results if new_meeting] == [f"Bulk topic {hour}" for hour in range(10) if hour != 4]
+    assert all(new_meeting.zoom_meeting_id == str(meeting_info["id"]) for new_meeting, meeting_info, _ in results if new_meeting)
+    db_session.rollback()
+
+
+def test_schedule_meetings_in_bulk(fake_zoom, register_users_for_login, insert_advisors_for_meeting_scheduling, create_admin_access_token, db_session):
+    """
+    Given a list with two schedulable meetings, one for an unknown user, a second one for the same user and one
+    Zoom refuses, the endpoint reports every item in order, reserves the meetings with a single INSERT, saves
+    the two meetings with their invitations and updates only their users.
+    """
+    client = register_users_for_login
+    client.cookies.set("access_token", create_admin_access_token)
+    emails = ["janesmith@email.com", "robertjohnson@email.com"]
+    users = db_session.query(User).filter(User.email.in_(emails)).order_by(User.id).all()
+    refused_id = db_session.query(User.id).filter(User.email == "johndoe@email.com").scalar()
+    queued_before = db_session.query(EmailOutbox).count()
+    start = START + timedelta(days=7)
+    payload = [
+        {"user_id": users[0].id, "start_time": start.isoformat(), "topic": "Bulk import A"},
+        {"user_id": 999999, "start_time": start.isoformat(), "topic": "Bulk import B"},
+        {"user_id": users[1].id, "start_time": start.isoformat(), "topic": "Bulk import C"},
+        {"user_id": users[1].id, "start_time": (start + timedelta(hours=2)).isoformat(), "topic": "Bulk import D"},
+        {"user_id": refused_id, "start_time": (start + timedelta(hours=1)).isoformat(), "topic": "Zoom fails"},
+    ]
+
+    with record_statements(db_session, "INSERT INTO meetings") as statements:
+        response = client.post("/admin/schedule-meetings", json=payload)
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["status"] for result in results] == ["created", "failed", "created", "failed", "failed"]
+    assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+    assert results[1]["error"] == "User not found"
+    assert results[3]["error"] == "It has not been 7 days since the user last scheduled a meeting"
+    assert results[4]["error"] == "Zoom could not create the meeting"
+    # Both meetings start at the same time, so they were given different advisors
+    assert results[0]["meeting"]["advisor_id"] != results[2]["meeting"]["advisor_id"]
+    assert len(statements) == 1
+
+    saved = db_session.query(Meeting).filter(Meeting.topic.in_(["Bulk import A", "Bulk import C"])).all()
+    assert len(saved) == 2
+    assert db_session.query(EmailOutbox).count() - queued_before == 4
+    assert all(user.last_meeting_scheduled is not None for user in db_session.query(User).filter(User.email.in_(emails)))
+    assert db_session.get(User, refused_id).last_meeting_scheduled is None
+
+    # The users who got a meeting are now held to the 7-day rule
+    response = client.post("/admin/schedule-meetings", json=payload[:1])
+    assert response.json()[0]["error"] == "It has not been 7 days since the user last scheduled a meeting"
+
+
+@pytest.mark.asyncio
+async def test_schedule_meetings_rolls_back_when_the_commit_fails(fake_zoom, register_users_for_login, insert_advisors_for_meeting_scheduling, db_session, monkeypatch):
+    """
+    Given a bulk scheduling whose commit fails once the Zoom meetings are created, the reservations are
+    cancelled, the Zoom meetings are deleted again and the advisors' slots are released.
+    """
+    user = db_session.query(User).filter(User.email == "johndoe@email.com").one()
+    start = START + timedelta(days=14)
+    meeting_service = MeetingService(db_session)
+    commit, commits = meeting_service.commit, count(1)
+
+    async def fail_second_commit():
+        if next(commits) == 2:
+            raise RuntimeError("commit failed")
+        await commit()
+    monkeypatch.setattr(meeting_service, "commit", fail_second_commit)
+
+    with pytest.raises(RuntimeError):
+        await meeting_service.schedule_meetings([schemas.BulkMeetingCreate(user_id=user.id, start_time=start, topic="Rolled back")])
+
+    assert db_session.query(Meeting).filter(Meeting.topic == "Rolled back").count() == 0
+    assert db_session.get(User, user.id).last_meeting_scheduled is None
+    assert len(fake_zoom.deleted) == 1
+    assert all(get_advisor_schedule().is_free(advisor.id, start) for advisor in db_session.query(Advisor))
+
+
+def test_schedule_meetings_in_bulk_rejects_empty_list(register_users_for_login, create_admin_access_token):
+    client = register_users_for_login
+    client.cookies.set("access_token", create_admin_access_token)
+
+    response = client.post("/admin/schedule-meetings", json=[])
+
+    assert response.status_code == 422
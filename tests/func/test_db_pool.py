@@ -0,0 +1,73 @@
+import os
+import pytest
+from sqlalchemy import create_engine, exc, text
+from api.config.database import engine_options
+from api.database import engine
+from api.utils.pool_metrics import TimedQueuePool, instrument_pool, pool_metrics
+
+
+@pytest.fixture
+def small_engine():
+    """
+    Fixture to create an instrumented engine on the test database with a pool of one connection
+    plus one overflow, that gives up waiting for a connection after 0.2 seconds.
+    """
+    options = {**engine_options(), "pool_size": 1, "max_overflow": 1, "pool_timeout": 0.2}
+    options["connect_args"] = {"options": "-c statement_timeout=150"}
+    test_engine = create_engine(os.getenv("SQLALCHEMY_TEST_DATABASE_URL"), poolclass=TimedQueuePool, **options)
+    metrics = instrument_pool(test_engine.pool, "test")
+    yield test_engine, metrics
+    test_engine.dispose()
+    pool_metrics.pop("test", None)
+
+
+def test_application_engine_is_instrumented():
+    """
+    Given the application engine, its pool is configured from the environment and registered in the pool metrics.
+    """
+    assert isinstance(engine.pool, TimedQueuePool)
+    assert engine.pool._pre_ping == engine_options()["pool_pre_ping"]
+    assert pool_metrics["sync"] is engine.pool.metrics
+
+
+def test_pool_metrics_track_usage_and_timeouts(small_engine):
+    """
+    Given a pool of one connection plus one overflow, the metrics follow the connections in use and the
+    overflow, and count the checkouts that time out.
+    """
+    test_engine, metrics = small_engine
+
+    first = test_engine.connect()
+    second = test_engine.connect()
+    assert metrics.in_use == 2
+    assert metrics.overflow == 1
+
+    with pytest.raises(exc.TimeoutError):
+        test_engine.connect()
+
+    first.close()
+    second.close()
+
+    snapshot = metrics.snapshot()
+    assert snapshot["in_use"] == 0
+    assert snapshot["in_use_peak"] == 2
+    assert snapshot["overflow"] == 0
+    assert snapshot["overflow_peak"] == 1
+    assert snapshot["checkouts"] == 2
+    assert snapshot["checkout_timeouts"] == 1
+    assert sum(snapshot["checkout_latency_buckets"]) == 2
+    assert snapshot["connections_opened"] - snapshot["connections_closed"] == 1
+
+
+def test_statement_timeout(small_engine):
+    """
+    Given a per-connection statement timeout, the server cancels the statements that run longer.
+    """
+    test_engine, metrics = small_engine
+
+    with test_engine.connect() as connection:
+        assert connection.execute(text("SHOW statement_timeout")).scalar() == "150ms"
+        with pytest.raises(exc.OperationalError, match="statement timeout"):
+            connection.execute(text("SELECT pg_sleep(1)"))
+
+    assert metrics.in_use == 0
@@ -1,3 +1,5 @@
+from api.services import meeting_service
+from api.models import Meeting
 from api.schemas import MeetingUpdate
 from datetime import datetime, timezone, timedelta
 import time
@@ -84,4 +86,61 @@ def test_edit_meeting_fail_4(create_meeting_to_edit):
     
     response = client.patch(f"/edit/meeting/{meeting_id}", json=meeting_data)
     assert response.status_code == 401
-    assert response.json()["detail"] == "Could not validate credentials"
\ No newline at end of file
+    assert response.json()["detail"] == "Could not validate credentials"
+
+def test_edit_meeting_saves_and_sends_the_same_start_time(create_admin_access_token, create_meeting_to_edit, zoom_server, db_session):
+    """
+    Given a start time without an offset, it is read in the meetings timezone, and the database and Zoom
+    both get the same moment.
+    """
+    meeting_id, client = create_meeting_to_edit
+    client.cookies.set("access_token", create_admin_access_token)
+
+    response = client.patch(f"/edit/meeting/{meeting_id}", json={"start_time": "2031-05-05T10:00:00"})
+
+    assert response.status_code == 200
+    assert datetime.fromisoformat(response.json()["start_time"]).replace(tzinfo=None) == datetime(2031, 5, 5, 15)
+    assert zoom_server.zoom.meetings[int(meeting_id)]["start_time"] == "2031-05-05T15:00:00Z"
+
+
+def test_edit_meeting_to_a_slot_booked_elsewhere(create_admin_access_token, create_meeting_to_edit, db_session):
+    """
+    Given a meeting of the same advisor saved by another process, which this process' advisor schedule does
+    not know of, moving the meeting onto it is refused.
+    """
+    meeting_id, client = create_meeting_to_edit
+    client.cookies.set("access_token", create_admin_access_token)
+    meeting = db_session.query(Meeting).filter(Meeting.zoom_meeting_id == meeting_id).one()
+    db_session.add(Meeting(start_time=datetime(2031, 5, 6, 15), topic="Booked elsewhere", zoom_meeting_id="elsewhere-1",
+                           join_url="https://zoom.us/j/elsewhere-1", advisor_id=meeting.advisor_id))
+    db_session.commit()
+
+    response = client.patch(f"/edit/meeting/{meeting_id}", json={"start_time": "2031-05-06T15:15:00Z"})
+
+    assert response.status_code == 409
+    assert response.json()["detail"] == "The advisor is not available at that time"
+
+
+def test_edit_meeting_to_a_slot_booked_during_the_zoom_call(create_admin_access_token, create_meeting_to_edit, zoom_server, db_session, monkeypatch):
+    """
+    Given a slot that is free before Zoom is called and booked by another request meanwhile, the move is
+    refused once the advisor is locked, and the Zoom meeting is moved back.
+    """
+    meeting_id, client = create_meeting_to_edit
+    client.cookies.set("access_token", create_admin_access_token)
+    start_time = db_session.query(Meeting.start_time).filter(Meeting.zoom_meeting_id == meeting_id).scalar()
+    zoom_start_time = zoom_server.zoom.meetings[int(meeting_id)]["start_time"]
+    checks = []
+
+    async def booked_meanwhile(database, advisor_id, start, ignore=None):
+        checks.append(start)
+        return None if len(checks) == 1 else (0, start)
+    monkeypatch.setattr(meeting_service, "find_overlapping_meeting", booked_meanwhile)
+
+    response = client.patch(f"/edit/meeting/{meeting_id}", json={"start_time": "2031-05-07T15:00:00Z"})
+
+    assert response.status_code == 409
+    assert len(checks) == 2
+    db_session.expire_all()
+    assert db_session.query(Meeting.start_time).filter(Meeting.zoom_meeting_id == meeting_id).scalar() == start_time
+    assert zoom_server.zoom.meetings[int(meeting_id)]["start_time"] == zoom_start_time
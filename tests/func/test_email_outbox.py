@@ -0,0 +1,85 @@
+import pytest
+import aiosmtplib
+from datetime import datetime, timezone
+from api.models import EmailOutbox, EmailOutboxStatus
+from api.services.email_service import EmailService
+from api.utils.smtp_pool import SMTPConnectionPool
+from api.workers.email_outbox import EmailOutboxWorker
+
+
+def smtp_pool_for(smtp_server, size=2) -> SMTPConnectionPool:
+    async def connect():
+        smtp = aiosmtplib.SMTP(hostname=smtp_server.hostname, port=smtp_server.port, start_tls=False, local_hostname="localhost")
+        await smtp.connect()
+        return smtp
+    return SMTPConnectionPool(size=size, connect=connect)
+
+
+def queue_messages(db_session, count: int) -> list[int]:
+    email_service = EmailService(db_session)
+    messages = [email_service.queue_message(f"outbox{i}@email.com", "Outbox test", f"<p>Message {i}</p>") for i in range(count)]
+    db_session.commit()
+    return [message.id for message in messages]
+
+
+@pytest.mark.asyncio
+async def test_outbox_reuses_pooled_smtp_sessions(db_session, smtp_server):
+    """
+    Given queued messages, the worker delivers them over the pooled SMTP sessions
+    and reuses those sessions for the next batch instead of reconnecting.
+    """
+    smtp_server.clear()
+    pool = smtp_pool_for(smtp_server, size=2)
+    worker = EmailOutboxWorker(session_factory=lambda: db_session, smtp_pool=pool)
+
+    first_batch = queue_messages(db_session, 5)
+    assert await worker.drain_once() == 5
+    second_batch = queue_messages(db_session, 3)
+    assert await worker.drain_once() == 3
+    await pool.close()
+
+    for message_id in first_batch + second_batch:
+        message = db_session.get(EmailOutbox, message_id)
+        assert message.status == EmailOutboxStatus.SENT
+        assert message.attempts == 1
+    assert len(smtp_server.messages) == 8
+    assert smtp_server.sessions == 2
+
+
+@pytest.mark.asyncio
+async def test_smtp_pool_reconnects_after_connection_drop(smtp_server):
+    """
+    Given a pooled SMTP session dropped by the server, the pool replaces it with a new one.
+    """
+    smtp_server.clear()
+    pool = smtp_pool_for(smtp_server, size=1)
+
+    async with pool.session() as session:
+        await session.noop()
+    session.smtp.close()
+
+    async with pool.session() as new_session:
+        await new_session.noop()
+    await pool.close()
+
+    assert new_session is not session
+    assert smtp_server.sessions == 2
+
+
+@pytest.mark.asyncio
+async def test_outbox_postpones_messages_when_smtp_is_down(db_session):
+    """
+    Given an unreachable SMTP server, the queued messages are postponed without using up their attempts.
+    """
+    async def refuse_connection():
+        raise ConnectionRefusedError("SMTP server is down")
+
+    worker = EmailOutboxWorker(session_factory=lambda: db_session, smtp_pool=SMTPConnectionPool(connect=refuse_connection))
+    message_ids = queue_messages(db_session, 2)
+    assert await worker.drain_once() == 2
+
+    for message_id in message_ids:
+        message = db_session.get(EmailOutbox, message_id)
+        assert message.status == EmailOutboxStatus.PENDING
+        assert message.attempts == 0
+        assert message.next_attempt_at > datetime.now(timezone.utc)
@@ -0,0 +1,46 @@
+from api.utils.email_templates import EmailTemplates, StaticPartsTemplate, inline_css
+
+
+def test_email_template_css_is_inlined():
+    """
+    Given the compiled templates, the CSS is inlined in the elements and only the rules
+    that cannot be inlined remain in the style block.
+    """
+    templates = EmailTemplates()
+    html = templates.render("confirmation.html", token="abc.def.ghi")
+
+    assert 'href="http://127.0.0.1:5500/demos/confirm-account.html?token=abc.def.ghi"' in html
+    assert '<div class="header" style="background-color: #4CAF50; color: white; padding: 10px 0; text-align: center">' in html
+    assert "a.button:hover { background-color: #45a049; }" in html
+    assert ".container {" not in html
+
+
+def test_email_template_renders_like_jinja():
+    """
+    Given a template split into static parts, rendering it produces the same output as Jinja,
+    escaping the per-message variables.
+    """
+    templates = EmailTemplates()
+    context = {
+        "formatted_time": "2024-07-01 10:30",
+        "join_url": "https://zoom.us/j/1?pwd=a&b",
+        "user_first_name": "<script>",
+        "user_last_name": "Smith",
+        "topic": "Q&A"
+    }
+    template = templates.get_template("advisor_invitation.html")
+    html = template.render(**context)
+
+    assert isinstance(template, StaticPartsTemplate)
+    assert html == templates.environment.from_string(templates.build("advisor_invitation.html")).render(**context)
+    assert "&lt;script&gt; Smith" in html
+    assert 'href="https://zoom.us/j/1?pwd=a&amp;b"' in html
+
+
+def test_inline_css_keeps_existing_style_last():
+    """
+    Given an element with its own style attribute, the inlined declarations come first so the existing ones win.
+    """
+    html = '<html><head><style>p { color: red; } p.note { margin: 0; }</style></head><body><p class="note" style="color: blue">Hi</p></body></html>'
+
+    assert inline_css(html) == '<html><head></head><body><p class="note" style="color: red; margin: 0; color: blue">Hi</p></body></html>'
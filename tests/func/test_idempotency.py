@@ -0,0 +1,174 @@
+import asyncio
+import json
+import uuid
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+from starlette.datastructures import Headers
+from sqlalchemy import func, select
+from api.models import EmailOutbox, User
+from api.services.database_service import DatabaseService
+from api.utils.advisor_schedule import get_advisor_schedule
+from api.utils.auth_utils import create_access_token
+from api.utils.idempotency import IdempotencyMiddleware
+from api.utils.redis_utils import create_redis_client
+from .test_meeting_scheduling import meeting_in
+
+
+@pytest.fixture
+def counted_app():
+    """
+    Fixture to build a small app behind IdempotencyMiddleware whose routes count their calls. The first call
+    to /flaky answers 503.
+    """
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware, routes=("/items/{item_id}", "/flaky"), poll_interval=0.01)
+    app.state.calls = 0
+
+    @app.post("/items/{item_id}")
+    async def create_item(item_id: int, item: dict):
+        app.state.calls += 1
+        await asyncio.sleep(0.2)
+        return {"id": item_id, "call": app.state.calls, **item}
+
+    @app.post("/other")
+    async def other():
+        app.state.calls += 1
+        return {"call": app.state.calls}
+
+    @app.post("/flaky")
+    async def flaky(response: Response):
+        app.state.calls += 1
+        response.status_code = 503 if app.state.calls == 1 else 200
+        return {"call": app.state.calls}
+
+    return app
+
+
+def idempotency_key() -> dict:
+    return {"Idempotency-Key": uuid.uuid4().hex}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_retries_wait_for_the_first_request(counted_app):
+    """
+    Given five requests with the same key sent at once, the route runs once and every request gets its response;
+    another caller using the same key gets its own.
+    """
+    headers = idempotency_key()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=counted_app), base_url="http://test") as client:
+        responses = await asyncio.gather(*(client.post("/items/7", json={"name": "item"}, headers=headers) for _ in range(5)))
+        other_caller = await client.post("/items/7", json={"name": "item"}, headers={**headers, "Authorization": "Bearer other"})
+
+    assert counted_app.state.calls == 2
+    assert {response.status_code for response in responses} == {200}
+    assert all(response.json() == {"id": 7, "call": 1, "name": "item"} for response in responses)
+    assert sum(response.headers.get("Idempotent-Replayed") == "true" for response in responses) == 4
+    assert other_caller.json()["call"] == 2
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_reused_for_another_request(counted_app):
+    headers = idempotency_key()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=counted_app), base_url="http://test") as client:
+        await client.post("/items/7", json={"name": "item"}, headers=headers)
+        response = await client.post("/items/7", json={"name": "another item"}, headers=headers)
+
+    assert response.status_code == 422
+    assert counted_app.state.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_server_errors_and_other_routes_are_not_kept(counted_app):
+    """
+    Given a request that fails with 503, its retry runs again; routes not covered ignore the key.
+    """
+    headers = idempotency_key()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=counted_app), base_url="http://test") as client:
+        statuses = [(await client.post("/flaky", headers=headers)).status_code for _ in range(3)]
+        others = [(await client.post("/other", headers=headers)).json()["call"] for _ in range(2)]
+
+    assert statuses == [503, 200, 200]
+    assert others == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_requests_longer_than_the_lock_keep_their_key():
+    """
+    Given an in-flight record lasting a second and a request taking two and a half, a retry sent meanwhile still
+    waits for it instead of running again.
+    """
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware, routes=("/slow",), lock_ttl=1, poll_interval=0.01)
+    app.state.calls = 0
+
+    @app.post("/slow")
+    async def slow():
+        app.state.calls += 1
+        await asyncio.sleep(2.5)
+        return {"call": app.state.calls}
+
+    async def retry(client, headers):
+        await asyncio.sleep(1.5)
+        return await client.post("/slow", headers=headers)
+
+    headers = idempotency_key()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=10) as client:
+        first, second = await asyncio.gather(client.post("/slow", headers=headers), retry(client, headers))
+
+    assert app.state.calls == 1
+    assert first.json() == second.json() == {"call": 1}
+    assert second.headers["Idempotent-Replayed"] == "true"
+
+
+@pytest.mark.asyncio
+async def test_response_does_not_replace_the_record_of_another_request():
+    """
+    Given a request whose in-flight record was taken over by another request, e.g. after it expired, its
+    response is not stored over the other request's record.
+    """
+    redis_client = create_redis_client()
+    app = FastAPI()
+    middleware_options = {"routes": ("/taken-over",), "redis_client_factory": lambda: redis_client}
+    app.add_middleware(IdempotencyMiddleware, **middleware_options)
+    taken_over = json.dumps({"fingerprint": "another request", "token": "another token"})
+    headers = idempotency_key()
+
+    @app.post("/taken-over")
+    async def taken_over_route():
+        key = IdempotencyMiddleware(app, **middleware_options)._redis_key(Headers(headers), headers["Idempotency-Key"])
+        await redis_client.set(key, taken_over, ex=60)
+        return {"stored": False}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/taken-over", headers=headers)
+
+    key = IdempotencyMiddleware(app, **middleware_options)._redis_key(Headers(headers), headers["Idempotency-Key"])
+    assert response.status_code == 200
+    assert await redis_client.get(key) == taken_over
+    await redis_client.delete(key)
+    await redis_client.aclose()
+
+
+def test_scheduling_retry_is_replayed(register_users_for_login, insert_advisors_for_meeting_scheduling, db_session, zoom_server):
+    """
+    Given /schedule-meeting/ sent twice with the same key, the meeting is created in Zoom and the invitations
+    are queued only once, and the retry gets the same meeting.
+    """
+    client = register_users_for_login
+    db_session.add(User(first_name="Retried", lastname="Request", email="retried.request@email.com", password_hash="hash"))
+    db_session.commit()
+    client.cookies.set("access_token", asyncio.run(create_access_token(data={"sub": "retried.request@email.com"})))
+    asyncio.run(get_advisor_schedule().rebuild(DatabaseService(db_session)))
+    zoom_creations = zoom_server.zoom.requests["POST /v2/users/me/meetings"]
+    headers, meeting = idempotency_key(), meeting_in(days=40)
+
+    first = client.post("/schedule-meeting/", json=meeting, headers=headers)
+    retry = client.post("/schedule-meeting/", json=meeting, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert zoom_server.zoom.requests["POST /v2/users/me/meetings"] == zoom_creations + 1
+    invitations = select(func.count()).select_from(EmailOutbox).where(EmailOutbox.recipient == "retried.request@email.com")
+    assert db_session.execute(invitations).scalar() == 1
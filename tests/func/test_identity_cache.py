@@ -0,0 +1,88 @@
+import pytest
+import time
+from sqlalchemy import event
+from api.models import User, UserRole
+from api.utils import identity_cache as identity_cache_module
+from api.utils.identity_cache import CurrentUser, IdentityCache
+
+
+@pytest.fixture
+def identity_cache():
+    """
+    Fixture to enable the identity cache, which is disabled for the rest of the tests.
+    """
+    cache = IdentityCache(ttl=30)
+    identity_cache_module._identity_cache = cache
+    yield cache
+    identity_cache_module._identity_cache = None
+
+
+def count_user_queries(db_session, send_request):
+    statements = []
+    engine = db_session.get_bind().engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = send_request()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return response, len(statements)
+
+
+def test_identity_cache_skips_database(identity_cache, register_users_for_login, create_admin_access_token, db_session):
+    """
+    Given an admin that already made an authenticated request, the next request with the same token
+    does not read the user from the database.
+    """
+    client = register_users_for_login
+    client.cookies.set("access_token", create_admin_access_token)
+    send_request = lambda: client.get("/admin/read-users", params={"view": "summary", "limit": 1})
+
+    first_response, first_queries = count_user_queries(db_session, send_request)
+    second_response, second_queries = count_user_queries(db_session, send_request)
+
+    assert first_response.status_code == second_response.status_code == 200
+    assert second_queries == first_queries - 1
+
+
+def test_identity_cache_invalidated_on_role_change(identity_cache, register_users_for_login, create_admin_access_token, create_valid_access_token_3, db_session):
+    """
+    Given a cached admin, demoting it through the API invalidates the cached identity immediately.
+    """
+    client = register_users_for_login
+    client.cookies.set("access_token", create_admin_access_token)
+    user = db_session.query(User).filter(User.email == "janesmith@email.com").first()
+    user.role = UserRole.ADMIN
+    db_session.commit()
+
+    client.cookies.set("access_token", create_valid_access_token_3)
+    assert client.get("/admin/read-users", params={"limit": 1}).status_code == 200
+
+    client.cookies.set("access_token", create_admin_access_token)
+    response = client.put(f"/admin/modify-user-account/{user.id}", json={"role": "REGULAR"})
+    assert response.status_code == 200
+
+    client.cookies.set("access_token", create_valid_access_token_3)
+    assert client.get("/admin/read-users", params={"limit": 1}).status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_identity_cache_entries_expire():
+    """
+    Given a cached identity, it is dropped once its TTL runs out and never outlives its token.
+    """
+    cache = IdentityCache(ttl=0.05)
+    user = CurrentUser(id=1, email="cached@email.com", first_name="Cached", lastname="User", is_active=True, role=UserRole.REGULAR)
+    token_exp = int(time.time()) + 60
+
+    await cache.set(user.email, token_exp, user)
+    assert await cache.get(user.email, token_exp) == user
+    time.sleep(0.06)
+    assert await cache.get(user.email, token_exp) is None
+
+    await cache.set(user.email, int(time.time()) - 1, user)
+    assert await cache.get(user.email, int(time.time()) - 1) is None
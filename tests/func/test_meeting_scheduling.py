@@ -1,5 +1,19 @@
 from datetime import datetime, timezone, timedelta
+from sqlalchemy import create_engine, delete, event, select
+from sqlalchemy.orm import Session
 from api.schemas import Meeting
+from api.models import Advisor, EmailOutbox, Meeting as MeetingModel, User
+from api.services.database_service import DatabaseService
+from api.services.email_service import EmailService
+from api.services.meeting_service import MeetingService
+from api.services.user_service import UserService
+from api.utils import advisor_schedule
+from api.utils.advisor_schedule import AdvisorSchedule, get_advisor_schedule
+from api.utils.auth_utils import create_access_token
+from api.utils.identity_cache import CurrentUser
+import asyncio
+import os
+import pytest
 import time
 
 def get_datetimes():
@@ -199,3 +213,140 @@ def test_meeting_scheduling_fail_4(create_valid_access_token_2, register_users_f
             assert response.json()["detail"] == "It has not been 7 days since you last scheduled a meeting"
 
 
+def log_in_as(client, email: str) -> None:
+    client.cookies.set("access_token", asyncio.run(create_access_token(data={"sub": email})))
+
+
+def meeting_in(days: int) -> dict:
+    # A time no other test books, so the first advisor claimed is free
+    start_time = (datetime.now(timezone.utc) + timedelta(days=days)).replace(microsecond=0).isoformat()
+    return {"start_time": start_time, "topic": "Testing meeting scheduling"}
+
+
+def test_meeting_scheduling_statements(register_users_for_login, insert_advisors_for_meeting_scheduling, db_session):
+    """
+    Given a user who can schedule a meeting, the booking runs a fixed set of statements and commits twice:
+    the reservation, whose claims of the user and of the advisor are `... RETURNING`, before Zoom is called,
+    and the Zoom details of the meeting with the invitations after.
+    """
+    client = register_users_for_login
+    log_in_as(client, "johndoe@email.com")
+    # The process-wide schedule may still hold the advisors of other test modules, rolled back since
+    asyncio.run(get_advisor_schedule().rebuild(DatabaseService(db_session)))
+    statements = []
+    engine = db_session.get_bind().engine
+    record = lambda conn, cursor, statement, parameters, context, executemany: statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.post("/schedule-meeting/", json=meeting_in(days=30))
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    # The test session commits by releasing a savepoint, and the advisor is claimed in one
+    assert sum(statement.startswith("RELEASE SAVEPOINT") for statement in statements) == 3
+    writes = [statement.split(" SET")[0].split(" (")[0] for statement in statements if statement.startswith(("INSERT", "UPDATE"))]
+    assert writes == ["UPDATE users", "UPDATE advisors", "INSERT INTO meetings", "UPDATE meetings", "INSERT INTO email_outbox"]
+    assert all("RETURNING" in statement for statement in statements if statement.startswith("UPDATE"))
+    # Authenticating the user, checking for new advisors and for meetings of the advisor at that time
+    assert len([statement for statement in statements if "SAVEPOINT" not in statement]) == 8
+
+
+def test_meeting_scheduling_rolls_back_on_failure(register_users_for_login, insert_advisors_for_meeting_scheduling, db_session, zoom_server, monkeypatch):
+    """
+    Given a booking that fails after Zoom created the meeting, its reservation is cancelled: the user can
+    book again, no meeting is left and the Zoom meeting is deleted again. Only the advisor rotation moves on.
+    """
+    client = register_users_for_login
+    db_session.add(User(first_name="Rolled", lastname="Back", email="rolled.back@email.com", password_hash="hash"))
+    db_session.commit()
+    log_in_as(client, "rolled.back@email.com")
+    meetings = db_session.execute(select(MeetingModel.id)).scalars().all()
+    zoom_meetings, zoom_deletes = len(zoom_server.zoom.meetings), zoom_server.zoom.requests["DELETE /v2/meetings/{meetingId}"]
+
+    def fail(self, *args):
+        raise RuntimeError("the database went away")
+    monkeypatch.setattr(EmailService, "queue_meeting_invitations_to_users", fail)
+
+    with pytest.raises(RuntimeError):
+        client.post("/schedule-meeting/", json=meeting_in(days=31))
+
+    db_session.expire_all()
+    assert db_session.execute(select(MeetingModel.id)).scalars().all() == meetings
+    assert db_session.execute(select(User.last_meeting_scheduled).where(User.email == "rolled.back@email.com")).scalar() is None
+    assert zoom_server.zoom.requests["DELETE /v2/meetings/{meetingId}"] == zoom_deletes + 1
+    assert len(zoom_server.zoom.meetings) == zoom_meetings
+
+
+@pytest.mark.asyncio
+async def test_concurrent_claims_of_the_same_user():
+    """
+    Given two transactions claiming the scheduling right of the same user, the second is rejected at once
+    while the first is in flight, gets it once the first rolls back, and is rejected once the first commits.
+    """
+    engine = create_engine(os.getenv("SQLALCHEMY_TEST_DATABASE_URL"))
+    with Session(engine) as setup:
+        user = User(first_name="Parallel", lastname="Requests", email="parallel.requests@email.com", password_hash="hash")
+        setup.add(user)
+        setup.commit()
+        user_id = user.id
+
+    try:
+        with Session(engine) as first, Session(engine) as second:
+            assert await UserService(first).claim_meeting_scheduling(user_id) is not None
+            assert await UserService(second).claim_meeting_scheduling(user_id) is None
+            first.rollback()
+
+            assert await UserService(second).claim_meeting_scheduling(user_id) is not None
+            second.commit()
+            assert await UserService(first).claim_meeting_scheduling(user_id) is None
+    finally:
+        with Session(engine) as cleanup:
+            cleanup.execute(delete(User).where(User.id == user_id))
+            cleanup.commit()
+        engine.dispose()
+
+
+
+@pytest.mark.asyncio
+async def test_concurrent_bookings_of_a_single_advisor(zoom_server, monkeypatch):
+    """
+    Given a single advisor and two users booking it at different times with the synchronous engine, both
+    bookings go through: the first one does not keep the advisor locked while Zoom creates its meeting.
+    """
+    # Waiting for a lock would freeze the event loop: fail after a while instead of hanging the test
+    engine = create_engine(os.getenv("SQLALCHEMY_TEST_DATABASE_URL"), connect_args={"options": "-c lock_timeout=5000"})
+    with Session(engine) as setup:
+        assert setup.execute(select(Advisor.id)).first() is None
+        advisor = Advisor(name="Single Advisor", email="single.advisor@email.com")
+        users = [User(first_name="Booking", lastname=str(number), email=f"booking.{number}@email.com", password_hash="hash") for number in range(2)]
+        setup.add_all([advisor, *users])
+        setup.commit()
+        advisor_id = advisor.id
+        current_users = [CurrentUser.model_validate(user) for user in users]
+    monkeypatch.setattr(advisor_schedule, "_advisor_schedule", AdvisorSchedule())
+    latency, zoom_server.zoom.latency = zoom_server.zoom.latency, 0.3
+
+    sessions = [Session(engine) for _ in current_users]
+    try:
+        started = time.perf_counter()
+        meetings = await asyncio.gather(*(
+            MeetingService(session).schedule_meeting(user, datetime.now(timezone.utc) + timedelta(days=50 + number), "Single advisor")
+            for number, (session, user) in enumerate(zip(sessions, current_users))
+        ))
+
+        assert time.perf_counter() - started < 3
+        assert [meeting.advisor_id for meeting in meetings] == [advisor_id, advisor_id]
+        assert all(meeting.zoom_meeting_id is not None for meeting in meetings)
+    finally:
+        zoom_server.zoom.latency = latency
+        for session in sessions:
+            session.close()
+        with Session(engine) as cleanup:
+            cleanup.execute(delete(MeetingModel).where(MeetingModel.advisor_id == advisor_id))
+            cleanup.execute(delete(EmailOutbox).where(EmailOutbox.recipient.in_(["single.advisor@email.com", *(user.email for user in current_users)])))
+            cleanup.execute(delete(User).where(User.id.in_([user.id for user in current_users])))
+            cleanup.execute(delete(Advisor).where(Advisor.id == advisor_id))
+            cleanup.commit()
+        engine.dispose()
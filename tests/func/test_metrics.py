@@ -0,0 +1,92 @@
+import os
+import subprocess
+import sys
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+from api.config.exceptions import ServiceUnavailableError
+from api.utils.resilience import CircuitBreaker, ResilientClient, RetryPolicy, get_circuit_breaker
+
+
+def scrape(client) -> dict[tuple, float]:
+    """
+    Fetch /metrics and index the samples by (name, sorted labels).
+    """
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+def test_metrics_endpoint(client):
+    """
+    Given a few requests, /metrics counts them by route template and exposes the pool and breaker gauges.
+    """
+    get_circuit_breaker("metrics-test", failure_threshold=5, reset_timeout=30)
+    client.get("/")
+    client.delete("/delete/meeting/12345")
+
+    samples = scrape(client)
+
+    assert samples[("http_requests_total", (("method", "GET"), ("route", "/"), ("status", "200")))] >= 1
+    assert any(name == "http_requests_total" and dict(labels)["route"] == "/delete/meeting/{meeting_id}" for name, labels in samples)
+    assert not any("12345" in dict(labels).get("route", "") for _, labels in samples)
+    assert samples[("circuit_breaker_state", (("service", "metrics-test"),))] == 0
+    assert ("db_pool_in_use", (("pool", "sync"),)) in samples
+
+
+def test_rate_limit_rejections_are_counted(client):
+    before = REGISTRY.get_sample_value("rate_limit_rejections_total", {"algorithm": "fixed_window"}) or 0
+
+    statuses = [client.post("/login", data={"username": "metrics.rate.limit@email.com", "password": "wrong"}).status_code for _ in range(6)]
+
+    assert statuses[-1] == 429
+    assert REGISTRY.get_sample_value("rate_limit_rejections_total", {"algorithm": "fixed_window"}) == before + 1
+
+
+@pytest.mark.asyncio
+async def test_outbound_calls_are_counted_by_outcome():
+    """
+    Given a service answering 201, then 404, then 503 twice, the calls are counted as 2xx, 4xx and unavailable,
+    and the retry of the 503 is counted too.
+    """
+    statuses = iter([201, 404, 503, 503])
+    transport = httpx.MockTransport(lambda request: httpx.Response(next(statuses)))
+    client = ResilientClient(
+        httpx.AsyncClient(transport=transport),
+        CircuitBreaker("metrics-service", failure_threshold=10, reset_timeout=30),
+        RetryPolicy(2, base_delay=0.001, max_delay=0.01),
+        deadline=5.0
+    )
+
+    await client.request("POST", "https://example.com/items")
+    await client.request("GET", "https://example.com/items/1")
+    with pytest.raises(ServiceUnavailableError):
+        await client.request("GET", "https://example.com/items/2")
+
+    sample = lambda name, labels: REGISTRY.get_sample_value(name, {"service": "metrics-service", **labels})
+    assert sample("outbound_requests_total", {"method": "POST", "outcome": "2xx"}) == 1
+    assert sample("outbound_requests_total", {"method": "GET", "outcome": "4xx"}) == 1
+    assert sample("outbound_requests_total", {"method": "GET", "outcome": "unavailable"}) == 1
+    assert sample("outbound_retries_total", {}) == 1
+    assert sample("outbound_request_duration_seconds_count", {}) == 3
+
+
+def test_multiprocess_metrics_are_aggregated(tmp_path):
+    """
+    Given two worker processes writing to the same PROMETHEUS_MULTIPROC_DIR, a third one renders their sum.
+    """
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    worker = "from api.utils.metrics import HTTP_REQUESTS; HTTP_REQUESTS.labels('GET', '/', '200').inc(3)"
+    scrape = "from api.utils.metrics import render_metrics; print(render_metrics().decode())"
+
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], env=env, check=True)
+    output = subprocess.run([sys.executable, "-c", scrape], env=env, check=True, capture_output=True, text=True).stdout
+
+    assert 'http_requests_total{method="GET",route="/",status="200"} 6.0' in output
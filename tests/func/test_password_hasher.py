@@ -0,0 +1,54 @@
+import pytest
+from api.models import crypt
+from api.utils import password_utils
+from api.utils.password_utils import PasswordHasher
+
+
+@pytest.fixture
+def saturated_hasher(monkeypatch):
+    """
+    Fixture to replace the shared password hasher with one whose two slots are all taken.
+    """
+    hasher = PasswordHasher(max_pending=2)
+    monkeypatch.setattr(password_utils, "password_hasher", hasher)
+    for _ in range(hasher.max_pending):
+        assert hasher._slots.acquire(blocking=False)
+    yield hasher
+    for _ in range(hasher.max_pending):
+        hasher._slots.release()
+    hasher.shutdown()
+
+
+def test_saturated_hasher_rejects_register_and_login(register_users_for_login, saturated_hasher):
+    """
+    Given every slot of the password hasher taken, registering and logging in are answered with 503 right
+    away instead of queuing more bcrypt work.
+    """
+    client = register_users_for_login
+    user_data = {"first_name": "Busy", "lastname": "Server", "email": "busy.server@email.com", "plain_password": "busyserverpassword"}
+
+    responses = [
+        client.post("/register", json=user_data),
+        client.post("/login", data={"username": "johndoe@email.com", "password": "johndoepassword"}),
+    ]
+
+    assert [response.status_code for response in responses] == [503, 503]
+    assert all(response.headers["Retry-After"] == "1" for response in responses)
+    assert responses[0].json()["detail"] == "The server is busy, please try again later."
+
+
+@pytest.mark.asyncio
+async def test_slot_is_released_after_an_error():
+    """
+    Given a hasher with a single slot, a verification that fails leaves the slot free for the next one.
+    """
+    hasher = PasswordHasher(max_pending=1)
+    try:
+        with pytest.raises(ValueError):
+            await hasher.verify("password", "not a bcrypt hash")
+
+        assert await hasher.verify("password", crypt.hash("password"))
+        assert hasher._slots.acquire(blocking=False)
+        hasher._slots.release()
+    finally:
+        hasher.shutdown()
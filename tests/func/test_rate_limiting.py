@@ -0,0 +1,93 @@
+import asyncio
+import uuid
+import pytest
+import pytest_asyncio
+from hashlib import sha1
+from api.utils import rate_limiting
+from api.utils.rate_limiting import RateLimitAlgorithm, rate_limit_exceeded
+from api.utils.redis_utils import create_redis_client
+
+
+@pytest_asyncio.fixture
+async def redis_client():
+    """
+    Fixture for a Redis client built like the application's.
+    """
+    client = create_redis_client()
+    yield client
+    await client.aclose()
+
+
+async def check(redis_client, identifier: str, algorithm: RateLimitAlgorithm, times: int = 1) -> list[bool]:
+    # Three requests per second
+    return [await rate_limit_exceeded(redis_client, identifier, 3, 1, algorithm) for _ in range(times)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("algorithm", list(RateLimitAlgorithm))
+async def test_requests_beyond_the_limit_are_rejected(redis_client, algorithm):
+    """
+    Given a limit of 3 requests per second, the first 3 requests are allowed and the next ones rejected,
+    and another identifier keeps its own limit.
+    """
+    identifier = uuid.uuid4().hex
+
+    assert await check(redis_client, identifier, algorithm, times=5) == [False, False, False, True, True]
+    assert await check(redis_client, uuid.uuid4().hex, algorithm) == [False]
+
+
+@pytest.mark.asyncio
+async def test_fixed_window_resets_at_the_end_of_the_window(redis_client):
+    identifier = uuid.uuid4().hex
+    assert await check(redis_client, identifier, RateLimitAlgorithm.FIXED_WINDOW, times=4) == [False, False, False, True]
+
+    await asyncio.sleep(1.2)
+
+    assert await check(redis_client, identifier, RateLimitAlgorithm.FIXED_WINDOW, times=4) == [False, False, False, True]
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_log_frees_the_oldest_requests_first(redis_client):
+    """
+    Given 2 requests and a third one 0.6 seconds later, once the first two are a second old only two more
+    requests are allowed: the third one is still in the window.
+    """
+    identifier = uuid.uuid4().hex
+    assert await check(redis_client, identifier, RateLimitAlgorithm.SLIDING_WINDOW_LOG, times=2) == [False, False]
+    await asyncio.sleep(0.6)
+    assert await check(redis_client, identifier, RateLimitAlgorithm.SLIDING_WINDOW_LOG, times=2) == [False, True]
+
+    await asyncio.sleep(0.6)
+
+    assert await check(redis_client, identifier, RateLimitAlgorithm.SLIDING_WINDOW_LOG, times=3) == [False, False, True]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_refills_continuously(redis_client):
+    """
+    Given an empty bucket refilled at 3 tokens per second, a request is allowed again after a third of a
+    second, one at a time.
+    """
+    identifier = uuid.uuid4().hex
+    assert await check(redis_client, identifier, RateLimitAlgorithm.TOKEN_BUCKET, times=4) == [False, False, False, True]
+
+    await asyncio.sleep(0.4)
+
+    assert await check(redis_client, identifier, RateLimitAlgorithm.TOKEN_BUCKET, times=2) == [False, True]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("algorithm", list(RateLimitAlgorithm))
+async def test_scripts_missing_from_the_server_are_loaded(redis_client, monkeypatch, algorithm):
+    """
+    Given a script the Redis server does not have, e.g. after a restart flushed its script cache, the check
+    loads the script and counts the request.
+    """
+    # A script no other test loaded, so the server's script cache is left as it is
+    script = f"{rate_limiting.RATE_LIMIT_SCRIPTS[algorithm]}-- {uuid.uuid4().hex}\n"
+    monkeypatch.setitem(rate_limiting.RATE_LIMIT_SCRIPTS, algorithm, script)
+    monkeypatch.setitem(rate_limiting.RATE_LIMIT_SCRIPT_SHAS, algorithm, sha1(script.encode()).hexdigest())
+    identifier = uuid.uuid4().hex
+
+    assert await check(redis_client, identifier, algorithm, times=4) == [False, False, False, True]
+    assert await redis_client.script_exists(rate_limiting.RATE_LIMIT_SCRIPT_SHAS[algorithm]) == [True]
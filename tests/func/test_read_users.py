@@ -0,0 +1,84 @@
+import json
+from sqlalchemy import event
+from api.models import User
+
+
+def count_statements(db_session, send_request):
+    """
+    Send a request and count the SQL statements it runs on the test database, leaving out the savepoints
+    the test session wraps the request's transactions in.
+    """
+    statements = []
+    engine = db_session.get_bind().engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "SAVEPOINT" not in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = send_request()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return response, len(statements)
+
+
+def test_read_users_pagination(register_users_for_login, create_admin_access_token, db_session):
+    """
+    Given several users, following the X-Next-Cursor header returns every user exactly once, in ID order.
+    """
+    client = register_users_for_login
+    client.cookies.set("access_token", create_admin_access_token)
+
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+        response = client.get("/admin/read-users", params=params)
+        assert response.status_code == 200
+        ids += [user["id"] for user in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert ids == sorted(ids)
+    assert ids == [user.id for user in db_session.query(User).order_by(User.id)]
+
+
+def test_read_users_constant_number_of_queries(register_users_for_login, create_admin_access_token, db_session):
+    """
+    Given the full view, a page costs the same number of queries whatever the number of users in it.
+    """
+    client = register_users_for_login
+    client.cookies.set("access_token", create_admin_access_token)
+
+    small_page, small_page_statements = count_statements(db_session, lambda: client.get("/admin/read-users", params={"limit": 1}))
+    large_page, large_page_statements = count_statements(db_session, lambda: client.get("/admin/read-users", params={"limit": 4}))
+
+    assert len(small_page.json()) == 1
+    assert len(large_page.json()) == 4
+    assert small_page_statements == large_page_statements
+
+
+def test_read_users_summary_view(register_users_for_login, create_admin_access_token):
+    """
+    Given the summary view, the users are returned without their relationships.
+    """
+    client = register_users_for_login
+    client.cookies.set("access_token", create_admin_access_token)
+    response = client.get("/admin/read-users", params={"view": "summary"})
+
+    assert response.status_code == 200
+    assert set(response.json()[0]) == {"id", "first_name", "second_name", "lastname", "email", "phone_number", "is_active", "role"}
+
+
+def test_export_users(register_users_for_login, create_admin_access_token, db_session):
+    """
+    Given the export endpoint, every user is streamed as a single JSON array.
+    """
+    client = register_users_for_login
+    client.cookies.set("access_token", create_admin_access_token)
+    response = client.get("/admin/export-users")
+
+    assert response.status_code == 200
+    assert [user["id"] for user in json.loads(response.content)] == [user.id for user in db_session.query(User).order_by(User.id)]
+    assert "meetings" in json.loads(response.content)[0]
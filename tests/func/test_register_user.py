@@ -1,3 +1,7 @@
+from sqlalchemy import event
+from api.services import user_service
+
+
 def test_register_user(client):
     """
     Given a database session, a new user is registered
@@ -292,4 +296,77 @@ def test_register_user_fail_17(client):
     response = client.post("/register", json=user_data)
     assert response.status_code == 422
     assert "plain_password" in response.json()["detail"][0]["loc"]
-    assert response.json()["detail"][0]["msg"] == "Input should be a valid string"
\ No newline at end of file
+    assert response.json()["detail"][0]["msg"] == "Input should be a valid string"
+
+
+def test_register_user_fail_18(register_users_for_login):
+    """
+    Given a phone number and a document both already in use by different users, the phone number is reported,
+    as the uniqueness is checked in the order email, phone number, document.
+    """
+    user_data = {
+        "first_name": "Jane",
+        "lastname": "Smith",
+        "email": "example3@email.com",
+        "plain_password": "janesmithpassword",
+        "phone_number" : "+573102345670",
+        "document" : "100482456"
+    }
+
+    response = register_users_for_login.post("/register", json=user_data)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Phone number alredy registered"
+
+
+def test_register_user_round_trips(client, db_session):
+    """
+    Given a new user, the registration looks up its email only, and inserts the user without looking up its phone
+    number or document first.
+    """
+    statements = []
+    engine = db_session.get_bind().engine
+    record = lambda conn, cursor, statement, parameters, context, executemany: statements.append(statement)
+    user_data = {
+        "first_name": "Round",
+        "lastname": "Trips",
+        "email": "round.trips@email.com",
+        "plain_password": "roundtripspassword",
+        "phone_number" : "+573102340000",
+        "document" : "100400400"
+    }
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.post("/register", json=user_data)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.status_code == 201
+    assert [statement.split(" (")[0] for statement in statements if statement.startswith("INSERT")] == [
+        "INSERT INTO users", "INSERT INTO email_confirmation_tokens", "INSERT INTO email_outbox"
+    ]
+    lookups = [statement for statement in statements if statement.startswith("SELECT") and "FROM users" in statement]
+    assert len(lookups) == 1
+    assert "users.email" in lookups[0].split("WHERE")[1] and "phone_number" not in lookups[0]
+
+
+def test_register_taken_email_skips_hashing(register_users_for_login, monkeypatch):
+    """
+    Given an email already in use, the registration is rejected without hashing the password.
+    """
+    async def hash_password(password: str) -> str:
+        raise AssertionError("The password was hashed")
+
+    monkeypatch.setattr(user_service, "hash_password", hash_password)
+    user_data = {
+        "first_name": "John",
+        "lastname": "Again",
+        "email": "johndoe@email.com",
+        "plain_password": "johnagainpassword"
+    }
+
+    response = register_users_for_login.post("/register", json=user_data)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email alredy registered"
@@ -0,0 +1,90 @@
+import os
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from api.utils.password_utils import hash_password
+from api.utils.request_timing import ServerTimingMiddleware, instrument_queries, timed_phase
+
+
+def phase_count(route: str, phase: str) -> float:
+    return REGISTRY.get_sample_value("http_request_phase_duration_seconds_count", {"route": route, "phase": phase}) or 0
+
+
+def request_count(route: str) -> float:
+    return REGISTRY.get_sample_value("http_request_duration_seconds_count", {"method": "GET", "route": route}) or 0
+
+
+def server_timing(response) -> dict[str, str]:
+    # {"db": 'db;dur=1.2;desc="2 calls"', ...}
+    return {metric.split(";")[0]: metric for metric in response.headers["Server-Timing"].split(", ")}
+
+
+@pytest.fixture(scope="module")
+def timed_app():
+    """
+    Fixture to build a small app behind ServerTimingMiddleware whose route queries the database, calls Redis
+    twice and hashes a password.
+    """
+    engine = create_engine(os.getenv("SQLALCHEMY_TEST_DATABASE_URL"))
+    instrument_queries(engine)
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT pg_sleep(0.01)"))
+        for _ in range(2):
+            with timed_phase("redis"):
+                pass
+        await hash_password("password")
+        return {"id": item_id}
+
+    yield app
+    engine.dispose()
+
+
+def test_server_timing_breaks_down_the_request(timed_app):
+    """
+    Given a request that queries the database, calls Redis twice and hashes a password, the Server-Timing
+    header has one entry per phase with its number of calls, and the histograms are labeled by route template.
+    """
+    before = phase_count("/items/{item_id}", "db")
+
+    response = TestClient(timed_app).get("/items/7")
+
+    assert response.status_code == 200
+    metrics = server_timing(response)
+    assert set(metrics) == {"db", "redis", "bcrypt", "total"}
+    assert 'desc="2 calls"' in metrics["redis"]
+    assert float(metrics["db"].split("dur=")[1].split(";")[0]) >= 10
+    assert phase_count("/items/{item_id}", "db") == before + 1
+    assert request_count("/items/7") == 0
+
+
+def test_unmatched_paths_share_one_label(timed_app):
+    client = TestClient(timed_app)
+    before = request_count("unmatched")
+    client.get("/nothing-here")
+    client.get("/nothing-here-either")
+
+    assert request_count("unmatched") == before + 2
+    assert request_count("/nothing-here") == 0
+
+
+def test_registration_reports_bcrypt(client):
+    """
+    Given the real app, a registration reports the time spent hashing the password.
+    """
+    response = client.post("/register", json={
+        "first_name": "Timing",
+        "lastname": "User",
+        "email": "timing.user@email.com",
+        "plain_password": "timinguserpassword"
+    })
+
+    assert response.status_code == 201
+    assert {"bcrypt", "total"} <= set(server_timing(response))
+    assert phase_count("/register", "bcrypt") >= 1
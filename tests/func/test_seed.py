@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+from alembic.script import ScriptDirectory
+from pathlib import Path
+from sqlalchemy import create_engine, make_url, select, text
+from api import seed
+from api.models import Advisor, User, UserRole
+from api.config.constants import ADMIN_EMAIL, ADVISOR_EMAIL
+
+
+def test_seeding_is_idempotent(db_session, monkeypatch):
+    """
+    Given an empty database, seeding creates the admin and the advisor once; seeding again creates nothing
+    and does not hash the admin password again.
+    """
+    hashes = []
+    monkeypatch.setattr(seed.crypt, "hash", lambda password: hashes.append(password) or "$2b$12$hash")
+    db_session.query(User).filter(User.email == ADMIN_EMAIL).delete()
+    db_session.query(Advisor).filter(Advisor.email == ADVISOR_EMAIL).delete()
+
+    assert seed.seed_database(db_session, admin_password_hash="") == {"admin": True, "advisor": True}
+    assert seed.seed_database(db_session, admin_password_hash="") == {"admin": False, "advisor": False}
+
+    assert len(hashes) == 1
+    admin = db_session.execute(select(User).where(User.email == ADMIN_EMAIL)).scalar_one()
+    assert admin.role == UserRole.ADMIN and admin.is_active
+    assert db_session.execute(select(Advisor).where(Advisor.email == ADVISOR_EMAIL)).scalar_one().last_assigned_time is not None
+
+
+def test_importing_the_app_does_no_io():
+    """
+    Given a database that cannot be reached, importing api.main still succeeds: nothing connects before startup.
+    """
+    env = {**os.environ, "SQLALCHEMY_DATABASE_URL": "postgresql://nobody@127.0.0.1:9/unreachable"}
+
+    result = subprocess.run([sys.executable, "-c", "import api.main"], env=env, capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+
+
+def test_migrating_a_fresh_database_then_again():
+    """
+    Given a fresh database, migrating creates the tables, stamps them with the latest revision and seeds them;
+    migrating again goes through Alembic and changes nothing.
+    """
+    url = make_url(os.getenv("SQLALCHEMY_TEST_DATABASE_URL"))
+    fresh_url = url.set(database=f"{url.database}_migrate")
+    admin_engine = create_engine(url, isolation_level="AUTOCOMMIT")
+    with admin_engine.connect() as connection:
+        connection.execute(text(f'DROP DATABASE IF EXISTS "{fresh_url.database}"'))
+        connection.execute(text(f'CREATE DATABASE "{fresh_url.database}"'))
+    env = {**os.environ, "SQLALCHEMY_DATABASE_URL": fresh_url.render_as_string(hide_password=False)}
+    root = Path(__file__).parents[2]
+    fresh_engine = create_engine(fresh_url)
+
+    try:
+        outputs = []
+        for _ in range(2):
+            result = subprocess.run([sys.executable, "-m", "api.seed", "--migrate"], env=env, cwd=root,
+                                    capture_output=True, text=True, timeout=120)
+            assert result.returncode == 0, result.stderr
+            outputs.append(result.stdout)
+
+        assert outputs == ["admin: created\nadvisor: created\n", "admin: already there\nadvisor: already there\n"]
+        with fresh_engine.connect() as connection:
+            assert connection.execute(text("SELECT version_num FROM alembic_version")).scalar() == ScriptDirectory(str(root / "alembic")).get_current_head()
+            assert connection.execute(select(User.role).where(User.email == ADMIN_EMAIL)).scalar() == UserRole.ADMIN
+    finally:
+        fresh_engine.dispose()
+        with admin_engine.connect() as connection:
+            connection.execute(text(f'DROP DATABASE IF EXISTS "{fresh_url.database}"'))
+        admin_engine.dispose()
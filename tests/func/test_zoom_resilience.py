@@ -0,0 +1,251 @@
+import asyncio
+import httpx
+import pytest
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from api.config.exceptions import ServiceUnavailableError
+from api.utils import zoom_utils
+from api.utils.resilience import CircuitBreaker, ResilientClient, RetryPolicy, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def resilient_client(responses, breaker=None, attempts=3, deadline=5.0, hedge_delay=0.0):
+    """
+    Build a ResilientClient whose requests are answered, in order, by `responses`: status codes, (status code,
+    headers) tuples, exceptions to raise, or coroutine functions returning a response.
+    """
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        answer = responses[min(len(calls), len(responses)) - 1]
+        if isinstance(answer, Exception):
+            raise answer
+        if callable(answer):
+            return await answer()
+        status_code, headers = answer if isinstance(answer, tuple) else (answer, {})
+        return httpx.Response(status_code, headers=headers)
+
+    client = ResilientClient(
+        httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        breaker or CircuitBreaker("fake", failure_threshold=10, reset_timeout=30),
+        RetryPolicy(attempts, base_delay=0.001, max_delay=0.01),
+        deadline=deadline,
+        hedge_delay=hedge_delay
+    )
+    return client, calls
+
+
+@pytest.mark.asyncio
+async def test_retries_honor_retry_after():
+    """
+    Given Zoom answering 503 with a Retry-After header, then 429, then 201, the request is retried after
+    the advertised delays and the final response is returned.
+    """
+    client, calls = resilient_client([(503, {"Retry-After": "0.1"}), (429, {"Retry-After": "0.05"}), 201])
+
+    started = time.monotonic()
+    response = await client.request("POST", "https://api.zoom.us/v2/users/me/meetings")
+
+    assert response.status_code == 201
+    assert len(calls) == 3
+    assert time.monotonic() - started >= 0.15
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_non_idempotent_requests_are_not_retried_on_server_errors():
+    """
+    Given a POST answered with 500, which Zoom may have processed, it is not retried; a GET is.
+    """
+    client, calls = resilient_client([500, 500, 200])
+
+    response = await client.request("POST", "https://api.zoom.us/v2/users/me/meetings")
+    assert response.status_code == 500
+    assert len(calls) == 1
+
+    response = await client.request("GET", "https://api.zoom.us/v2/meetings/1")
+    assert response.status_code == 200
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_fails_fast_and_recovers():
+    """
+    Given a breaker that opens after two failures, a down service makes calls fail without being sent
+    until the reset timeout, when a single successful trial call closes it again.
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker("fake", failure_threshold=2, reset_timeout=30, clock=clock)
+    client, calls = resilient_client([502, 502, 200], breaker=breaker, attempts=1)
+
+    for _ in range(2):
+        with pytest.raises(ServiceUnavailableError):
+            await client.request("GET", "https://api.zoom.us/v2/meetings/1")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 10
+    with pytest.raises(ServiceUnavailableError) as error:
+        await client.request("GET", "https://api.zoom.us/v2/meetings/1")
+    assert error.value.retry_after == 20
+    assert len(calls) == 2
+    assert breaker.snapshot() == {"state": 2, "failures": 2, "opened_total": 1, "rejected_total": 1}
+
+    clock.now = 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    response = await client.request("GET", "https://api.zoom.us/v2/meetings/1")
+    assert response.status_code == 200
+    assert breaker.snapshot()["state"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_trial_call_reopens_the_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker("fake", failure_threshold=1, reset_timeout=30, clock=clock)
+    client, calls = resilient_client([httpx.ConnectError("refused")], breaker=breaker, attempts=1)
+
+    with pytest.raises(ServiceUnavailableError):
+        await client.request("GET", "https://api.zoom.us/v2/meetings/1")
+    clock.now = 30
+    with pytest.raises(ServiceUnavailableError):
+        await client.request("GET", "https://api.zoom.us/v2/meetings/1")
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened_total == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_call_releases_the_trial():
+    """
+    Given a half-open breaker whose trial call is cancelled, or fails before reaching the service, the next
+    call is still let through as the trial and closes the breaker.
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker("fake", failure_threshold=1, reset_timeout=30, clock=clock)
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    client, calls = resilient_client([502, hang, httpx.DecodingError("bad body"), 200], breaker=breaker, attempts=1)
+    with pytest.raises(ServiceUnavailableError):
+        await client.request("GET", "https://api.zoom.us/v2/meetings/1")
+    clock.now = 30
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(client.request("GET", "https://api.zoom.us/v2/meetings/1"), timeout=0.05)
+    with pytest.raises(httpx.DecodingError):
+        await client.request("GET", "https://api.zoom.us/v2/meetings/1")
+    response = await client.request("GET", "https://api.zoom.us/v2/meetings/1")
+
+    assert response.status_code == 200
+    assert len(calls) == 4
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_retry_after_beyond_the_deadline_fails_fast():
+    """
+    Given a Retry-After longer than what is left of the deadline, the call gives up instead of waiting.
+    """
+    client, calls = resilient_client([(429, {"Retry-After": "120"})], deadline=1.0)
+
+    started = time.monotonic()
+    with pytest.raises(ServiceUnavailableError) as error:
+        await client.request("GET", "https://api.zoom.us/v2/meetings/1")
+
+    assert time.monotonic() - started < 0.5
+    assert error.value.retry_after == 120
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_get_is_hedged():
+    """
+    Given a GET whose first attempt hangs, a second attempt is sent after the hedge delay and answers first.
+    """
+    async def slow():
+        await asyncio.sleep(2)
+        return httpx.Response(200, json={"attempt": 1})
+
+    async def fast():
+        return httpx.Response(200, json={"attempt": 2})
+
+    client, calls = resilient_client([slow, fast], hedge_delay=0.05)
+
+    started = time.monotonic()
+    response = await client.request("GET", "https://api.zoom.us/v2/meetings/1")
+
+    assert response.json() == {"attempt": 2}
+    assert time.monotonic() - started < 1
+    assert len(calls) == 2
+
+
+def test_parse_retry_after():
+    in_a_minute = datetime.now(timezone.utc) + timedelta(seconds=60)
+
+    assert parse_retry_after(httpx.Response(429, headers={"Retry-After": "7"})) == 7
+    assert 55 < parse_retry_after(httpx.Response(429, headers={"Retry-After": format_datetime(in_a_minute, usegmt=True)})) <= 60
+    assert parse_retry_after(httpx.Response(429, headers={"Retry-After": "soon"})) is None
+    assert parse_retry_after(httpx.Response(429)) is None
+
+
+async def get_zoom_client() -> httpx.AsyncClient:
+    return zoom_utils.get_zoom_client()
+
+
+async def replace_zoom_client() -> httpx.AsyncClient:
+    client = zoom_utils.get_zoom_client()
+    await asyncio.gather(*zoom_utils._closing_clients)
+    return client
+
+
+def test_zoom_client_of_a_finished_loop_is_closed(monkeypatch):
+    """
+    Given a Zoom client created on an event loop that has finished, the client replacing it on another loop closes it.
+    """
+    monkeypatch.setattr(zoom_utils, "_zoom_client", None)
+    monkeypatch.setattr(zoom_utils, "_zoom_client_loop", None)
+    first = asyncio.run(get_zoom_client())
+
+    second = asyncio.run(replace_zoom_client())
+
+    assert second is not first
+    assert first.is_closed and not second.is_closed
+
+
+def test_zoom_client_of_a_running_loop_is_closed_on_it(monkeypatch):
+    """
+    Given a Zoom client created on an event loop still running in another thread, it is closed on that loop once replaced.
+    """
+    monkeypatch.setattr(zoom_utils, "_zoom_client", None)
+    monkeypatch.setattr(zoom_utils, "_zoom_client_loop", None)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    try:
+        first = asyncio.run_coroutine_threadsafe(get_zoom_client(), loop).result()
+        closed_on = []
+        aclose = first.aclose
+
+        async def record_loop():
+            closed_on.append(asyncio.get_running_loop())
+            await aclose()
+        monkeypatch.setattr(first, "aclose", record_loop)
+
+        asyncio.run(replace_zoom_client())
+
+        assert first.is_closed
+        assert closed_on == [loop]
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
@@ -0,0 +1,91 @@
+import httpx
+import pytest
+from datetime import datetime
+from api.config.constants import ZOOM_API_BASE_URL
+from api.config.exceptions import GetMeetingError, ServiceUnavailableError
+from api.services.meeting_service import MeetingService
+from api.utils.resilience import circuit_breakers
+from api.stubs.zoom_server import to_zoom_start_time
+
+
+@pytest.fixture
+def zoom(zoom_server):
+    """
+    Fixture to give a test the fake Zoom API, healthy again and with a fresh circuit breaker afterwards.
+    """
+    yield zoom_server.zoom
+    zoom_server.zoom.latency = 0.0
+    zoom_server.zoom.error_rate = 0.0
+    zoom_server.zoom.error_status = 500
+    zoom_server.zoom.rate_limit = 0
+    circuit_breakers.pop("zoom", None)
+
+
+def test_to_zoom_start_time():
+    """
+    Given start times with and without an offset, only "Z" is read as UTC, like Zoom does.
+    """
+    assert to_zoom_start_time("2030-01-07T10:00:00", "America/Bogota") == "2030-01-07T15:00:00Z"
+    assert to_zoom_start_time("2030-01-07T10:00:00+00:00", "America/Bogota") == "2030-01-07T15:00:00Z"
+    assert to_zoom_start_time("2030-01-07T10:00:00Z", "America/Bogota") == "2030-01-07T10:00:00Z"
+
+
+@pytest.mark.asyncio
+async def test_meeting_service_round_trip(zoom, db_session):
+    """
+    Given the meeting service pointed at the fake Zoom, a meeting can be created, read, moved and deleted
+    with the status codes the service expects.
+    """
+    meeting_service = MeetingService(db_session)
+
+    created = await meeting_service.create_zoom_meeting(datetime(2030, 1, 7, 10, 0), "Fake Zoom topic")
+    assert created["start_time"] == "2030-01-07T15:00:00Z"
+    assert (await meeting_service.get_meeting(created["id"]))["topic"] == "Fake Zoom topic"
+
+    response = await meeting_service.zoom_request("PATCH", f"{ZOOM_API_BASE_URL}/meetings/{created['id']}", json={"start_time": "2030-01-08T10:00:00"})
+    assert response.status_code == 204
+    assert zoom.meetings[created["id"]]["start_time"] == "2030-01-08T15:00:00Z"
+
+    response = await meeting_service.zoom_request("DELETE", f"{ZOOM_API_BASE_URL}/meetings/{created['id']}")
+    assert response.status_code == 204
+    with pytest.raises(GetMeetingError):
+        await meeting_service.get_meeting(created["id"])
+    assert zoom.requests["POST /v2/users/me/meetings"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_answers_429_with_retry_after(zoom, zoom_server):
+    """
+    Given a rate limit of one request per second, three requests in a row get at least one 429 with Retry-After.
+    """
+    async with httpx.AsyncClient() as client:
+        token = (await client.post(zoom_server.oauth_token_url, auth=("id", "secret"), data={"grant_type": "account_credentials"})).json()["access_token"]
+        zoom.rate_limit = 1
+        responses = [await client.get(f"{zoom_server.api_base_url}/meetings/1", headers={"Authorization": f"Bearer {token}"}) for _ in range(3)]
+
+    limited = [response for response in responses if response.status_code == 429]
+    assert limited
+    assert all(int(response.headers["Retry-After"]) >= 1 for response in limited)
+    assert all(response.status_code == 404 for response in responses if response.status_code != 429)
+
+
+@pytest.mark.asyncio
+async def test_outage_opens_the_circuit_breaker(zoom, db_session):
+    """
+    Given Zoom failing every request with 503, creating a meeting is retried, then fails with
+    ServiceUnavailableError, and once the breaker is open the next call is not sent at all.
+    """
+    meeting_service = MeetingService(db_session)
+    await meeting_service.get_meeting_access_token()
+    zoom.error_rate = 1.0
+    zoom.error_status = 503
+
+    for _ in range(2):
+        with pytest.raises(ServiceUnavailableError):
+            await meeting_service.create_zoom_meeting(datetime(2030, 1, 7, 10, 0), "Outage")
+
+    assert circuit_breakers["zoom"].state == "open"
+    sent = zoom.requests["POST /v2/users/me/meetings"]
+    with pytest.raises(ServiceUnavailableError):
+        await meeting_service.create_zoom_meeting(datetime(2030, 1, 7, 10, 0), "Outage")
+    assert zoom.requests["POST /v2/users/me/meetings"] == sent
@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+import pytest_asyncio
+import redis.asyncio as aioredis
+from api.config.constants import REDIS_HOST, REDIS_PORT, REDIS_DB
+from api.utils.zoom_utils import ZoomTokenCache
+
+
+class FakeTokenEndpoint:
+    """
+    Hands out the tokens "token-1", "token-2", ... after a short delay, and counts the requests.
+    """
+
+    def __init__(self, expires_in: int = 3600):
+        self.expires_in = expires_in
+        self.calls = 0
+
+    async def __call__(self) -> tuple[str, int]:
+        self.calls += 1
+        number = self.calls
+        await asyncio.sleep(0.05)
+        return (f"token-{number}", self.expires_in)
+
+
+@pytest_asyncio.fixture
+async def redis_client():
+    """
+    Fixture to share the token through Redis, without the token and lock left by other tests.
+    """
+    client = aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
+    await client.delete(ZoomTokenCache.REDIS_KEY, ZoomTokenCache.REDIS_LOCK_KEY)
+    yield client
+    await client.delete(ZoomTokenCache.REDIS_KEY, ZoomTokenCache.REDIS_LOCK_KEY)
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_fetch_the_token_once():
+    """
+    Given 50 requests needing a token at the same time, a single token is requested and all of them get it.
+    """
+    cache, fetch = ZoomTokenCache(), FakeTokenEndpoint()
+
+    tokens = await asyncio.gather(*(cache.get_token(fetch) for _ in range(50)))
+
+    assert fetch.calls == 1
+    assert set(tokens) == {"token-1"}
+
+
+@pytest.mark.asyncio
+async def test_expiring_token_is_refreshed_ahead():
+    """
+    Given a token entering the refresh margin, it is still served while a single new token is fetched in
+    the background, and the new token is served afterwards.
+    """
+    cache, fetch = ZoomTokenCache(refresh_margin=300), FakeTokenEndpoint(expires_in=120)
+    assert await cache.get_token(fetch) == "token-1"
+
+    tokens = await asyncio.gather(*(cache.get_token(fetch) for _ in range(10)))
+    assert set(tokens) == {"token-1"}
+    await cache._refresh_task
+
+    assert fetch.calls == 2
+    assert await cache.get_token(fetch) == "token-2"
+
+
+@pytest.mark.asyncio
+async def test_workers_share_the_token_through_redis(redis_client):
+    """
+    Given two workers starting at the same time with the same Redis, only one of them requests a token, and
+    a worker started later reads it from Redis.
+    """
+    fetch = FakeTokenEndpoint()
+    first, second = ZoomTokenCache(redis_client=redis_client), ZoomTokenCache(redis_client=redis_client)
+
+    tokens = await asyncio.gather(first.get_token(fetch), second.get_token(fetch))
+    later = await ZoomTokenCache(redis_client=redis_client).get_token(fetch)
+
+    assert fetch.calls == 1
+    assert tokens == ["token-1", "token-1"] and later == "token-1"
+    assert 3500 < await redis_client.ttl(ZoomTokenCache.REDIS_KEY) <= 3600
+
+
+@pytest.mark.asyncio
+async def test_refresh_lock_of_another_worker_is_not_released(redis_client):
+    """
+    Given a refresh whose Redis lock expired and was taken by another worker while the token was fetched, the
+    refresh leaves the other worker's lock in place.
+    """
+    fetch = FakeTokenEndpoint()
+
+    async def slow_fetch() -> tuple[str, int]:
+        await redis_client.set(ZoomTokenCache.REDIS_LOCK_KEY, "another worker", ex=ZoomTokenCache.REDIS_LOCK_TIMEOUT)
+        return await fetch()
+
+    assert await ZoomTokenCache(redis_client=redis_client).get_token(slow_fetch) == "token-1"
+
+    assert await redis_client.get(ZoomTokenCache.REDIS_LOCK_KEY) == "another worker"
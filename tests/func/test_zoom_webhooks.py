@@ -0,0 +1,187 @@
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+import pytest
+import redis
+from sqlalchemy import event
+from api.config.constants import REDIS_HOST, REDIS_PORT, REDIS_DB, ZOOM_WEBHOOK_SECRET_TOKEN
+from api.models import Advisor, Meeting, MeetingStatus
+from api.utils.advisor_schedule import get_advisor_schedule
+from api.utils.zoom_webhooks import ZOOM_WEBHOOK_DEAD_QUEUE, ZOOM_WEBHOOK_PROCESSING_QUEUE, ZOOM_WEBHOOK_QUEUE, sign_zoom_payload
+from api.workers.zoom_webhooks import ZoomWebhookWorker
+
+# Payloads recorded from the Zoom app, with their meeting IDs matching the meetings of the `meetings` fixture
+PAYLOADS = Path(__file__).parent / "zoom_webhooks"
+
+
+def recorded(event_name: str, **changes) -> bytes:
+    payload = json.loads((PAYLOADS / f"{event_name}.json").read_text())
+    payload.update(changes)
+    return json.dumps(payload).encode()
+
+
+def signed(body: bytes, timestamp: int | None = None) -> dict:
+    timestamp = str(int(time.time()) if timestamp is None else timestamp)
+    return {
+        "Content-Type": "application/json",
+        "x-zm-request-timestamp": timestamp,
+        "x-zm-signature": sign_zoom_payload(ZOOM_WEBHOOK_SECRET_TOKEN, timestamp, body),
+    }
+
+
+@pytest.fixture
+def queue():
+    """
+    Fixture to inspect the Redis lists of the webhook events, emptied before and after the test.
+    """
+    redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
+    lists = (ZOOM_WEBHOOK_QUEUE, ZOOM_WEBHOOK_PROCESSING_QUEUE, f"{ZOOM_WEBHOOK_PROCESSING_QUEUE}:attempts", ZOOM_WEBHOOK_DEAD_QUEUE)
+    redis_client.delete(*lists)
+    yield redis_client
+    redis_client.delete(*lists)
+    redis_client.close()
+
+
+@pytest.fixture(scope="module")
+def meetings(db_session):
+    """
+    Fixture to save the two meetings the recorded payloads refer to.
+    """
+    advisor = Advisor(name="Webhook Advisor", email="webhook.advisor@email.com")
+    db_session.add(advisor)
+    db_session.flush()
+    updated = Meeting(start_time=datetime(2026, 11, 19, 15), topic="Extra info about the services the company offers",
+                      zoom_meeting_id="85746065432", join_url="https://zoom.us/j/85746065432", advisor_id=advisor.id)
+    deleted = Meeting(start_time=datetime(2026, 11, 21, 15), topic="Extra info about the services the company offers",
+                      zoom_meeting_id="85746065433", join_url="https://zoom.us/j/85746065433", advisor_id=advisor.id)
+    db_session.add_all([updated, deleted])
+    db_session.commit()
+    return updated.id, deleted.id, advisor.id
+
+
+def test_url_validation(client):
+    body = recorded("endpoint.url_validation")
+
+    response = client.post("/webhooks/zoom", content=body, headers=signed(body))
+
+    assert response.status_code == 200
+    expected = hmac.new(ZOOM_WEBHOOK_SECRET_TOKEN.encode(), b"qgg8vlvZRS6UYooatFL8Aw", hashlib.sha256).hexdigest()
+    assert response.json() == {"plainToken": "qgg8vlvZRS6UYooatFL8Aw", "encryptedToken": expected}
+
+
+def test_unsigned_and_replayed_requests_are_rejected(client, queue):
+    """
+    Given a request with a wrong signature, without one, or signed too long ago, nothing is queued.
+    """
+    body = recorded("meeting.deleted")
+    tampered = recorded("meeting.deleted", event_ts=1763640000401)
+
+    responses = [
+        client.post("/webhooks/zoom", content=tampered, headers=signed(body)),
+        client.post("/webhooks/zoom", content=body, headers={"Content-Type": "application/json"}),
+        client.post("/webhooks/zoom", content=body, headers=signed(body, timestamp=int(time.time()) - 3600)),
+    ]
+
+    assert [response.status_code for response in responses] == [401, 401, 401]
+    assert queue.llen(ZOOM_WEBHOOK_QUEUE) == 0
+
+
+def test_events_are_queued_and_acknowledged(client, queue):
+    """
+    Given signed meeting events, they are queued as they came and acknowledged with 204; other events are dropped.
+    """
+    bodies = [recorded("meeting.updated"), recorded("meeting.started")]
+
+    statuses = [client.post("/webhooks/zoom", content=body, headers=signed(body)).status_code for body in bodies]
+    other = recorded("meeting.started", event="recording.completed")
+    other_status = client.post("/webhooks/zoom", content=other, headers=signed(other)).status_code
+
+    assert statuses == [204, 204] and other_status == 204
+    assert queue.lrange(ZOOM_WEBHOOK_QUEUE, 0, -1) == [body.decode() for body in bodies]
+
+
+@pytest.mark.asyncio
+async def test_worker_applies_a_batch_in_order(client, queue, db_session, meetings):
+    """
+    Given the recorded events delivered out of order, with a retry and a malformed event among them, the worker
+    applies them in one batch with a single SELECT: the meeting is moved, renamed and ended, and the other one deleted.
+    """
+    updated_id, deleted_id, advisor_id = meetings
+    schedule = get_advisor_schedule()
+    schedule.book(updated_id, advisor_id, datetime(2026, 11, 19, 15), force=True)
+    schedule.book(deleted_id, advisor_id, datetime(2026, 11, 21, 15), force=True)
+    for event_name in ("meeting.ended", "meeting.updated", "meeting.deleted", "meeting.started", "meeting.updated"):
+        body = recorded(event_name)
+        assert client.post("/webhooks/zoom", content=body, headers=signed(body)).status_code == 204
+    queue.rpush(ZOOM_WEBHOOK_QUEUE, json.dumps({"event": "meeting.updated", "event_ts": 1, "payload": {"object": {"id": 1, "start_time": "soon"}}}))
+
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement.split()[0])
+    event.listen(db_session.get_bind(), "before_cursor_execute", record)
+    try:
+        worker = ZoomWebhookWorker(session_factory=lambda: db_session, batch_size=10)
+        assert await worker.drain_once() == 6
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", record)
+
+    assert statements.count("SELECT") == 1
+    assert queue.llen(ZOOM_WEBHOOK_QUEUE) == 0
+    meeting = db_session.get(Meeting, updated_id)
+    assert meeting.start_time == datetime(2026, 11, 20, 15)
+    assert meeting.topic == "Follow-up on the services the company offers"
+    assert meeting.status == MeetingStatus.ENDED
+    assert meeting.zoom_event_ts == 1763652600300
+    assert db_session.get(Meeting, deleted_id) is None
+    assert not schedule.is_free(advisor_id, datetime(2026, 11, 20, 15))
+    assert schedule.is_free(advisor_id, datetime(2026, 11, 19, 15)) and schedule.is_free(advisor_id, datetime(2026, 11, 21, 15))
+
+
+@pytest.mark.asyncio
+async def test_batch_left_by_a_dead_worker_is_applied(queue, db_session, meetings):
+    """
+    Given a worker that claimed a batch and died before committing, the next worker applies that batch first.
+    """
+    updated_id, _, _ = meetings
+    queue.rpush(ZOOM_WEBHOOK_QUEUE, recorded("meeting.started", event_ts=1763660000000), recorded("meeting.ended", event_ts=1763660000001))
+    worker = ZoomWebhookWorker(session_factory=lambda: db_session, batch_size=1)
+    await worker.claim_batch(worker.redis_client_factory())
+
+    assert queue.llen(ZOOM_WEBHOOK_PROCESSING_QUEUE) == 1
+    assert await ZoomWebhookWorker(session_factory=lambda: db_session, batch_size=1).drain_once() == 1
+
+    assert db_session.get(Meeting, updated_id).zoom_event_ts == 1763660000000
+    assert queue.llen(ZOOM_WEBHOOK_PROCESSING_QUEUE) == 0
+    assert queue.lrange(ZOOM_WEBHOOK_QUEUE, 0, -1) == [recorded("meeting.ended", event_ts=1763660000001).decode()]
+
+
+@pytest.mark.asyncio
+async def test_failing_event_is_dead_lettered(queue, db_session, meetings, monkeypatch):
+    """
+    Given a batch with an event the database rejects, the batch is kept and retried; after the last attempt the
+    other events are applied one by one and the failing one is moved to the dead-letter list.
+    """
+    updated_id, _, _ = meetings
+    poison, good = recorded("meeting.started", event_ts=1763670000000), recorded("meeting.ended", event_ts=1763670000001)
+    queue.rpush(ZOOM_WEBHOOK_QUEUE, poison, good)
+    worker = ZoomWebhookWorker(session_factory=lambda: db_session, batch_size=10, max_attempts=2)
+    apply_batch = worker.apply_batch
+
+    def fail_on_poison(db, events):
+        if any(event["event_ts"] == 1763670000000 for event in events):
+            raise RuntimeError("rejected by the database")
+        return apply_batch(db, events)
+    monkeypatch.setattr(worker, "apply_batch", fail_on_poison)
+
+    with pytest.raises(RuntimeError):
+        await worker.drain_once()
+    assert queue.lrange(ZOOM_WEBHOOK_PROCESSING_QUEUE, 0, -1) == [poison.decode(), good.decode()]
+
+    assert await worker.drain_once() == 2
+
+    assert queue.lrange(ZOOM_WEBHOOK_DEAD_QUEUE, 0, -1) == [poison.decode()]
+    assert queue.llen(ZOOM_WEBHOOK_PROCESSING_QUEUE) == 0 and queue.llen(ZOOM_WEBHOOK_QUEUE) == 0
+    meeting = db_session.get(Meeting, updated_id)
+    assert meeting.status == MeetingStatus.ENDED and meeting.zoom_event_ts == 1763670000001